@@ -0,0 +1,276 @@
+"""
+Feature engineering scaling benchmark.
+
+Generates PaySim-shaped inputs at several sizes, times each feature family
+separately (plus the full pipeline, parallel worker counts and chunked mode),
+records peak RSS and writes a machine-readable JSON report.
+
+Usage:
+    python scripts/benchmark_feature_engineering.py
+    python scripts/benchmark_feature_engineering.py --sizes 10000 100000 --n-jobs 1 4 8
+    python scripts/benchmark_feature_engineering.py --generator synthetic --sizes 10000000
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from queue import Empty
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Add src (and scripts) to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent))
+
+from data.feature_engineering import FraudFeatureEngineer
+from data.feature_registry import PAYSIM_FEATURES, resolve_features
+from data.paysim_generator import PAYSIM_COLUMNS, generate_synthetic_paysim, sample_config
+from run_chat1_with_sample import create_sample_paysim
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:  # Windows
+    RESOURCE_AVAILABLE = False
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000, 6_000_000]
+
+
+def feature_families() -> Dict[str, List[str]]:
+    """Group registered PaySim features by how they are computed."""
+    families: Dict[str, List[str]] = {}
+    for spec in resolve_features(PAYSIM_FEATURES):
+        family = spec.family if spec.family == 'row' else f"{spec.family}:{spec.key}"
+        families.setdefault(family, []).append(spec.name)
+    return families
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process (Linux /proc, else peak RSS)."""
+    statm = Path("/proc/self/statm")
+    if statm.exists():
+        pages = int(statm.read_text().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far."""
+    if not RESOURCE_AVAILABLE:
+        return float('nan')
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def _measure(task: Callable[..., None], queue, setup: Optional[Callable[[], object]] = None) -> None:
+    """Child-process body: run ``task`` once and report time and memory."""
+    inputs = () if setup is None else (setup(),)
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    task(*inputs)
+    seconds = time.perf_counter() - start
+    queue.put({'seconds': seconds, 'rss_before_mb': rss_before, 'peak_rss_mb': peak_rss_mb()})
+
+
+def run_isolated(
+    task: Callable[..., None],
+    setup: Optional[Callable[[], object]] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, float]:
+    """
+    Run ``task`` in a forked child so each measurement gets its own peak RSS.
+
+    ``setup`` runs first, outside the timed region, and its result is passed
+    to ``task``. Falls back to in-process timing where fork is unavailable.
+
+    Raises:
+        RuntimeError: If the child dies (e.g. OOM-killed) or exceeds ``timeout`` seconds
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        inputs = () if setup is None else (setup(),)
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+        task(*inputs)
+        return {
+            'seconds': time.perf_counter() - start,
+            'rss_before_mb': rss_before,
+            'peak_rss_mb': peak_rss_mb()
+        }
+
+    context = multiprocessing.get_context('fork')
+    queue = context.Queue()
+    process = context.Process(target=_measure, args=(task, queue, setup))
+    process.start()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                result = queue.get(timeout=1.0)
+                break
+            except Empty:
+                if not process.is_alive():
+                    # The child may have put its result just before exiting
+                    try:
+                        result = queue.get(timeout=1.0)
+                        break
+                    except Empty:
+                        raise RuntimeError(f"Benchmark task died with exit code {process.exitcode}") from None
+                if deadline is not None and time.monotonic() > deadline:
+                    raise RuntimeError(f"Benchmark task timed out after {timeout:.0f}s")
+        process.join(timeout=60)
+    finally:
+        if process.is_alive():
+            process.kill()
+            process.join()
+    if process.exitcode != 0:
+        raise RuntimeError(f"Benchmark task exited with code {process.exitcode}")
+    return result
+
+
+def best_of(
+    task: Callable[..., None],
+    repeat: int,
+    setup: Optional[Callable[[], object]] = None,
+    timeout: Optional[float] = None
+) -> Dict:
+    """
+    Fastest of ``repeat`` isolated runs, with the largest peak RSS seen.
+
+    A failed run is recorded as ``{'error': ...}`` so the rest of the
+    benchmark (and its report) still completes.
+    """
+    try:
+        runs = [run_isolated(task, setup, timeout) for _ in range(repeat)]
+    except RuntimeError as e:
+        logger.error(f"  {e}")
+        return {'error': str(e)}
+    best = min(runs, key=lambda run: run['seconds'])
+    best['peak_rss_mb'] = max(run['peak_rss_mb'] for run in runs)
+    best['extra_rss_mb'] = best['peak_rss_mb'] - best['rss_before_mb']
+    return best
+
+
+def _summarize(label: str, measurement: Dict, n_rows: int) -> Dict:
+    """Add throughput to a successful measurement and log it."""
+    if 'error' in measurement:
+        logger.info(f"  {label:<22} FAILED ({measurement['error']})")
+        return measurement
+    measurement['rows_per_second'] = n_rows / measurement['seconds']
+    logger.info(f"  {label:<22} {measurement['seconds']:8.3f}s  peak {measurement['peak_rss_mb']:8.1f} MB")
+    return measurement
+
+
+def make_input(n_rows: int, generator: str) -> pd.DataFrame:
+    """PaySim-shaped input: uniform random rows, or the account-graph generator."""
+    if generator == 'synthetic':
+        # Skewed account reuse gives the window/sketch features realistic history lengths
+        config = sample_config(n_rows, graph_columns=False)
+        return generate_synthetic_paysim(config, n_jobs=-1)[PAYSIM_COLUMNS]
+    return create_sample_paysim(n_samples=n_rows)
+
+
+def benchmark_size(
+    n_rows: int,
+    n_jobs_options: List[int],
+    chunksizes: List[int],
+    repeat: int,
+    generator: str = 'sample',
+    timeout: Optional[float] = None
+) -> Dict:
+    """Benchmark every family, the full pipeline and chunked mode at one size."""
+    logger.info(f"Generating {n_rows:,} PaySim-shaped rows...")
+    df = make_input(n_rows, generator)
+    stats = {'mean': float(df['amount'].mean()), 'std': float(df['amount'].std())}
+    result = {'rows': n_rows, 'families': {}, 'full_pipeline': {}, 'chunked': {}}
+
+    for family, names in feature_families().items():
+        specs = resolve_features(PAYSIM_FEATURES, names)
+        engineer = FraudFeatureEngineer()
+        # The input copy is made in setup, outside the timed region
+        measurement = best_of(
+            lambda frame: engineer._apply_feature_specs(frame, specs, stats), repeat, setup=df.copy, timeout=timeout
+        )
+        measurement['features'] = names
+        result['families'][family] = _summarize(family, measurement, n_rows)
+
+    for n_jobs in n_jobs_options:
+        engineer = FraudFeatureEngineer(n_jobs=n_jobs)
+        measurement = best_of(lambda: engineer.engineer_paysim_features(df), repeat, timeout=timeout)
+        result['full_pipeline'][f"n_jobs={n_jobs}"] = _summarize(f"full (n_jobs={n_jobs})", measurement, n_rows)
+
+    if chunksizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "paysim.csv"
+            df.sort_values('step', kind='mergesort').to_csv(source, index=False)
+            del df
+            for chunksize in chunksizes:
+                output = Path(tmp) / f"features_{chunksize}.csv"
+                measurement = best_of(
+                    lambda: FraudFeatureEngineer().engineer_paysim_features_chunked(source, output, chunksize),
+                    repeat,
+                    timeout=timeout
+                )
+                result['chunked'][f"chunksize={chunksize}"] = _summarize(
+                    f"chunked ({chunksize:,})", measurement, n_rows
+                )
+
+    return result
+
+
+def main():
+    """Run the benchmark and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Benchmark FraudFeatureEngineer scaling")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Row counts to benchmark")
+    parser.add_argument("--n-jobs", type=int, nargs="+", default=[1, os.cpu_count() or 1], help="Worker counts for the full pipeline")
+    parser.add_argument("--chunksizes", type=int, nargs="*", default=[500_000], help="Chunk sizes for chunked mode (empty to skip)")
+    parser.add_argument("--generator", choices=["sample", "synthetic"], default="sample", help="Input generator")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per measurement (fastest is kept)")
+    parser.add_argument("--timeout", type=float, default=3600, help="Seconds before a measurement is abandoned")
+    parser.add_argument("--output", type=str, default=None, help="Report path (default: reports/benchmarks/...)")
+    args = parser.parse_args()
+
+    report = {
+        'benchmark': 'feature_engineering',
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+        },
+        'parameters': vars(args),
+        'results': [],
+    }
+
+    for n_rows in args.sizes:
+        report['results'].append(
+            benchmark_size(n_rows, sorted(set(args.n_jobs)), args.chunksizes, args.repeat, args.generator, args.timeout)
+        )
+
+    output = Path(args.output) if args.output else (
+        Path("reports/benchmarks") / f"feature_engineering_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\n✅ Benchmark report saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,6 +14,7 @@ from data.generate_synthetic_fraud_data import (
     create_synthetic_fraud_data,
     create_train_test_split
 )
+from models.feature_matrix import FeatureMatrixStore
 
 logging.basicConfig(
     level=logging.INFO,
@@ -47,6 +48,7 @@ def main():
     X_test.to_csv(data_dir / "X_test.csv", index=False)
     y_train.to_csv(data_dir / "y_train.csv", index=False)
     y_test.to_csv(data_dir / "y_test.csv", index=False)
+    FeatureMatrixStore(data_dir).save_splits(X_train, X_test, y_train, y_test)
     
     logger.info("=" * 60)
     logger.info("✅ Demo data creation complete!")
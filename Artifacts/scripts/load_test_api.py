@@ -0,0 +1,433 @@
+"""
+API load generator.
+
+Replays PaySim transactions (the synthetic generator, or a Parquet/Feather/CSV log)
+against a running Guardian API at a fixed arrival rate, mixing
+``/api/v1/predict``, ``/api/v1/predict/batch`` and ``/api/v1/explain``.
+Arrivals are open-loop: every request has a scheduled send time and its
+latency is measured from that time, so a saturated server shows up as
+queueing delay instead of silently lowering the offered load. Writes
+latency percentiles, error rates and achieved throughput as JSON.
+
+Usage:
+    python scripts/load_test_api.py --spawn-server --tps 100 --duration 30
+    python scripts/load_test_api.py --url http://localhost:8000 --tps 500 --concurrency 128
+    python scripts/load_test_api.py --spawn-server --source data/processed/sample_raw_paysim.parquet
+    python scripts/load_test_api.py --spawn-server --mix predict=8 batch=1 explain=1 --batch-size 100
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import httpx
+import pandas as pd
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from data.columnar import COLUMNAR_FORMATS, iter_columnar
+from data.paysim_generator import generate_synthetic_paysim, sample_config
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+logging.getLogger("httpx").setLevel(logging.WARNING)  # one INFO line per request otherwise
+
+PROJECT_ROOT = Path(__file__).parent.parent
+# Generated on the fly, so the replayed log never goes stale
+DEFAULT_SOURCE = 'synthetic'
+
+ENDPOINTS = {
+    'predict': '/api/v1/predict',
+    'batch': '/api/v1/predict/batch',
+    'explain': '/api/v1/explain',
+}
+
+# TransactionRequest fields a replayed row can fill
+TRANSACTION_FIELDS = [
+    'amount', 'step', 'type', 'oldbalanceOrg', 'newbalanceOrig',
+    'oldbalanceDest', 'newbalanceDest', 'nameOrig', 'nameDest'
+]
+
+PERCENTILES = {'p50': 50.0, 'p95': 95.0, 'p99': 99.0, 'p99.9': 99.9}
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed latency histogram with bounded relative error.
+
+    Buckets grow geometrically by ``1 + precision`` from ``min_us``, so
+    percentiles are exact to within ``precision`` at any scale and memory
+    stays constant however many requests are recorded.
+    """
+
+    def __init__(self, precision: float = 0.01, min_us: float = 10.0):
+        self.precision = precision
+        self.min_us = min_us
+        self.log_base = math.log1p(precision)
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+
+    def record(self, seconds: float):
+        """Add one latency observation."""
+        us = max(seconds * 1e6, self.min_us)
+        bucket = int(math.log(us / self.min_us) / self.log_base)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total_us += us
+        self.max_us = max(self.max_us, us)
+
+    def percentile(self, q: float) -> float:
+        """Latency (ms) at percentile ``q`` (0-100); upper edge of its bucket."""
+        if not self.count:
+            return float('nan')
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(self.min_us * math.exp((bucket + 1) * self.log_base), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self) -> Dict[str, float]:
+        """Percentiles, mean and max in milliseconds."""
+        result = {name: self.percentile(q) for name, q in PERCENTILES.items()}
+        result['mean'] = self.total_us / self.count / 1000 if self.count else float('nan')
+        result['max'] = self.max_us / 1000 if self.count else float('nan')
+        return result
+
+
+class EndpointStats:
+    """Counters and histograms for one endpoint."""
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.transactions = 0
+        self.status_counts: Dict[str, int] = {}
+        self.latency = LatencyHistogram()  # from scheduled send time
+        self.service = LatencyHistogram()  # from actual send time
+
+    def record(self, status: str, ok: bool, scheduled: float, sent: float, done: float, transactions: int):
+        self.requests += 1
+        self.errors += 0 if ok else 1
+        self.transactions += transactions if ok else 0
+        self.status_counts[status] = self.status_counts.get(status, 0) + 1
+        self.latency.record(done - scheduled)
+        self.service.record(done - sent)
+
+    def report(self, seconds: float) -> Dict:
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'error_rate': self.errors / self.requests if self.requests else 0.0,
+            'status_counts': self.status_counts,
+            'achieved_rps': self.requests / seconds if seconds else 0.0,
+            'transactions_per_second': self.transactions / seconds if seconds else 0.0,
+            'latency_ms': self.latency.summary(),
+            'service_time_ms': self.service.summary(),
+        }
+
+
+def load_transactions(source: str, limit: int, seed: int = 42) -> List[Dict]:
+    """
+    Transactions to replay as TransactionRequest payloads.
+
+    Args:
+        source: 'synthetic', or a PaySim log as Parquet/Feather (e.g. the
+            ``save_processed`` output) or CSV
+        limit: Maximum number of transactions
+        seed: Seed for the synthetic generator
+
+    Returns:
+        Payload dicts in log order (rows with non-positive amounts dropped)
+    """
+    if source == 'synthetic':
+        df = generate_synthetic_paysim(sample_config(limit, seed=seed, graph_columns=False))
+    elif Path(source).suffix in COLUMNAR_FORMATS.values():
+        batches, rows = [], 0
+        for batch in iter_columnar(source, batch_size=limit):
+            batches.append(batch)
+            rows += len(batch)
+            if rows >= limit:
+                break
+        df = pd.concat(batches, ignore_index=True).head(limit)
+    else:
+        df = pd.read_csv(source, nrows=limit)
+
+    columns = [column for column in TRANSACTION_FIELDS if column in df.columns]
+    if 'amount' not in columns:
+        raise ValueError(f"{source} has no 'amount' column to replay")
+    df = df.loc[df['amount'] > 0, columns]
+    if 'step' in df.columns:
+        df['step'] = df['step'].astype(int)
+
+    # NaN is not valid JSON; missing optional fields go out as null
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    logger.info(f"Loaded {len(records):,} transactions from {source}")
+    return records
+
+
+def parse_mix(items: List[str]) -> Dict[str, float]:
+    """Parse ``name=weight`` pairs into normalized endpoint weights."""
+    mix = {}
+    for item in items:
+        name, _, weight = item.partition('=')
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {list(ENDPOINTS)}")
+        mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError("Endpoint mix needs a positive weight")
+    return {name: weight / total for name, weight in mix.items()}
+
+
+class Replayer:
+    """Cycles through the transaction log and builds request bodies."""
+
+    def __init__(self, transactions: List[Dict], batch_size: int, top_features: int):
+        self.transactions = transactions
+        self.batch_size = batch_size
+        self.top_features = top_features
+        self.position = 0
+
+    def _take(self, n: int) -> List[Dict]:
+        rows = [self.transactions[(self.position + i) % len(self.transactions)] for i in range(n)]
+        self.position = (self.position + n) % len(self.transactions)
+        return rows
+
+    def body(self, endpoint: str):
+        """(json body, transactions scored) for the next request."""
+        if endpoint == 'batch':
+            return {'transactions': self._take(self.batch_size), 'threshold': 0.5}, self.batch_size
+        transaction = self._take(1)[0]
+        if endpoint == 'explain':
+            return {'transaction': transaction, 'top_features': self.top_features}, 1
+        return transaction, 1
+
+
+async def _send(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    stats: EndpointStats,
+    endpoint: str,
+    body,
+    transactions: int,
+    scheduled: float,
+    record: bool
+):
+    async with semaphore:
+        sent = time.perf_counter()
+        try:
+            response = await client.post(ENDPOINTS[endpoint], json=body)
+            status, ok = str(response.status_code), response.is_success
+        except httpx.TimeoutException:
+            status, ok = 'timeout', False
+        except httpx.HTTPError as e:
+            status, ok = type(e).__name__, False
+        done = time.perf_counter()
+    if record:
+        stats.record(status, ok, scheduled, sent, done, transactions)
+
+
+async def run_load(
+    base_url: str,
+    transactions: List[Dict],
+    tps: float,
+    duration: float,
+    concurrency: int,
+    mix: Dict[str, float],
+    batch_size: int = 50,
+    top_features: int = 10,
+    warmup: float = 0.0,
+    timeout: float = 10.0,
+    seed: int = 42
+) -> Dict:
+    """
+    Offer ``tps`` requests per second for ``warmup + duration`` seconds.
+
+    Args:
+        base_url: API root (e.g. http://127.0.0.1:8000)
+        transactions: Payloads to replay, cycled in order
+        tps: Target request arrival rate
+        duration: Measured seconds (after warmup)
+        concurrency: Maximum requests in flight (and open connections)
+        mix: Endpoint weights from ``parse_mix``
+        batch_size: Transactions per batch request
+        top_features: ``top_features`` of explain requests
+        warmup: Seconds of load sent before measuring
+        timeout: Per-request timeout in seconds
+        seed: Seed for the endpoint choice
+
+    Returns:
+        Per-endpoint and overall report
+    """
+    chooser = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    replayer = Replayer(transactions, batch_size, top_features)
+    stats = {name: EndpointStats() for name in names}
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        tasks = set()
+        start = time.perf_counter()
+        measure_from = start + warmup
+        total = int((warmup + duration) * tps)
+        lag = 0.0
+        for i in range(total):
+            scheduled = start + i / tps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                lag = max(lag, -delay)
+            endpoint = chooser.choices(names, weights)[0]
+            body, count = replayer.body(endpoint)
+            task = asyncio.create_task(_send(
+                client, semaphore, stats[endpoint], endpoint, body, count, scheduled, scheduled >= measure_from
+            ))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - measure_from
+
+    overall = EndpointStats()
+    for endpoint_stats in stats.values():
+        overall.requests += endpoint_stats.requests
+        overall.errors += endpoint_stats.errors
+        overall.transactions += endpoint_stats.transactions
+        for status, count in endpoint_stats.status_counts.items():
+            overall.status_counts[status] = overall.status_counts.get(status, 0) + count
+        for name in ('latency', 'service'):
+            merged, part = getattr(overall, name), getattr(endpoint_stats, name)
+            for bucket, count in part.buckets.items():
+                merged.buckets[bucket] = merged.buckets.get(bucket, 0) + count
+            merged.count += part.count
+            merged.total_us += part.total_us
+            merged.max_us = max(merged.max_us, part.max_us)
+
+    report = {
+        'measured_seconds': elapsed,
+        'offered_tps': tps,
+        'max_scheduler_lag_ms': lag * 1000,
+        'overall': overall.report(elapsed),
+        'endpoints': {name: endpoint_stats.report(elapsed) for name, endpoint_stats in stats.items()},
+    }
+    logger.info(
+        f"Achieved {report['overall']['achieved_rps']:.1f} req/s of {tps:.1f} offered, "
+        f"p50 {report['overall']['latency_ms']['p50']:.1f} ms, p99 {report['overall']['latency_ms']['p99']:.1f} ms, "
+        f"errors {report['overall']['error_rate']:.2%}"
+    )
+    if lag > 1.0 / tps * 10:
+        logger.warning(f"Load generator fell {lag * 1000:.0f} ms behind schedule; offered rate is not reliable")
+    return report
+
+
+def spawn_server(host: str, port: int, workers: int, timeout: float = 60.0) -> subprocess.Popen:
+    """Start ``uvicorn src.api.main:app`` and wait until /health answers."""
+    command = [
+        sys.executable, '-m', 'uvicorn', 'src.api.main:app',
+        '--host', host, '--port', str(port), '--workers', str(workers), '--log-level', 'warning'
+    ]
+    logger.info(f"Starting API server: {' '.join(command)}")
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://{host}:{port}/health", timeout=1.0).status_code < 500:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"API server did not become healthy within {timeout:.0f}s")
+
+
+def main():
+    """Run the load test and write the JSON report."""
+    parser = argparse.ArgumentParser(description="Replay transactions against the Guardian API")
+    parser.add_argument("--url", type=str, default=None, help="API root (default: spawned server)")
+    parser.add_argument("--spawn-server", action="store_true", help="Start a local uvicorn instance")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Host for the spawned server")
+    parser.add_argument("--port", type=int, default=8765, help="Port for the spawned server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the spawned server")
+    parser.add_argument("--source", type=str, default=DEFAULT_SOURCE, help="'synthetic' or a Parquet/Feather/CSV log to replay")
+    parser.add_argument("--limit", type=int, default=100_000, help="Transactions to load")
+    parser.add_argument("--tps", type=float, default=50.0, help="Target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=64, help="Maximum requests in flight")
+    parser.add_argument("--mix", type=str, nargs="+", default=["predict=8", "batch=1", "explain=1"],
+                        help="Endpoint weights as name=weight (predict, batch, explain)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Transactions per batch request")
+    parser.add_argument("--timeout", type=float, default=10.0, help="Per-request timeout (seconds)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--output", type=str, default=None, help="Report path (default: reports/benchmarks/...)")
+    args = parser.parse_args()
+
+    if args.url is None and not args.spawn_server:
+        parser.error("pass --url of a running API or --spawn-server")
+
+    mix = parse_mix(args.mix)
+    transactions = load_transactions(args.source, args.limit, args.seed)
+    if not transactions:
+        raise ValueError(f"No transactions to replay from {args.source}")
+
+    server: Optional[subprocess.Popen] = None
+    base_url = args.url
+    if args.spawn_server:
+        server = spawn_server(args.host, args.port, args.workers)
+        base_url = f"http://{args.host}:{args.port}"
+
+    try:
+        results = asyncio.run(run_load(
+            base_url, transactions, args.tps, args.duration, args.concurrency, mix,
+            batch_size=args.batch_size, warmup=args.warmup, timeout=args.timeout, seed=args.seed
+        ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    report = {
+        'benchmark': 'api_load',
+        'timestamp': datetime.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'httpx': httpx.__version__,
+            'pandas': pd.__version__,
+        },
+        'parameters': {**vars(args), 'base_url': base_url, 'mix': mix},
+        'results': results,
+    }
+
+    output = Path(args.output) if args.output else (
+        Path("reports/benchmarks") / f"api_load_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Incremental retraining from labeled transaction logs.
+
+Pulls transactions whose ``features`` carry a confirmed label (recorded
+with ``POST /api/v1/feedback``) from ``transaction_logs``, vectorizes the
+logged request and account features with the saved feature plan and
+warm-starts the newest production model on them. The update is saved as a
+new versioned model only if it passes the AUC guard.
+
+Usage:
+    python scripts/retrain_incremental.py
+    python scripts/retrain_incremental.py --since 2025-01-01T00:00:00 --mode refresh
+    python scripts/retrain_incremental.py --database-url sqlite:///guardian.db --rounds 100 --max-auc-drop 0.002
+"""
+
+import argparse
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+# Add src to path
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from models.feature_plan import FeaturePlan
+from models.incremental import DEFAULT_LABEL_KEY, RETRAIN_MODES, load_labeled_logs
+from models.trainer import FraudModelTrainer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def main():
+    """Retrain from the logs and exit non-zero when the guard rejects the update."""
+    parser = argparse.ArgumentParser(description="Warm-start retraining on newly labeled transactions")
+    parser.add_argument("--database-url", type=str, default=None, help="API database (default: API settings)")
+    parser.add_argument("--feature-plan", type=str, default="models/feature_plan.json", help="Saved FeaturePlan")
+    parser.add_argument("--base-model", type=str, default=None, help="Model to update (default: newest)")
+    parser.add_argument("--since", type=datetime.fromisoformat, default=None, help="Only logs after this ISO time")
+    parser.add_argument("--label-key", type=str, default=DEFAULT_LABEL_KEY, help="Label key in logged features")
+    parser.add_argument("--mode", choices=RETRAIN_MODES, default="continue", help="Add trees or refresh leaves")
+    parser.add_argument("--rounds", type=int, default=50, help="Trees added in continue mode")
+    parser.add_argument("--learning-rate", type=float, default=None, help="Learning rate of the update")
+    parser.add_argument("--max-auc-drop", type=float, default=0.0, help="Tolerated AUC loss")
+    parser.add_argument("--no-deploy", action="store_true", help="Save an accepted update without serving it")
+    args = parser.parse_args()
+
+    database_url = args.database_url
+    if database_url is None:
+        from api.config import settings
+        database_url = settings.database_url
+
+    records, labels = load_labeled_logs(database_url, args.label_key, args.since)
+    if len(records) == 0 or labels.min() == labels.max():
+        logger.error("Need labeled transactions of both classes to retrain")
+        sys.exit(1)
+
+    # Logged features hold the raw request plus the online account features
+    plan = FeaturePlan.load(args.feature_plan)
+    X_new = pd.DataFrame(plan.transform_batch(records, records), columns=plan.feature_columns)
+
+    trainer = FraudModelTrainer()
+    hyperparameters = {'learning_rate': args.learning_rate} if args.learning_rate else None
+    result = trainer.retrain_incremental(
+        X_new, pd.Series(labels, name='isFraud'), args.base_model, args.mode, args.rounds,
+        hyperparameters, max_auc_drop=args.max_auc_drop, deploy=not args.no_deploy
+    )
+    sys.exit(0 if result['accepted'] else 2)
+
+
+if __name__ == "__main__":
+    main()
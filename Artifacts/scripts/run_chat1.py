@@ -10,8 +10,11 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from data.loader import FraudDataLoader
-from data.feature_engineering import engineer_features
+from data.feature_cache import FeatureCache
+from data.feature_engineering import FraudFeatureEngineer, engineer_features
 from data.train_test_split import create_train_test_split
+from models.feature_matrix import FeatureMatrixStore
+from models.feature_plan import FeaturePlan
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -21,20 +24,21 @@ def main():
     """Main execution pipeline."""
     logger.info("Starting Chat 1: Data Acquisition...")
     
-    # 1. Load datasets
-    loader = FraudDataLoader()
+    # 1. Load datasets (interned account IDs, categorical type, float32)
+    loader = FraudDataLoader(compact=True)
     paysim_df = loader.download_paysim()
     credit_df = loader.download_credit_card_fraud()
     
-    # Save raw data
-    loader.save_processed(paysim_df, "raw_paysim.csv")
-    loader.save_processed(credit_df, "raw_credit_card.csv")
+    # Save raw data (Parquet by default, see FraudDataLoader.columnar)
+    loader.save_processed(paysim_df, "raw_paysim")
+    loader.save_processed(credit_df, "raw_credit_card")
     
     # 2. Engineer features
-    combined_df = engineer_features(paysim_df, credit_df)
+    engineer = FraudFeatureEngineer(cache=FeatureCache("data/cache/features"), vocabulary=loader.vocabulary)
+    combined_df = engineer_features(paysim_df, credit_df, engineer=engineer, sources=loader.sources)
     
     # Save processed data
-    loader.save_processed(combined_df, "combined_features.csv")
+    loader.save_processed(combined_df, "combined_features")
     
     # 3. Create train/test split
     X_train, X_test, y_train, y_test = create_train_test_split(combined_df)
@@ -45,6 +49,12 @@ def main():
     y_train.to_csv("data/processed/y_train.csv", index=False)
     y_test.to_csv("data/processed/y_test.csv", index=False)
     
+    # Memory-mapped float32 copies for training, evaluation and SHAP
+    FeatureMatrixStore("data/processed").save_splits(X_train, X_test, y_train, y_test)
+    
+    # Serving-time feature plan (training column order + statistics)
+    FeaturePlan.fit(X_train.columns, engineer).save("models/feature_plan.json")
+    
     logger.info("Chat 1 Complete!")
     logger.info(f"Ready for Chat 2: Model Training")
     logger.info(f"Training samples: {len(X_train):,}")
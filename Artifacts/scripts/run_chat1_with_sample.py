@@ -12,8 +12,10 @@ import numpy as np
 # Add src to path
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
-from data.feature_engineering import engineer_features
+from data.feature_cache import FeatureCache
+from data.feature_engineering import FraudFeatureEngineer, engineer_features
 from data.train_test_split import create_train_test_split
+from models.feature_plan import FeaturePlan
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -30,10 +32,10 @@ def create_sample_paysim(n_samples=5000) -> pd.DataFrame:
         'step': np.random.randint(1, 744, n_samples),
         'type': np.random.choice(['PAYMENT', 'TRANSFER', 'CASH_OUT', 'DEBIT', 'CASH_IN'], n_samples),
         'amount': np.random.lognormal(mean=8, sigma=2, size=n_samples),
-        'nameOrig': [f'C{np.random.randint(1000000, 9999999)}' for _ in range(n_samples)],
+        'nameOrig': 'C' + pd.Series(np.random.randint(1000000, 9999999, n_samples)).astype(str),
         'oldbalanceOrg': np.random.lognormal(mean=9, sigma=2, size=n_samples),
         'newbalanceOrig': np.zeros(n_samples),
-        'nameDest': [f'C{np.random.randint(1000000, 9999999)}' for _ in range(n_samples)],
+        'nameDest': 'C' + pd.Series(np.random.randint(1000000, 9999999, n_samples)).astype(str),
         'oldbalanceDest': np.random.lognormal(mean=9, sigma=2, size=n_samples),
         'newbalanceDest': np.zeros(n_samples),
         'isFraud': np.random.choice([0, 1], n_samples, p=[0.997, 0.003])
@@ -97,20 +99,21 @@ def main():
     paysim_df = create_sample_paysim(n_samples=10000)
     credit_df = create_sample_credit_card(n_samples=5000)
     
-    # Save raw sample data
+    # Save raw sample data (Parquet by default, see FraudDataLoader.columnar)
     from data.loader import FraudDataLoader
     loader = FraudDataLoader()
-    loader.save_processed(paysim_df, "sample_raw_paysim.csv")
-    loader.save_processed(credit_df, "sample_raw_credit_card.csv")
+    loader.save_processed(paysim_df, "sample_raw_paysim")
+    loader.save_processed(credit_df, "sample_raw_credit_card")
     
     logger.info("=" * 60)
     
     # 2. Engineer features
     logger.info("Engineering features...")
-    combined_df = engineer_features(paysim_df, credit_df)
+    engineer = FraudFeatureEngineer(cache=FeatureCache("data/cache/features"))
+    combined_df = engineer_features(paysim_df, credit_df, engineer=engineer)
     
     # Save processed data
-    loader.save_processed(combined_df, "sample_combined_features.csv")
+    loader.save_processed(combined_df, "sample_combined_features")
     
     logger.info("=" * 60)
     
@@ -125,6 +128,9 @@ def main():
     y_train.to_csv("data/processed/sample_y_train.csv", index=False)
     y_test.to_csv("data/processed/sample_y_test.csv", index=False)
     
+    # Serving-time feature plan (training column order + statistics)
+    FeaturePlan.fit(X_train.columns, engineer).save("models/sample_feature_plan.json")
+    
     logger.info("=" * 60)
     logger.info("Chat 1 Complete (SAMPLE MODE)!")
     logger.info(f"Ready for Chat 2: Model Training")
@@ -10,6 +10,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
 import logging
 from datetime import datetime
+from models.feature_matrix import FeatureMatrixStore
 from models.trainer import FraudModelTrainer
 from models.visualizer import ModelVisualizer
 import pandas as pd
@@ -59,6 +60,10 @@ def main():
         logger.info("-" * 70)
         metrics = trainer.evaluate_model(X_test, y_test)
         
+        # Cross-validation (folds stored once next to the mapped training matrix)
+        if FeatureMatrixStore("data/processed").is_fresh('train', sources=["data/processed/X_train.csv"]):
+            trainer.cross_validate("data/processed", n_folds=5, n_jobs=2)
+        
         # Generate predictions for visualization
         y_pred_proba = model.predict_proba(X_test)[:, 1]
         y_pred = (y_pred_proba >= 0.5).astype(int)
@@ -15,6 +15,8 @@ import logging
 # Add src to path if needed
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
+from models.feature_matrix import FeatureMatrixStore
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s'
@@ -37,11 +39,16 @@ def main():
     models_dir.mkdir(exist_ok=True)
     reports_dir.mkdir(exist_ok=True)
     
-    # Load data
-    X_train = pd.read_csv(data_dir / "X_train.csv")
-    y_train = pd.read_csv(data_dir / "y_train.csv").squeeze()
-    X_test = pd.read_csv(data_dir / "X_test.csv")
-    y_test = pd.read_csv(data_dir / "y_test.csv").squeeze()
+    # Load data (memory-mapped matrices when available and newer than the CSVs)
+    store = FeatureMatrixStore(data_dir)
+    sources = [data_dir / f"{name}.csv" for name in ("X_train", "y_train", "X_test", "y_test")]
+    if store.is_fresh('train', 'test', sources=sources):
+        X_train, y_train, X_test, y_test = store.load_splits()
+    else:
+        X_train = pd.read_csv(data_dir / "X_train.csv")
+        y_train = pd.read_csv(data_dir / "y_train.csv").squeeze()
+        X_test = pd.read_csv(data_dir / "X_test.csv")
+        y_test = pd.read_csv(data_dir / "y_test.csv").squeeze()
     
     print(f"Training on {len(X_train):,} samples...")
     
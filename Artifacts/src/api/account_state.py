@@ -0,0 +1,356 @@
+"""
+In-process per-account state for online velocity features
+Mirrors the batch window features in src/data/feature_engineering.py
+"""
+
+import logging
+import math
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence
+
+from ..data.feature_registry import window_label
+from ..data.sketches import CountMinSketch, HyperLogLog
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CounterpartyWindow:
+    """
+    Per-step buckets of counterparties of one account.
+
+    Backs sender->receiver pair counts and distinct-sender fan-in. Buckets
+    live in a ring of ``max(windows)`` slots and running per-window counts
+    are updated as buckets expire, so each update only touches the buckets
+    that leave a window. A bucket keeps at most ``max_per_step``
+    counterparties; further new ones in that step are dropped, making the
+    counts a lower bound for extremely busy accounts.
+    """
+
+    __slots__ = ("windows", "ring_size", "max_per_step", "slot_steps", "slots", "window_counts", "last_step")
+
+    def __init__(self, windows: Sequence[int], max_per_step: int = 256):
+        self.windows = tuple(windows)
+        self.ring_size = max(self.windows)
+        self.max_per_step = max_per_step
+        self.slot_steps = [None] * self.ring_size
+        self.slots: list = [None] * self.ring_size
+        self.window_counts: list = [{} for _ in self.windows]
+        self.last_step = None
+
+    def _expire(self, window_counts: Dict[str, int], step: int):
+        """Remove the bucket of ``step`` from one window's running counts"""
+        slot = step % self.ring_size
+        if self.slot_steps[slot] != step:
+            return
+        for counterparty, count in self.slots[slot].items():
+            remaining = window_counts[counterparty] - count
+            if remaining:
+                window_counts[counterparty] = remaining
+            else:
+                del window_counts[counterparty]
+
+    def add(self, counterparty: str, step: int):
+        """Record a transaction with ``counterparty`` at ``step``"""
+        if self.last_step is None:
+            self.last_step = step
+        elif step > self.last_step:
+            for i, window in enumerate(self.windows):
+                if step - self.last_step >= window:
+                    self.window_counts[i].clear()
+                    continue
+                for expired in range(self.last_step - window + 1, step - window + 1):
+                    self._expire(self.window_counts[i], expired)
+            self.last_step = step
+        elif step <= self.last_step - self.ring_size:
+            return
+
+        slot = step % self.ring_size
+        if self.slot_steps[slot] != step:
+            self.slot_steps[slot] = step
+            self.slots[slot] = {}
+        bucket = self.slots[slot]
+        if counterparty not in bucket and len(bucket) >= self.max_per_step:
+            return
+        bucket[counterparty] = bucket.get(counterparty, 0) + 1
+
+        for i, window in enumerate(self.windows):
+            if step > self.last_step - window:
+                counts = self.window_counts[i]
+                counts[counterparty] = counts.get(counterparty, 0) + 1
+
+    def count(self, counterparty: str, window: int) -> int:
+        """Transactions with ``counterparty`` in ``(last_step - window, last_step]``"""
+        return self.window_counts[self.windows.index(window)].get(counterparty, 0)
+
+    def distinct(self, window: int) -> int:
+        """Counterparties seen in ``(last_step - window, last_step]``"""
+        return len(self.window_counts[self.windows.index(window)])
+
+
+class AccountWindowState:
+    """
+    Bounded ring of per-step buckets for one account.
+
+    Keeps running count/sum totals for each window so updates and
+    queries are O(1) amortized; memory is fixed at ``max(windows)`` slots.
+    Lifetime amount mean/M2 are maintained with Welford's update.
+    """
+
+    __slots__ = (
+        "windows", "ring_size", "slot_steps", "slot_counts", "slot_sums",
+        "window_counts", "window_sums", "last_step", "lifetime_count",
+        "amount_mean", "amount_m2", "counterparties", "distinct_sketch", "frequency_sketch"
+    )
+
+    def __init__(self, windows: Sequence[int], counterparty_windows: Sequence[int] = ()):
+        self.windows = tuple(windows)
+        self.ring_size = max(self.windows)
+        self.slot_steps = [None] * self.ring_size
+        self.slot_counts = [0] * self.ring_size
+        self.slot_sums = [0.0] * self.ring_size
+        self.window_counts = [0] * len(self.windows)
+        self.window_sums = [0.0] * len(self.windows)
+        self.last_step = None
+        self.lifetime_count = 0
+        self.amount_mean = 0.0
+        self.amount_m2 = 0.0
+        self.counterparties = CounterpartyWindow(counterparty_windows) if counterparty_windows else None
+        # Fixed-size lifetime sketches of counterparties (see src/data/sketches.py)
+        self.distinct_sketch = HyperLogLog()
+        self.frequency_sketch = None
+
+    def _slot_total(self, step: int):
+        """Count and sum stored for ``step`` (zero if the slot was reused)"""
+        slot = step % self.ring_size
+        if self.slot_steps[slot] != step:
+            return 0, 0.0
+        return self.slot_counts[slot], self.slot_sums[slot]
+
+    def advance(self, step: int):
+        """Move the window end to ``step``, expiring buckets that fall out"""
+        if self.last_step is None:
+            self.last_step = step
+            return
+        if step <= self.last_step:
+            return
+
+        for i, window in enumerate(self.windows):
+            if step - self.last_step >= window:
+                self.window_counts[i] = 0
+                self.window_sums[i] = 0.0
+                continue
+            # Steps in (last_step - window, step - window] leave the window
+            for expired in range(self.last_step - window + 1, step - window + 1):
+                count, amount = self._slot_total(expired)
+                self.window_counts[i] -= count
+                self.window_sums[i] -= amount
+
+        self.last_step = step
+
+    def add(self, step: int, amount: float):
+        """Record one transaction at ``step``"""
+        self.advance(step)
+        self.lifetime_count += 1
+        delta = amount - self.amount_mean
+        self.amount_mean += delta / self.lifetime_count
+        self.amount_m2 += delta * (amount - self.amount_mean)
+
+        # Late events older than the ring only count towards lifetime totals
+        if step <= self.last_step - self.ring_size:
+            return
+
+        slot = step % self.ring_size
+        if self.slot_steps[slot] != step:
+            self.slot_steps[slot] = step
+            self.slot_counts[slot] = 0
+            self.slot_sums[slot] = 0.0
+        self.slot_counts[slot] += 1
+        self.slot_sums[slot] += amount
+
+        for i, window in enumerate(self.windows):
+            if step > self.last_step - window:
+                self.window_counts[i] += 1
+                self.window_sums[i] += amount
+
+    def behaviour(self, step: int, amount: float) -> Dict[str, float]:
+        """
+        Point-in-time features of a new transaction from earlier ones only.
+
+        Mirrors ``account_running_stats`` in src/data/window_features.py;
+        call before ``add``.
+        """
+        if self.lifetime_count == 0:
+            return {
+                "time_since_last_transaction": -1,
+                "account_amount_mean": 0.0,
+                "account_amount_std": 0.0,
+                "amount_deviation_from_avg": 0.0
+            }
+        std = math.sqrt(max(self.amount_m2, 0.0) / self.lifetime_count)
+        return {
+            "time_since_last_transaction": step - self.last_step,
+            "account_amount_mean": self.amount_mean,
+            "account_amount_std": std,
+            "amount_deviation_from_avg": (amount - self.amount_mean) / std if std > 0 else 0.0
+        }
+
+    def totals(self, window: int):
+        """(count, sum) over ``(last_step - window, last_step]``"""
+        i = self.windows.index(window)
+        return self.window_counts[i], self.window_sums[i]
+
+
+class AccountStateStore:
+    """
+    LRU-bounded map of account id -> AccountWindowState.
+
+    Senders and receivers are tracked separately. Accounts idle for more
+    than ``idle_steps`` are dropped, and the least recently seen account is
+    evicted once ``max_accounts`` is reached.
+
+    Eviction forgets the whole account, including its lifetime aggregates:
+    when it is seen again, ``transaction_count`` restarts at 1,
+    ``is_first_transaction`` is 1 and the running amount mean/std start
+    over. Evictions are counted in ``size()`` so the rate at which that
+    happens can be monitored; raise ``max_accounts``/``idle_steps`` if it
+    matters for the model.
+    """
+
+    def __init__(
+        self,
+        sender_windows: Sequence[int] = (1, 24),
+        receiver_windows: Sequence[int] = (1, 24),
+        pair_windows: Sequence[int] = (24, 168),
+        fan_in_windows: Sequence[int] = (24,),
+        max_accounts: int = 1_000_000,
+        idle_steps: int = 168
+    ):
+        self.sender_windows = tuple(sender_windows)
+        self.receiver_windows = tuple(receiver_windows)
+        self.pair_windows = tuple(pair_windows)
+        self.fan_in_windows = tuple(fan_in_windows)
+        self.max_accounts = max_accounts
+        self.idle_steps = idle_steps
+        self._senders: "OrderedDict[str, AccountWindowState]" = OrderedDict()
+        self._receivers: "OrderedDict[str, AccountWindowState]" = OrderedDict()
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def _touch(
+        self,
+        table: OrderedDict,
+        account: str,
+        windows: Sequence[int],
+        counterparty_windows: Sequence[int] = ()
+    ) -> AccountWindowState:
+        """Fetch (or create) an account and mark it most recently used"""
+        state = table.get(account)
+        if state is None:
+            state = AccountWindowState(windows, counterparty_windows)
+            table[account] = state
+            if len(table) > self.max_accounts:
+                table.popitem(last=False)
+                self._evictions += 1
+        else:
+            table.move_to_end(account)
+        return state
+
+    def _evict_idle(self, table: OrderedDict, current_step: int):
+        """Drop least recently used accounts whose last step is too old"""
+        while table:
+            account, state = next(iter(table.items()))
+            if state.last_step is None or current_step - state.last_step <= self.idle_steps:
+                break
+            table.popitem(last=False)
+            self._evictions += 1
+
+    def observe(
+        self,
+        name_orig: Optional[str],
+        name_dest: Optional[str],
+        step: int,
+        amount: float
+    ) -> Dict[str, float]:
+        """
+        Record a transaction and return its velocity features.
+
+        The counts include the transaction itself, matching the batch
+        ``(step - window, step]`` definition. ``transaction_count`` is the
+        sender's count to date including this transaction (since it was
+        last evicted), as in the batch feature.
+        The running amount features describe the sender's earlier
+        transactions only. Pair counts and receiver fan-in need both ids.
+
+        Args:
+            name_orig: Sender account id
+            name_dest: Receiver account id
+            step: Transaction time step (hours)
+            amount: Transaction amount
+
+        Returns:
+            Dictionary of velocity and behavioral features
+        """
+        features = {}
+        with self._lock:
+            if name_orig is not None:
+                self._evict_idle(self._senders, step)
+                sender = self._touch(self._senders, name_orig, self.sender_windows, self.pair_windows)
+                features.update(sender.behaviour(step, amount))
+                sender.add(step, amount)
+                for window in self.sender_windows:
+                    count, total = sender.totals(window)
+                    features[f"sender_velocity_{window}h"] = count
+                    features[f"amount_velocity_{window}h"] = total
+                features["is_first_transaction"] = int(sender.lifetime_count == 1)
+                features["transaction_count"] = sender.lifetime_count
+                if name_dest is not None and sender.counterparties is not None:
+                    sender.counterparties.add(name_dest, step)
+                    for window in self.pair_windows:
+                        features[f"pair_velocity_{window_label(window)}"] = \
+                            sender.counterparties.count(name_dest, window)
+                if name_dest is not None:
+                    if sender.frequency_sketch is None:
+                        sender.frequency_sketch = CountMinSketch()
+                    sender.distinct_sketch.add(name_dest)
+                    sender.frequency_sketch.add(name_dest)
+                    features["sender_distinct_dests_approx"] = sender.distinct_sketch.count()
+                    features["pair_frequency_approx"] = sender.frequency_sketch.estimate(name_dest)
+
+            if name_dest is not None:
+                self._evict_idle(self._receivers, step)
+                receiver = self._touch(self._receivers, name_dest, self.receiver_windows, self.fan_in_windows)
+                receiver.add(step, amount)
+                for window in self.receiver_windows:
+                    count, total = receiver.totals(window)
+                    features[f"receiver_velocity_{window}h"] = count
+                    features[f"dest_inflow_{window_label(window)}"] = total
+                if name_orig is not None and receiver.counterparties is not None:
+                    receiver.counterparties.add(name_orig, step)
+                    for window in self.fan_in_windows:
+                        features[f"dest_fan_in_{window_label(window)}"] = \
+                            receiver.counterparties.distinct(window)
+                if name_orig is not None:
+                    receiver.distinct_sketch.add(name_orig)
+                    features["dest_distinct_senders_approx"] = receiver.distinct_sketch.count()
+
+        return features
+
+    def size(self) -> Dict[str, int]:
+        """Number of tracked sender and receiver accounts, and evictions so far"""
+        return {"senders": len(self._senders), "receivers": len(self._receivers), "evictions": self._evictions}
+
+    def clear(self):
+        """Forget all account state"""
+        with self._lock:
+            self._senders.clear()
+            self._receivers.clear()
+            self._evictions = 0
+
+
+# Global account state instance
+account_state = AccountStateStore(
+    max_accounts=settings.account_state_max_accounts,
+    idle_steps=settings.account_state_idle_steps
+)
@@ -55,6 +55,10 @@ class Settings(BaseSettings):
     model_path: str = os.getenv("MODEL_PATH", "models/xgboost_fraud_latest.pkl")
     model_cache_enabled: bool = True
     
+    # Online account state (velocity features on the predict path)
+    account_state_max_accounts: int = int(os.getenv("ACCOUNT_STATE_MAX_ACCOUNTS", "1000000"))
+    account_state_idle_steps: int = int(os.getenv("ACCOUNT_STATE_IDLE_STEPS", "168"))  # 7 days of steps
+    
     # Logging
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
     
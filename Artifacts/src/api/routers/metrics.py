@@ -38,6 +38,11 @@ async def get_model_performance() -> Dict:
                     # Transform if needed to match expected format
                     if 'roc_auc' not in data and 'auc_roc' in data:
                         data['roc_auc'] = data['auc_roc']
+                    # Fold count of the cross-validation actually run, if any
+                    if 'cross_validation' in data:
+                        training_info = data.setdefault('training_info', {})
+                        training_info['cv_folds'] = data['cross_validation']['n_folds']
+                        training_info['cv_auc_roc'] = data['cross_validation'].get('auc_roc_mean')
                     return data
             except Exception as e:
                 continue
@@ -113,9 +118,46 @@ async def get_model_performance() -> Dict:
     }
 
 
+def _search_comparison(report: Dict, top: int = 5) -> Dict:
+    """Leaderboard of a hyperparameter search in the comparison format"""
+    models = []
+    for trial in report['leaderboard'][:top]:
+        params = trial['params']
+        models.append({
+            "name": f"XGBoost #{trial['id']} (depth {params.get('max_depth')}, lr {params.get('learning_rate')})",
+            "auc_roc": trial.get('auc_roc'),
+            "average_precision": trial.get('average_precision'),
+            "precision": trial.get('precision'),
+            "recall": trial.get('recall'),
+            "f1": trial.get('f1_score'),
+            "boosting_rounds": trial['rounds'],
+            "training_time": f"{trial['train_seconds']:.1f} s",
+            "inference_latency": f"{trial['single_row_latency_ms']:.2f}ms",
+            "latency_us_per_row": trial.get('latency_us_per_row'),
+            "hyperparameters": params,
+        })
+    return {
+        "models_compared": models,
+        "selection_rationale": (
+            f"Successive halving (eta={report['eta']}) over {len(report['leaderboard'])} configurations, "
+            f"ranked by {report['metric']} on {report['validation_rows']:,} held-out rows"
+        ),
+        "search_timestamp": report.get('timestamp'),
+    }
+
+
 @router.get("/comparison")
 async def get_model_comparison() -> Dict:
     """Compare multiple model approaches"""
+    # Latest hyperparameter search leaderboard, if one has been run
+    searches = sorted(Path("reports").glob("hyperparameter_search_*.json"))
+    for search_file in reversed(searches):
+        try:
+            with open(search_file, 'r') as f:
+                return _search_comparison(json.load(f))
+        except Exception:
+            continue
+    
     return {
         "models_compared": [
             {
@@ -6,7 +6,8 @@ Real-time fraud detection predictions
 import time
 import uuid
 import logging
-from typing import List
+from datetime import datetime
+from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
 from sqlalchemy.orm import Session
 
@@ -14,10 +15,14 @@ from ..schemas import (
     TransactionRequest,
     BatchTransactionRequest,
     PredictionResponse,
-    BatchPredictionResponse
+    BatchPredictionResponse,
+    FeedbackRequest,
+    FeedbackResponse
 )
 from ..database import get_db, TransactionLog
 from ..cache import cache
+from ..account_state import account_state
+from ...models.incremental import DEFAULT_LABEL_KEY
 
 logger = logging.getLogger(__name__)
 
@@ -29,9 +34,16 @@ def log_transaction(
     request_id: str,
     transaction: TransactionRequest,
     prediction: dict,
-    processing_time_ms: float
+    processing_time_ms: float,
+    account_features: Optional[dict] = None
 ):
-    """Log transaction to database (background task)"""
+    """
+    Log transaction to database (background task).
+    
+    ``features`` holds the request and the online account features it was
+    scored with, so confirmed labels (see ``/feedback``) can be replayed
+    through the feature plan for retraining.
+    """
     try:
         db_transaction = TransactionLog(
             request_id=request_id,
@@ -41,7 +53,7 @@ def log_transaction(
             is_fraud=bool(prediction["is_fraud"]),
             fraud_probability=prediction["fraud_probability"],
             threshold=prediction["threshold"],
-            features=transaction.dict(),
+            features={**transaction.dict(), **(account_features or {})},
             prediction_timestamp=prediction.get("timestamp"),
             processing_time_ms=processing_time_ms,
             model_version="1.0.0"  # TODO: Get from model metadata after Chat 2
@@ -53,6 +65,18 @@ def log_transaction(
         db.rollback()
 
 
+def observe_account_features(transaction: TransactionRequest) -> dict:
+    """Update online account state and return velocity features"""
+    if transaction.step is None or (transaction.nameOrig is None and transaction.nameDest is None):
+        return {}
+    return account_state.observe(
+        transaction.nameOrig,
+        transaction.nameDest,
+        transaction.step,
+        transaction.amount
+    )
+
+
 @router.post("/predict", response_model=PredictionResponse)
 async def predict_single(
     transaction: TransactionRequest,
@@ -77,7 +101,8 @@ async def predict_single(
     start_time = time.time()
     
     try:
-        # Check cache first
+        # Check cache first: an identical request is a retry, so it is
+        # answered without being counted in the account state again
         cache_key = transaction.dict(exclude={"features"})
         cached_prediction = cache.get_prediction(cache_key)
         
@@ -88,6 +113,9 @@ async def predict_single(
                 request_id=request_id
             )
         
+        # Only transactions that are scored update the account state
+        account_features = observe_account_features(transaction)
+        
         # TODO: Load model and make prediction after Chat 2 completes
         # For now, return placeholder response
         logger.warning("Model not loaded. Returning placeholder prediction.")
@@ -97,7 +125,7 @@ async def predict_single(
             "is_fraud": 0,
             "fraud_probability": 0.25,  # Placeholder
             "threshold": 0.5,
-            "timestamp": None
+            "timestamp": datetime.utcnow()
         }
         
         processing_time_ms = (time.time() - start_time) * 1000
@@ -112,7 +140,8 @@ async def predict_single(
             request_id,
             transaction,
             prediction_result,
-            processing_time_ms
+            processing_time_ms,
+            account_features
         )
         
         return PredictionResponse(
@@ -156,16 +185,28 @@ async def predict_batch(
         logger.warning("Model not loaded. Returning placeholder batch predictions.")
         
         for transaction in request.transactions:
+            item_start = time.time()
+            account_features = observe_account_features(transaction)
+            
             # Placeholder prediction (will be replaced after Chat 2)
             prediction_result = {
                 "is_fraud": 0,
                 "fraud_probability": 0.25,  # Placeholder
                 "threshold": request.threshold or 0.5,
-                "timestamp": None,
+                "timestamp": datetime.utcnow(),
                 "request_id": str(uuid.uuid4())
             }
             
             predictions.append(PredictionResponse(**prediction_result))
+            background_tasks.add_task(
+                log_transaction,
+                db,
+                prediction_result["request_id"],
+                transaction,
+                prediction_result,
+                (time.time() - item_start) * 1000,
+                account_features
+            )
             
             if prediction_result["is_fraud"]:
                 fraud_count += 1
@@ -184,3 +225,36 @@ async def predict_batch(
         logger.error(f"Batch prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
+
+@router.post("/feedback", response_model=FeedbackResponse)
+async def record_feedback(
+    feedback: FeedbackRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Record the confirmed outcome of a scored transaction.
+    
+    The label is stored under ``confirmed_fraud`` in the logged features,
+    where ``scripts/retrain_incremental.py`` picks it up.
+    
+    Args:
+        feedback: Request ID and confirmed label
+        db: Database session
+        
+    Returns:
+        Acknowledgement of the recorded label
+    """
+    log = db.query(TransactionLog).filter(TransactionLog.request_id == feedback.request_id).first()
+    if log is None:
+        raise HTTPException(status_code=404, detail=f"Unknown request_id: {feedback.request_id}")
+    
+    # Assign a new dict so the JSON column is flagged as modified
+    log.features = {**(log.features or {}), DEFAULT_LABEL_KEY: feedback.is_fraud}
+    try:
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Failed to record feedback: {e}")
+        raise HTTPException(status_code=500, detail=f"Feedback failed: {str(e)}")
+    
+    return FeedbackResponse(request_id=feedback.request_id, is_fraud=feedback.is_fraud)
@@ -19,6 +19,8 @@ class TransactionRequest(BaseModel):
     newbalanceOrig: Optional[float] = Field(None, description="Original balance after transaction")
     oldbalanceDest: Optional[float] = Field(None, description="Destination balance before transaction")
     newbalanceDest: Optional[float] = Field(None, description="Destination balance after transaction")
+    nameOrig: Optional[str] = Field(None, description="Sender account ID (enables velocity features)")
+    nameDest: Optional[str] = Field(None, description="Receiver account ID (enables velocity features)")
     
     # Additional feature fields (will be expanded based on Chat 1 features)
     hour: Optional[int] = Field(None, ge=0, le=23, description="Hour of day")
@@ -38,6 +40,8 @@ class TransactionRequest(BaseModel):
                 "newbalanceOrig": 4000.0,
                 "oldbalanceDest": 10000.0,
                 "newbalanceDest": 11000.0,
+                "nameOrig": "C1231006815",
+                "nameDest": "M1979787155",
                 "hour": 15,
                 "day_of_week": 3,
                 "month": 12
@@ -85,6 +89,21 @@ class ExplainRequest(BaseModel):
         }
 
 
+class FeedbackRequest(BaseModel):
+    """Confirmed outcome of a previously scored transaction"""
+    
+    request_id: str = Field(..., description="Request ID returned by /predict")
+    is_fraud: int = Field(..., ge=0, le=1, description="Confirmed label (0=legitimate, 1=fraud)")
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "request_id": "req_123456",
+                "is_fraud": 1
+            }
+        }
+
+
 # ===== Response Schemas =====
 
 class PredictionResponse(BaseModel):
@@ -136,6 +155,14 @@ class BatchPredictionResponse(BaseModel):
         }
 
 
+class FeedbackResponse(BaseModel):
+    """Acknowledgement of a recorded label"""
+    
+    request_id: str = Field(..., description="Labeled request ID")
+    is_fraud: int = Field(..., description="Recorded label")
+    timestamp: datetime = Field(default_factory=datetime.utcnow, description="Time the label was recorded")
+
+
 class FeatureExplanation(BaseModel):
     """Individual feature contribution to prediction"""
     
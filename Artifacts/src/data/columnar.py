@@ -0,0 +1,223 @@
+"""
+Columnar storage for the raw Kaggle datasets.
+
+Parsing the PaySim CSV (470 MB) dominates load time, so each raw CSV is
+converted once to a compressed Parquet or Feather copy with an explicit,
+lossless dtype map. Later loads read only the projected columns and push
+row filters down to the file, skipping row groups whose statistics rule
+them out.
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .feature_registry import PAYSIM_TRANSACTION_TYPES
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = ds = pq = None
+
+COLUMNAR_FORMATS = {'parquet': '.parquet', 'feather': '.feather'}
+
+# Lossless storage dtypes; compact loading downcasts further after reading
+PAYSIM_COLUMNAR_DTYPES = {
+    'step': np.int32,
+    'type': pd.CategoricalDtype(PAYSIM_TRANSACTION_TYPES),
+    'amount': np.float64,
+    'nameOrig': str,
+    'oldbalanceOrg': np.float64,
+    'newbalanceOrig': np.float64,
+    'nameDest': str,
+    'oldbalanceDest': np.float64,
+    'newbalanceDest': np.float64,
+    'isFraud': np.int8,
+    'isFlaggedFraud': np.int8,
+}
+
+CREDIT_CARD_COLUMNAR_DTYPES = {
+    'Time': np.float64,
+    **{f'V{i}': np.float64 for i in range(1, 29)},
+    'Amount': np.float64,
+    'Class': np.int8,
+}
+
+# (column, op, value) triples, ANDed together
+Filters = Sequence[Tuple[str, str, Any]]
+
+
+def _require_pyarrow():
+    if not PYARROW_AVAILABLE:
+        raise ImportError("Columnar storage requires pyarrow: pip install pyarrow")
+
+
+def columnar_format(path: Union[str, Path]) -> str:
+    """Storage format ('parquet' or 'feather') from a file suffix."""
+    suffix = Path(path).suffix
+    for fmt, extension in COLUMNAR_FORMATS.items():
+        if suffix == extension:
+            return fmt
+    raise ValueError(f"Unknown columnar suffix '{suffix}', expected one of {list(COLUMNAR_FORMATS.values())}")
+
+
+def convert_csv(
+    csv_path: Union[str, Path],
+    output_path: Union[str, Path],
+    dtype: Optional[Dict[str, Any]] = None,
+    compression: str = 'zstd',
+    chunksize: int = 1_000_000,
+    row_group_size: int = 250_000
+) -> Path:
+    """
+    Convert a CSV to Parquet/Feather in bounded memory.
+
+    The CSV is parsed chunk by chunk with ``dtype`` and appended to one file
+    (Parquet row groups or Feather record batches), written to a temporary
+    name and renamed, so an interrupted conversion never leaves a partial copy.
+
+    Args:
+        csv_path: Source CSV
+        output_path: Destination; the suffix selects the format
+        dtype: Column dtypes for parsing (None = inferred per chunk)
+        compression: Codec ('zstd', 'lz4', 'snappy', ...)
+        chunksize: CSV rows parsed at a time
+        row_group_size: Rows per Parquet row group (filter granularity)
+
+    Returns:
+        Path to the columnar file
+    """
+    _require_pyarrow()
+    csv_path, output_path = Path(csv_path), Path(output_path)
+    fmt = columnar_format(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+
+    logger.info(f"Converting {csv_path} to {fmt} ({compression})...")
+    writer = None
+    n_rows = 0
+    try:
+        for chunk in pd.read_csv(csv_path, dtype=dtype, chunksize=chunksize):
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                if fmt == 'parquet':
+                    writer = pq.ParquetWriter(tmp_path, schema, compression=compression)
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=compression)
+                    writer = pa.ipc.new_file(tmp_path, schema, options=options)
+            table = table.cast(schema)
+            if fmt == 'parquet':
+                writer.write_table(table, row_group_size=row_group_size)
+            else:
+                writer.write_table(table, max_chunksize=row_group_size)
+            n_rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    os.replace(tmp_path, output_path)
+    logger.info(
+        f"Wrote {n_rows:,} rows to {output_path} "
+        f"({csv_path.stat().st_size / 1024**2:,.1f} MB -> {output_path.stat().st_size / 1024**2:,.1f} MB)"
+    )
+    return output_path
+
+
+def ensure_columnar(
+    csv_path: Union[str, Path],
+    output_path: Union[str, Path],
+    dtype: Optional[Dict[str, Any]] = None,
+    **kwargs
+) -> Path:
+    """Convert ``csv_path`` unless an up-to-date columnar copy already exists."""
+    csv_path, output_path = Path(csv_path), Path(output_path)
+    if output_path.exists() and output_path.stat().st_mtime >= csv_path.stat().st_mtime:
+        return output_path
+    return convert_csv(csv_path, output_path, dtype=dtype, **kwargs)
+
+
+def _dataset(path: Union[str, Path]):
+    fmt = columnar_format(path)
+    return ds.dataset(str(path), format='parquet' if fmt == 'parquet' else 'ipc')
+
+
+def _filter_expression(filters: Optional[Filters]):
+    return pq.filters_to_expression(list(filters)) if filters else None
+
+
+def read_columnar(
+    path: Union[str, Path],
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None
+) -> pd.DataFrame:
+    """
+    Read a Parquet/Feather file with column projection and row filters.
+
+    Args:
+        path: Columnar file written by ``convert_csv`` or ``write_columnar``
+        columns: Columns to read (None = all)
+        filters: ``(column, op, value)`` triples ANDed together, e.g.
+            ``[('type', 'in', ['TRANSFER', 'CASH_OUT']), ('step', '<=', 400)]``
+
+    Returns:
+        DataFrame with the stored dtypes (categoricals restored)
+    """
+    _require_pyarrow()
+    table = _dataset(path).to_table(columns=columns, filter=_filter_expression(filters))
+    return table.to_pandas()
+
+
+def iter_columnar(
+    path: Union[str, Path],
+    columns: Optional[List[str]] = None,
+    batch_size: int = 500_000,
+    filters: Optional[Filters] = None
+) -> Iterator[pd.DataFrame]:
+    """Stream a columnar file as DataFrames of at most ``batch_size`` rows, in file order."""
+    _require_pyarrow()
+    scanner = _dataset(path).scanner(
+        columns=columns, filter=_filter_expression(filters), batch_size=batch_size
+    )
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def write_columnar(df: pd.DataFrame, path: Union[str, Path], compression: str = 'zstd') -> Path:
+    """Write a DataFrame to Parquet/Feather (format from the suffix)."""
+    _require_pyarrow()
+    path = Path(path)
+    if columnar_format(path) == 'parquet':
+        df.to_parquet(path, index=False, compression=compression)
+    else:
+        df.reset_index(drop=True).to_feather(path, compression=compression)
+    return path
+
+
+def apply_filters(df: pd.DataFrame, filters: Optional[Filters]) -> pd.DataFrame:
+    """In-memory equivalent of ``read_columnar`` filters (CSV fallback)."""
+    if not filters:
+        return df
+    operators = {
+        '==': lambda s, v: s == v, '=': lambda s, v: s == v, '!=': lambda s, v: s != v,
+        '<': lambda s, v: s < v, '<=': lambda s, v: s <= v,
+        '>': lambda s, v: s > v, '>=': lambda s, v: s >= v,
+        'in': lambda s, v: s.isin(v), 'not in': lambda s, v: ~s.isin(v),
+    }
+    mask = np.ones(len(df), dtype=bool)
+    for column, op, value in filters:
+        if op not in operators:
+            raise ValueError(f"Unsupported filter operator '{op}'")
+        mask &= operators[op](df[column], value).to_numpy(dtype=bool)
+    return df[mask].reset_index(drop=True)
@@ -0,0 +1,163 @@
+"""
+Compact in-memory representation of fraud datasets.
+Interns account IDs into integer codes with a persisted vocabulary, stores
+transaction type as a categorical and downcasts numeric columns.
+"""
+
+import logging
+from pathlib import Path
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .feature_registry import PAYSIM_TRANSACTION_TYPES
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_COLUMNS = ('nameOrig', 'nameDest')
+
+# read_csv dtypes for the raw PaySim log: parse straight into compact types
+PAYSIM_READ_DTYPES = {
+    'step': np.int32,
+    'type': pd.CategoricalDtype(PAYSIM_TRANSACTION_TYPES),
+    'amount': np.float32,
+    'oldbalanceOrg': np.float32,
+    'newbalanceOrig': np.float32,
+    'oldbalanceDest': np.float32,
+    'newbalanceDest': np.float32,
+    'isFraud': np.int8,
+    'isFlaggedFraud': np.int8,
+}
+
+
+class AccountVocabulary:
+    """
+    Append-only mapping from account ID strings to dense integer codes.
+
+    Codes are positions in the vocabulary, so they stay stable as new
+    accounts are added and can be shared by every account column (an
+    account that sends and receives gets one code). Persisted as a plain
+    text file with one ID per line.
+    """
+
+    def __init__(self, accounts: Optional[Iterable[str]] = None):
+        self._index = pd.Index(list(accounts) if accounts is not None else [], dtype=object)
+        if not self._index.is_unique:
+            raise ValueError("Account vocabulary contains duplicate IDs")
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    @property
+    def code_dtype(self) -> np.dtype:
+        """Smallest signed integer dtype that holds every code (and -1)."""
+        return np.dtype(np.int32) if len(self._index) < np.iinfo(np.int32).max else np.dtype(np.int64)
+
+    def encode(self, accounts, grow: bool = True) -> np.ndarray:
+        """
+        Map account IDs to codes.
+
+        Args:
+            accounts: Sequence of account ID strings
+            grow: Add unseen IDs to the vocabulary (False = code them -1)
+
+        Returns:
+            Integer code array (int32 unless the vocabulary outgrows it)
+        """
+        values = pd.Series(accounts).to_numpy(dtype=object)
+        codes = self._index.get_indexer(values)
+
+        unseen = codes < 0
+        if grow and unseen.any():
+            new_accounts = pd.unique(values[unseen])
+            self._index = self._index.append(pd.Index(new_accounts, dtype=object))
+            codes[unseen] = self._index.get_indexer(values[unseen])
+
+        return codes.astype(self.code_dtype, copy=False)
+
+    def decode(self, codes) -> np.ndarray:
+        """Map codes back to account ID strings (-1 becomes None)."""
+        codes = np.asarray(codes)
+        accounts = self._index.to_numpy()[np.where(codes >= 0, codes, 0)]
+        return np.where(codes >= 0, accounts, None)
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """Write one account ID per line (line number = code)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write('\n'.join(self._index.astype(str)))
+        logger.info(f"Saved {len(self):,} account IDs to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "AccountVocabulary":
+        """Load a vocabulary written by ``save``."""
+        with open(path, 'r') as f:
+            text = f.read()
+        return cls(text.split('\n') if text else [])
+
+    @classmethod
+    def load_or_create(cls, path: Union[str, Path]) -> "AccountVocabulary":
+        """Load the vocabulary at ``path`` if it exists, else start empty."""
+        return cls.load(path) if Path(path).exists() else cls()
+
+
+def downcast_numeric(df: pd.DataFrame, exclude: Iterable[str] = ()) -> pd.DataFrame:
+    """
+    Downcast float64 columns to float32 and integers to the smallest dtype.
+
+    Args:
+        df: DataFrame (modified in place)
+        exclude: Columns to leave untouched
+
+    Returns:
+        ``df``
+    """
+    exclude = set(exclude)
+    for column in df.columns:
+        if column in exclude:
+            continue
+        dtype = df[column].dtype
+        if pd.api.types.is_float_dtype(dtype) and dtype != np.float32:
+            df[column] = df[column].astype(np.float32)
+        elif pd.api.types.is_integer_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            df[column] = pd.to_numeric(df[column], downcast='integer')
+    return df
+
+
+def compact_paysim(df: pd.DataFrame, vocabulary: AccountVocabulary) -> pd.DataFrame:
+    """
+    Convert a raw PaySim frame to compact dtypes.
+
+    ``nameOrig``/``nameDest`` become vocabulary codes, ``type`` a categorical
+    with the fixed PaySim categories and numerics float32/small ints.
+    Columns already in compact form are left as they are.
+
+    Args:
+        df: Raw PaySim DataFrame (modified in place)
+        vocabulary: Shared account vocabulary (grown with unseen IDs)
+
+    Returns:
+        ``df``
+    """
+    before = df.memory_usage(deep=True).sum()
+
+    for column in ACCOUNT_COLUMNS:
+        if column in df.columns and not pd.api.types.is_integer_dtype(df[column].dtype):
+            df[column] = vocabulary.encode(df[column])
+
+    if 'type' in df.columns and not isinstance(df['type'].dtype, pd.CategoricalDtype):
+        df['type'] = df['type'].astype(PAYSIM_READ_DTYPES['type'])
+
+    downcast_numeric(df, exclude=ACCOUNT_COLUMNS)
+
+    after = df.memory_usage(deep=True).sum()
+    logger.info(f"Compacted PaySim: {before / 1024**2:,.1f} MB -> {after / 1024**2:,.1f} MB")
+    return df
+
+
+def compact_credit_card(df: pd.DataFrame) -> pd.DataFrame:
+    """Downcast Credit Card features to float32 (``Class`` to int8), in place."""
+    return downcast_numeric(df)
@@ -0,0 +1,209 @@
+"""
+Materialized feature cache for fraud detection.
+Stores engineered columns on disk keyed by raw-data fingerprint and feature
+definition, so unchanged inputs load instead of being recomputed. Frames read
+unchanged from a file are keyed on that file, whose content hash is only
+recomputed when its size or modification time changes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .feature_registry import FeatureSpec
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """SHA-256 of a raw DataFrame's column names, dtypes and row contents."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def fingerprint_bytes(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's contents, read ``block_size`` bytes at a time."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, write: Callable[[IO], None], mode: str = 'wb'):
+    """Write ``path`` through a temporary sibling and ``os.replace`` it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class FeatureCache:
+    """
+    Columnar on-disk cache of engineered features.
+
+    Layout: ``<cache_dir>/<dataset>/<fingerprint[:16]>/manifest.json`` plus one
+    ``.npy`` file per column. Each column is keyed by the hash of the raw data
+    fingerprint and the feature's ``signature()`` (definition, version and
+    parameters), so editing one feature only invalidates that column.
+    """
+
+    def __init__(self, cache_dir: Union[str, Path] = "data/cache/features"):
+        self.cache_dir = Path(cache_dir)
+
+    def fingerprint_source(self, df: pd.DataFrame, source: Dict[str, Any]) -> str:
+        """
+        Fingerprint of a frame read unchanged from a file.
+
+        Keyed on the file's content hash, the read options and the frame's
+        shape and dtypes, so the rows never have to be hashed.
+
+        Args:
+            df: Frame as read
+            source: ``{'path': file read, 'options': read options}`` (see
+                ``FraudDataLoader.sources``)
+        """
+        payload = {
+            'content': self.file_digest(source['path']),
+            'options': source.get('options'),
+            'rows': len(df),
+            'dtypes': [[str(c), str(t)] for c, t in df.dtypes.items()],
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def file_digest(self, path: Union[str, Path]) -> str:
+        """Content hash of ``path``, reused while its size and mtime are unchanged."""
+        path = Path(path).resolve()
+        stat = path.stat()
+        memo_path = self.cache_dir / "sources.json"
+        memo: Dict[str, Dict] = {}
+        if memo_path.exists():
+            with open(memo_path, 'r') as f:
+                memo = json.load(f)
+
+        entry: Optional[Dict] = memo.get(str(path))
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+
+        logger.info(f"Hashing {path} ({stat.st_size / 1024**2:,.1f} MB)...")
+        memo[str(path)] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': fingerprint_bytes(path)}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        _write_atomic(memo_path, lambda f: json.dump(memo, f, indent=2), mode='w')
+        return memo[str(path)]['sha256']
+
+    def _entry_dir(self, dataset: str, fingerprint: str) -> Path:
+        return self.cache_dir / dataset / fingerprint[:16]
+
+    @staticmethod
+    def column_key(spec: FeatureSpec, fingerprint: str) -> str:
+        """Cache key for one feature computed from one raw input."""
+        payload = json.dumps({'fingerprint': fingerprint, **spec.signature()}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def _read_manifest(self, entry_dir: Path) -> Dict:
+        manifest_path = entry_dir / "manifest.json"
+        if not manifest_path.exists():
+            return {'columns': {}}
+        with open(manifest_path, 'r') as f:
+            return json.load(f)
+
+    def load(
+        self,
+        dataset: str,
+        fingerprint: str,
+        specs: List[FeatureSpec],
+        n_rows: int
+    ) -> Tuple[Dict[str, np.ndarray], List[FeatureSpec]]:
+        """
+        Look up cached columns.
+
+        Args:
+            dataset: Dataset name ('paysim', 'credit_card')
+            fingerprint: Raw input fingerprint
+            specs: Features wanted
+            n_rows: Expected row count (guards against truncated files)
+
+        Returns:
+            ({name: values} for hits, [specs] that must be computed)
+        """
+        entry_dir = self._entry_dir(dataset, fingerprint)
+        manifest = self._read_manifest(entry_dir)
+
+        hits, misses = {}, []
+        for spec in specs:
+            entry = manifest['columns'].get(spec.name)
+            path = entry_dir / f"{entry['key']}.npy" if entry else None
+            if (
+                entry is None
+                or entry['key'] != self.column_key(spec, fingerprint)
+                or entry['rows'] != n_rows
+                or not path.exists()
+            ):
+                misses.append(spec)
+                continue
+            hits[spec.name] = np.load(path, allow_pickle=False)
+
+        logger.info(
+            f"Feature cache ({dataset}): {len(hits)} columns loaded, {len(misses)} to compute"
+        )
+        return hits, misses
+
+    def save(
+        self,
+        dataset: str,
+        fingerprint: str,
+        specs: List[FeatureSpec],
+        features_df: pd.DataFrame
+    ):
+        """
+        Store computed columns and update the manifest.
+
+        Args:
+            dataset: Dataset name
+            fingerprint: Raw input fingerprint
+            specs: Features to store (must be columns of ``features_df``)
+            features_df: Frame holding the computed columns
+        """
+        if not specs:
+            return
+
+        entry_dir = self._entry_dir(dataset, fingerprint)
+        entry_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._read_manifest(entry_dir)
+        manifest.update({'dataset': dataset, 'fingerprint': fingerprint})
+
+        for spec in specs:
+            key = self.column_key(spec, fingerprint)
+            values = features_df[spec.name].to_numpy()
+            _write_atomic(entry_dir / f"{key}.npy", lambda f: np.save(f, values, allow_pickle=False))
+
+            # Drop the file of a superseded definition of this column
+            previous = manifest['columns'].get(spec.name)
+            if previous and previous['key'] != key:
+                (entry_dir / f"{previous['key']}.npy").unlink(missing_ok=True)
+
+            manifest['columns'][spec.name] = {
+                'key': key,
+                'rows': len(values),
+                'dtype': str(values.dtype),
+                'signature': spec.signature(),
+                'created': datetime.now().isoformat(),
+            }
+
+        # Readers only ever see a complete manifest and complete column files
+        _write_atomic(entry_dir / "manifest.json", lambda f: json.dump(manifest, f, indent=2), mode='w')
+
+        logger.info(f"Feature cache ({dataset}): stored {len(specs)} columns in {entry_dir}")
@@ -1,213 +1,595 @@
 """
 Feature engineering for fraud detection.
-Creates 95 engineered features from transaction data.
+Builds the features declared in feature_registry from transaction data.
 """
 
 import numpy as np
 import pandas as pd
-from typing import List, Dict
+from pathlib import Path
+from typing import List, Dict, Optional, Tuple, Union
 from sklearn.preprocessing import StandardScaler
 import logging
 
+from .columnar import COLUMNAR_FORMATS, Filters, apply_filters, iter_columnar
+from .compact_dtypes import AccountVocabulary
+from .feature_cache import FeatureCache, fingerprint_frame
+from .feature_registry import (
+    CREDIT_CARD_FEATURES,
+    PAYSIM_FEATURES,
+    FeatureSpec,
+    WindowAggregation,
+    compile_window_aggregations,
+    key_columns,
+    referenced_features,
+    resolve_features,
+)
+from .sketches import running_distinct_estimates, running_frequency_estimates
+from .window_features import (
+    account_history,
+    account_running_stats,
+    encode_pairs,
+    parallel_account_features,
+    rolling_window_aggregates,
+)
+
 logger = logging.getLogger(__name__)
 
 
+def _read_chunks(
+    source_path: Path,
+    chunksize: int,
+    columns: Optional[List[str]] = None,
+    filters: Optional[Filters] = None
+):
+    """Stream a CSV or columnar file in row order, ``chunksize`` rows at a time."""
+    if source_path.suffix in COLUMNAR_FORMATS.values():
+        return iter_columnar(source_path, columns=columns, batch_size=chunksize, filters=filters)
+    if not filters:
+        return pd.read_csv(source_path, usecols=columns, chunksize=chunksize)
+    usecols = list(dict.fromkeys(columns + [column for column, _, _ in filters])) if columns else None
+    chunks = pd.read_csv(source_path, usecols=usecols, chunksize=chunksize)
+    return (apply_filters(chunk, filters)[columns] if columns else apply_filters(chunk, filters) for chunk in chunks)
+
+
 class FraudFeatureEngineer:
     """Engineer features for fraud detection models."""
     
-    def __init__(self):
+    def __init__(
+        self,
+        n_jobs: int = 1,
+        features: Optional[List[str]] = None,
+        cache: Optional[FeatureCache] = None,
+        window_aggregations: Optional[List[WindowAggregation]] = None,
+        keep_types: Optional[List[str]] = None,
+        full_history: bool = True,
+        vocabulary: Optional[AccountVocabulary] = None
+    ):
+        """
+        Args:
+            n_jobs: Worker processes for per-account features (1 = in-process)
+            features: Engineered features to compute (None = all registered)
+            cache: Optional on-disk cache of engineered columns
+            window_aggregations: Extra declarative window blocks, appended
+                to the registered PaySim features
+            keep_types: Only engineer and output PaySim rows of these
+                transaction types (e.g. ``FRAUD_TRANSACTION_TYPES``)
+            full_history: With ``keep_types``, still count every row in the
+                account history (windows, running and sketch features);
+                False drops other rows at read time, before any work
+            vocabulary: Account vocabulary of compact frames; sketches hash
+                the decoded IDs so they match the serving-side sketches
+        """
+        self.n_jobs = n_jobs
+        self.features = features
+        self.cache = cache
+        self.keep_types = list(keep_types) if keep_types is not None else None
+        self.full_history = full_history
+        self.vocabulary = vocabulary
+        self.paysim_registry = dict(PAYSIM_FEATURES)
+        for name, spec in compile_window_aggregations(window_aggregations or []).items():
+            if name in self.paysim_registry:
+                raise ValueError(f"Window feature '{name}' is already registered")
+            self.paysim_registry[name] = spec
         self.scaler = StandardScaler()
         self.feature_names = []
+        self.amount_stats = None
+    
+    @classmethod
+    def for_model(
+        cls,
+        model,
+        n_jobs: int = 1,
+        window_aggregations: Optional[List[WindowAggregation]] = None
+    ) -> "FraudFeatureEngineer":
+        """
+        Create an engineer that only builds the features a booster splits on.
+        
+        Columns the model never references are skipped; use
+        ``feature_registry.align_to_model`` to zero-fill them before predicting.
+        
+        Args:
+            model: Fitted XGBClassifier or Booster with feature names
+            n_jobs: Worker processes for per-account features
+            window_aggregations: Extra window blocks the model was trained with
+        """
+        features = referenced_features(model)
+        engineer = cls(n_jobs=n_jobs, features=features, window_aggregations=window_aggregations)
+        skipped = [name for name in engineer.paysim_registry if name not in features]
+        if skipped:
+            logger.info(f"Skipping {len(skipped)} PaySim features unused by the model: {skipped}")
+        return engineer
     
-    def engineer_paysim_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def engineer_paysim_features(self, df: pd.DataFrame, source: Optional[Dict] = None) -> pd.DataFrame:
         """
         Engineer 50+ features from PaySim data.
         
         Args:
             df: Raw PaySim DataFrame
+            source: File ``df`` was read from unchanged (``FraudDataLoader.sources``);
+                the cache is then keyed on the file instead of the rows
             
         Returns:
             DataFrame with engineered features
         """
         logger.info("Engineering PaySim features...")
         
-        features_df = df.copy()
+        keep = None
+        if self.keep_types is not None:
+            keep = df['type'].isin(self.keep_types).to_numpy()
+            if not self.full_history:
+                df, keep = df[keep], None
         
-        # 1. Temporal features
-        features_df['hour'] = features_df['step'] % 24
-        features_df['day_of_week'] = (features_df['step'] // 24) % 7
-        features_df['is_weekend'] = (features_df['day_of_week'] >= 5).astype(int)
-        
-        # 2. Amount features
-        features_df['amount_log'] = np.log1p(features_df['amount'])
-        features_df['amount_sqrt'] = np.sqrt(features_df['amount'])
-        features_df['amount_normalized'] = (features_df['amount'] - features_df['amount'].mean()) / (features_df['amount'].std() + 1e-8)
-        
-        # 3. Balance features
-        features_df['orig_balance_diff'] = features_df['newbalanceOrig'] - features_df['oldbalanceOrg']
-        features_df['dest_balance_diff'] = features_df['newbalanceDest'] - features_df['oldbalanceDest']
-        features_df['balance_ratio_orig'] = features_df['newbalanceOrig'] / (features_df['oldbalanceOrg'] + 1)
-        features_df['balance_ratio_dest'] = features_df['newbalanceDest'] / (features_df['oldbalanceDest'] + 1)
-        
-        # 4. Transaction type encoding
-        type_dummies = pd.get_dummies(features_df['type'], prefix='type')
-        features_df = pd.concat([features_df, type_dummies], axis=1)
-        
-        # 5. Velocity features (frequency within time window) - optimized for performance
-        # Skip velocity calculations for very large datasets or use simplified version
-        if len(features_df) > 50000:
-            logger.info("Large dataset detected, using simplified velocity features...")
-            features_df['sender_velocity_1h'] = 0
-            features_df['sender_velocity_24h'] = 0
-            features_df['receiver_velocity_1h'] = 0
-            features_df['amount_velocity_1h'] = 0
-            features_df['amount_velocity_24h'] = 0
-        else:
-            logger.info("Calculating velocity features...")
-            features_df['sender_velocity_1h'] = self._calculate_velocity_optimized(
-                features_df, 'nameOrig', window_hours=1
-            )
-            features_df['sender_velocity_24h'] = self._calculate_velocity_optimized(
-                features_df, 'nameOrig', window_hours=24
-            )
-            features_df['receiver_velocity_1h'] = self._calculate_velocity_optimized(
-                features_df, 'nameDest', window_hours=1
-            )
-            
-            # 6. Amount velocity (total amount per time window)
-            features_df['amount_velocity_1h'] = self._calculate_amount_velocity_optimized(
-                features_df, 'nameOrig', window_hours=1
-            )
-            features_df['amount_velocity_24h'] = self._calculate_amount_velocity_optimized(
-                features_df, 'nameOrig', window_hours=24
-            )
+        features_df = df.copy()
         
-        # 7. Behavioral features
-        features_df['is_first_transaction'] = self._is_first_transaction(features_df, 'nameOrig')
-        features_df['transaction_count'] = self._transaction_count(features_df, 'nameOrig')
+        # Row statistics describe the rows the model scores
+        amounts = features_df['amount'] if keep is None else features_df['amount'][keep]
+        self.amount_stats = {
+            'mean': float(amounts.mean()),
+            'std': float(amounts.std())
+        }
         
-        # 8. Risk features
-        features_df['balance_depletion_orig'] = ((features_df['oldbalanceOrg'] == 0) & (features_df['newbalanceOrig'] == 0)).astype(int)
-        features_df['balance_depletion_dest'] = ((features_df['oldbalanceDest'] == 0) & (features_df['newbalanceDest'] == 0)).astype(int)
+        specs = resolve_features(self.paysim_registry, self.features)
+        features_df = self._apply_cached_feature_specs(
+            features_df, specs, self.amount_stats, self._paysim_dataset_key(), keep=keep, source=source
+        )
         
         logger.info(f"Engineered {len(features_df.columns)} total features")
         
         return features_df
     
-    def engineer_credit_card_features(self, df: pd.DataFrame) -> pd.DataFrame:
+    def engineer_paysim_features_chunked(
+        self,
+        source_path: Union[str, Path],
+        output_path: Union[str, Path],
+        chunksize: int = 500_000
+    ) -> Path:
         """
-        Engineer 40+ features from Credit Card Fraud data.
+        Engineer PaySim features out-of-core, writing each chunk as it goes.
+        
+        The raw log must be ordered by ``step`` (the Kaggle file is). A first
+        pass over ``amount``/``nameOrig`` collects global statistics; the
+        second pass streams full rows, carrying the trailing window of
+        ``step``/account/amount rows across chunk boundaries so velocity
+        features match ``engineer_paysim_features`` exactly. Rows of the last
+        (possibly incomplete) step of each chunk are held back to the next one.
+        
+        Peak memory is bounded by ``chunksize`` plus the window context and
+        per-account tables (the first row for ``is_first_transaction``, and
+        the count to date and running amount summary for the point-in-time
+        behavioural features).
+        
+        With ``keep_types`` only those rows are written. Without
+        ``full_history`` other rows are dropped while reading (pushed down
+        into Parquet/Feather sources); with it they are read for the account
+        history but skip row features and output.
         
         Args:
-            df: Raw Credit Card DataFrame
+            source_path: Raw PaySim CSV, or its Parquet/Feather copy
+            output_path: Destination CSV for engineered features
+            chunksize: Rows read per chunk
             
         Returns:
-            DataFrame with engineered features
+            Path to the engineered CSV
         """
-        logger.info("Engineering Credit Card features...")
+        source_path = Path(source_path)
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        logger.info(f"Engineering PaySim features in chunks of {chunksize:,} rows...")
+        
+        # Pass 1: amount statistics and per-account first row
+        self.amount_stats, account_table = self._scan_paysim_statistics(source_path, chunksize)
+        filters = self._read_filters()
+        
+        # Pass 2: stream, engineer and append
+        specs = resolve_features(self.paysim_registry, self.features)
+        window_columns = list(dict.fromkeys(
+            ['step', 'nameOrig', 'nameDest', 'amount']
+            + [spec.distinct for spec in specs if spec.family == 'window' and spec.distinct]
+        ))
+        max_window = max([spec.window for spec in specs if spec.family == 'window'], default=1)
+        context = None
+        running_state = {}
+        pending = None
+        position = 0
+        rows_written = 0
+        last_step = None
+        
+        if output_path.exists():
+            output_path.unlink()
+        
+        def flush(rows: pd.DataFrame, context: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+            nonlocal rows_written
+            engineered = self._engineer_paysim_chunk(rows, specs, context, account_table, running_state)
+            engineered.to_csv(output_path, mode='a', header=not output_path.exists(), index=False)
+            rows_written += len(engineered)
+            
+            # Keep only rows that can still fall inside a later window
+            history = pd.concat([context, rows[window_columns]], ignore_index=True) if context is not None else rows[window_columns]
+            return history[history['step'] > rows['step'].max() - max_window].reset_index(drop=True)
         
-        features_df = df.copy()
+        for chunk in _read_chunks(source_path, chunksize, filters=filters):
+            if len(chunk) == 0:
+                continue
+            chunk['_row'] = np.arange(position, position + len(chunk))
+            position += len(chunk)
+            
+            if last_step is not None and chunk['step'].iloc[0] < last_step:
+                raise ValueError("Chunked feature engineering requires the log to be sorted by step")
+            if not chunk['step'].is_monotonic_increasing:
+                raise ValueError("Chunked feature engineering requires the log to be sorted by step")
+            last_step = chunk['step'].iloc[-1]
+            
+            if pending is not None:
+                chunk = pd.concat([pending, chunk], ignore_index=True)
+            
+            # Hold back the last step: later chunks may add rows to it
+            complete = chunk['step'] < last_step
+            pending = chunk[~complete]
+            if complete.any():
+                context = flush(chunk[complete], context)
         
-        # 1. V features (already PCA-transformed, but add interactions)
-        v_cols = [f'V{i}' for i in range(1, 29)]
-        
-        # 2. Statistical features across V columns
-        features_df['v_mean'] = features_df[v_cols].mean(axis=1)
-        features_df['v_std'] = features_df[v_cols].std(axis=1)
-        features_df['v_min'] = features_df[v_cols].min(axis=1)
-        features_df['v_max'] = features_df[v_cols].max(axis=1)
-        features_df['v_range'] = features_df['v_max'] - features_df['v_min']
-        
-        # 3. Amount features
-        features_df['amount_log'] = np.log1p(features_df['Amount'])
-        features_df['amount_sqrt'] = np.sqrt(features_df['Amount'])
-        features_df['amount_cube'] = np.power(np.abs(features_df['Amount']), 1/3)
-        
-        # 4. Interaction features (top principal components)
-        features_df['v1_x_v2'] = features_df['V1'] * features_df['V2']
-        features_df['v3_x_v4'] = features_df['V3'] * features_df['V4']
-        features_df['v14_x_amount'] = features_df['V14'] * features_df['Amount']
-        features_df['v17_x_amount'] = features_df['V17'] * features_df['Amount']
-        
-        # 5. Time features (if available)
-        if 'Time' in features_df.columns:
-            features_df['time_hour'] = (features_df['Time'] / 3600) % 24
-            features_df['time_day'] = (features_df['Time'] / 86400) % 7
-            features_df['is_weekend'] = (features_df['time_day'] >= 5).astype(int)
+        if pending is not None and len(pending):
+            flush(pending, context)
         
-        logger.info(f"Engineered {len(features_df.columns)} total features")
+        logger.info(f"Wrote {rows_written:,} engineered rows to {output_path}")
         
-        return features_df
+        return output_path
     
-    def _calculate_velocity_optimized(self, df: pd.DataFrame, column: str, window_hours: int) -> np.ndarray:
-        """Calculate transaction frequency within time window (optimized version)."""
-        df_sorted = df.sort_values('step').reset_index(drop=True)
-        velocities = np.zeros(len(df_sorted))
-        
-        # Use groupby for better performance
-        for account in df_sorted[column].unique():
-            account_mask = df_sorted[column] == account
-            account_df = df_sorted[account_mask].copy()
-            
-            if len(account_df) == 0:
+    def _scan_paysim_statistics(self, source_path: Path, chunksize: int) -> Tuple[Dict, pd.DataFrame]:
+        """First pass: amount mean/std and per-account first row."""
+        n, mean, m2 = 0, 0.0, 0.0
+        first_rows = []
+        position = 0
+        
+        split_stats = self.keep_types is not None and self.full_history
+        columns = ['amount', 'nameOrig'] + (['type'] if split_stats else [])
+        
+        for chunk in _read_chunks(source_path, chunksize, columns=columns, filters=self._read_filters()):
+            if len(chunk) == 0:
                 continue
             
-            # Calculate velocity for this account
-            for idx, row in account_df.iterrows():
-                time_window_start = row['step'] - window_hours
-                count = len(account_df[
-                    (account_df['step'] > time_window_start) & 
-                    (account_df['step'] <= row['step'])
-                ])
-                velocities[idx] = count
-        
-        # Map back to original index
-        velocities_mapped = pd.Series(velocities, index=df_sorted.index)
-        velocities_reordered = velocities_mapped.reindex(df.index)
-        
-        return velocities_reordered.fillna(0).values
+            # Chan et al. parallel variance update (over the rows that are kept)
+            amounts = chunk['amount'].to_numpy(dtype=np.float64)
+            if split_stats:
+                amounts = amounts[chunk['type'].isin(self.keep_types).to_numpy()]
+            if len(amounts):
+                chunk_n = len(amounts)
+                chunk_mean = amounts.mean()
+                chunk_m2 = ((amounts - chunk_mean) ** 2).sum()
+                delta = chunk_mean - mean
+                total = n + chunk_n
+                mean += delta * chunk_n / total
+                m2 += chunk_m2 + delta ** 2 * n * chunk_n / total
+                n = total
+            
+            chunk_n = len(chunk)
+            rows = pd.Series(np.arange(position, position + chunk_n), index=chunk['nameOrig'])
+            position += chunk_n
+            first_rows.append(rows.groupby(level=0).min())
+            
+            # Fold partial tables together to keep memory per account, not per chunk
+            if len(first_rows) > 1:
+                first_rows = [pd.concat(first_rows).groupby(level=0).min()]
+        
+        std = np.sqrt(m2 / (n - 1)) if n > 1 else 0.0
+        account_table = pd.DataFrame({'first_row': first_rows[0]})
+        
+        return {'mean': float(mean), 'std': float(std)}, account_table
+    
+    def _read_filters(self) -> Optional[Filters]:
+        """Row filters applied while reading (``keep_types`` without full history)."""
+        if self.keep_types is None or self.full_history:
+            return None
+        return [('type', 'in', self.keep_types)]
+    
+    def _paysim_dataset_key(self) -> str:
+        """Cache namespace; filtered runs must not share columns with full ones."""
+        if self.keep_types is None:
+            return 'paysim'
+        return f"paysim[{','.join(sorted(self.keep_types))}{'+history' if self.full_history else ''}]"
+    
+    def _engineer_paysim_chunk(
+        self,
+        chunk: pd.DataFrame,
+        specs: List[FeatureSpec],
+        context: Optional[pd.DataFrame],
+        account_table: pd.DataFrame,
+        running_state: Dict[str, pd.DataFrame]
+    ) -> pd.DataFrame:
+        """Engineer one step-complete chunk using carried window context."""
+        rows = chunk['_row'].to_numpy()
+        features_df = chunk.drop(columns=['_row']).reset_index(drop=True)
+        keep = None
+        if self.keep_types is not None and self.full_history:
+            keep = features_df['type'].isin(self.keep_types).to_numpy()
+        
+        return self._apply_feature_specs(
+            features_df, specs, self.amount_stats,
+            context=context, account_table=account_table, rows=rows,
+            running_state=running_state, keep=keep
+        )
     
-    def _calculate_amount_velocity_optimized(self, df: pd.DataFrame, column: str, window_hours: int) -> np.ndarray:
-        """Calculate total amount within time window (optimized version)."""
-        df_sorted = df.sort_values('step').reset_index(drop=True)
-        amounts = np.zeros(len(df_sorted))
-        
-        # Use groupby for better performance
-        for account in df_sorted[column].unique():
-            account_mask = df_sorted[column] == account
-            account_df = df_sorted[account_mask].copy()
+    def _apply_feature_specs(
+        self,
+        features_df: pd.DataFrame,
+        specs: List[FeatureSpec],
+        stats: Dict[str, float],
+        context: Optional[pd.DataFrame] = None,
+        account_table: Optional[pd.DataFrame] = None,
+        rows: Optional[np.ndarray] = None,
+        running_state: Optional[Dict[str, pd.DataFrame]] = None,
+        keep: Optional[np.ndarray] = None
+    ) -> pd.DataFrame:
+        """
+        Add the requested registry features to ``features_df`` in registry order.
+        
+        Args:
+            features_df: Raw rows (columns are added in place)
+            specs: Resolved feature specs
+            stats: Dataset statistics for row features (amount mean/std)
+            context: Earlier rows that can still fall inside the windows (chunked mode)
+            account_table: Precomputed per-account first row (chunked mode)
+            rows: Global row positions of ``features_df`` (chunked mode)
+            running_state: Per-key running amount summaries carried between
+                calls, updated in place (chunked mode)
+            keep: Boolean mask of rows to return; account features still see
+                every row, row features are only computed for kept ones
+        """
+        account_values = self._account_feature_values(
+            features_df,
+            [spec for spec in specs if spec.family != 'row'],
+            context, account_table, rows, running_state
+        )
+        if keep is not None:
+            features_df = features_df[keep].copy()
+            account_values = {name: np.asarray(values)[keep] for name, values in account_values.items()}
+        
+        for spec in specs:
+            if spec.family == 'row':
+                features_df[spec.name] = spec.compute(features_df, stats)
+            else:
+                features_df[spec.name] = account_values[spec.name]
+        
+        return features_df
+    
+    def _apply_cached_feature_specs(
+        self,
+        features_df: pd.DataFrame,
+        specs: List[FeatureSpec],
+        stats: Dict[str, float],
+        dataset: str,
+        keep: Optional[np.ndarray] = None,
+        source: Optional[Dict] = None
+    ) -> pd.DataFrame:
+        """
+        Like ``_apply_feature_specs`` but loads unchanged columns from the cache.
+        
+        Only features whose definition or raw input changed are computed;
+        they are written back to the cache before returning. The raw input
+        is identified by ``source`` (the file it was read from) when given,
+        else by hashing every row.
+        """
+        if self.cache is None:
+            return self._apply_feature_specs(features_df, specs, stats, keep=keep)
+        
+        raw_columns = list(features_df.columns)
+        if source is not None:
+            fingerprint = self.cache.fingerprint_source(features_df, source)
+        else:
+            fingerprint = fingerprint_frame(features_df)
+        n_rows = len(features_df) if keep is None else int(keep.sum())
+        cached, missing = self.cache.load(dataset, fingerprint, specs, n_rows)
+        
+        features_df = self._apply_feature_specs(features_df, missing, stats, keep=keep)
+        self.cache.save(dataset, fingerprint, missing, features_df)
+        
+        for name, values in cached.items():
+            features_df[name] = values
+        
+        return features_df[raw_columns + [spec.name for spec in specs]]
+    
+    def _account_features(
+        self,
+        keys: pd.Series,
+        steps: pd.Series,
+        windows: Tuple[int, ...],
+        values: Optional[pd.Series] = None,
+        include_history: bool = False,
+        distinct: Optional[pd.Series] = None,
+        maxima: bool = False
+    ) -> Dict:
+        """Per-account window aggregates (and history), parallel when n_jobs > 1."""
+        if self.n_jobs > 1:
+            return parallel_account_features(
+                keys, steps, windows, values,
+                include_history=include_history, n_jobs=self.n_jobs,
+                distinct=distinct, maxima=maxima
+            )
+        return {
+            'windows': rolling_window_aggregates(
+                keys, steps, windows, values, distinct, maxima=maxima
+            ) if windows else {},
+            'history': account_history(keys, steps) if include_history else None
+        }
+    
+    def _account_feature_values(
+        self,
+        features_df: pd.DataFrame,
+        specs: List[FeatureSpec],
+        context: Optional[pd.DataFrame] = None,
+        account_table: Optional[pd.DataFrame] = None,
+        rows: Optional[np.ndarray] = None,
+        running_state: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Compute window, history and running features grouped by key column.
+        
+        Args:
+            features_df: Rows to compute features for
+            specs: Window, history and running specs to compute
+            context: Earlier rows (step/nameOrig/nameDest/amount) that can
+                still fall inside the windows of ``features_df``
+            account_table: Precomputed first rows (chunked mode)
+            rows: Global row positions matching ``account_table['first_row']``
+            running_state: Per-key running summaries and sketches of earlier
+                rows (chunked mode)
             
-            if len(account_df) == 0:
-                continue
+        Returns:
+            {feature name: values aligned with ``features_df``}
+        """
+        if not specs:
+            return {}
+        
+        frame = features_df
+        offset = 0
+        if context is not None and len(context):
+            frame = pd.concat([context, features_df[context.columns]], ignore_index=True)
+            offset = len(context)
+        
+        values = {}
+        for key in dict.fromkeys(spec.key for spec in specs):
+            key_specs = [spec for spec in specs if spec.key == key]
+            windows = tuple(sorted({spec.window for spec in key_specs if spec.family == 'window'}))
+            window_stats = {spec.stat for spec in key_specs if spec.family == 'window'}
+            needs_amount = bool(window_stats & {'sum', 'mean', 'max'})
+            distinct_columns = {spec.distinct for spec in key_specs if spec.stat == 'distinct'}
+            if len(distinct_columns) > 1:
+                raise ValueError(f"Only one distinct column per key is supported, got {distinct_columns} for {key}")
+            distinct_column = distinct_columns.pop() if distinct_columns else None
+            needs_history = any(spec.family == 'history' for spec in key_specs)
+            needs_running = any(spec.family == 'running' for spec in key_specs)
+            
+            logger.info(f"Calculating {len(key_specs)} account features for {key}...")
+            result = self._account_features(
+                self._key_values(frame, key), frame['step'], windows,
+                frame['amount'] if needs_amount else None,
+                include_history=needs_history and account_table is None,
+                distinct=frame[distinct_column] if distinct_column else None,
+                maxima='max' in window_stats
+            ) if windows or needs_history else {}
             
-            # Calculate amount velocity for this account
-            for idx, row in account_df.iterrows():
-                time_window_start = row['step'] - window_hours
-                total = account_df[
-                    (account_df['step'] > time_window_start) & 
-                    (account_df['step'] <= row['step'])
-                ]['amount'].sum()
-                amounts[idx] = total
-        
-        # Map back to original index
-        amounts_mapped = pd.Series(amounts, index=df_sorted.index)
-        amounts_reordered = amounts_mapped.reindex(df.index)
-        
-        return amounts_reordered.fillna(0).values
+            if needs_running:
+                # Earlier rows come from the carried summary, not the window context
+                running = account_running_stats(
+                    features_df[key], features_df['step'], features_df['amount'],
+                    state=running_state.get(key) if running_state is not None else None
+                )
+                if running_state is not None:
+                    running_state[key] = running['state']
+            
+            for spec in key_specs:
+                if spec.family == 'sketch':
+                    values[spec.name] = self._sketch_values(features_df, spec, running_state)
+                elif spec.family == 'running':
+                    values[spec.name] = running[spec.stat]
+                elif spec.family == 'window':
+                    values[spec.name] = result['windows'][spec.window][spec.stat][offset:]
+                elif account_table is None:
+                    values[spec.name] = result['history'][spec.stat][offset:]
+                else:
+                    accounts = account_table.reindex(features_df[key])
+                    if spec.stat == 'is_first':
+                        values[spec.name] = (accounts['first_row'].to_numpy() == rows).astype(int)
+                    else:
+                        values[spec.name] = self._running_counts(features_df[key], running_state, key)
+        
+        return values
+    
+    @staticmethod
+    def _running_counts(keys: pd.Series, running_state: Dict[str, pd.DataFrame], key: str) -> np.ndarray:
+        """Transactions to date per account in a step-ordered chunk, continuing carried counts."""
+        state_key = f"count:{key}"
+        earlier = running_state.get(state_key)
+        counts = keys.groupby(keys, sort=False).cumcount().to_numpy() + 1
+        if earlier is not None:
+            counts += earlier['count'].reindex(keys.to_numpy()).fillna(0).to_numpy(dtype=np.int64)
+        chunk_counts = keys.value_counts().rename('count').to_frame()
+        running_state[state_key] = chunk_counts if earlier is None else (
+            earlier.add(chunk_counts, fill_value=0).astype(np.int64)
+        )
+        return counts
+    
+    def _sketch_values(
+        self,
+        features_df: pd.DataFrame,
+        spec: FeatureSpec,
+        running_state: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> np.ndarray:
+        """Running sketch estimate for one spec, continuing carried sketch state."""
+        state_key = f"{spec.stat}:{spec.key}>{spec.distinct}"
+        estimator = running_distinct_estimates if spec.stat == 'distinct' else running_frequency_estimates
+        counterparties = features_df[spec.distinct]
+        if pd.api.types.is_integer_dtype(counterparties.dtype):
+            # Serving hashes raw IDs, so interned codes are decoded first
+            if self.vocabulary is None:
+                raise ValueError(
+                    f"'{spec.distinct}' holds interned account codes; pass the loader's "
+                    f"vocabulary to FraudFeatureEngineer to compute {spec.name}"
+                )
+            counterparties = self.vocabulary.decode(counterparties.to_numpy())
+        result = estimator(
+            features_df[spec.key], features_df['step'], counterparties,
+            state=running_state.get(state_key) if running_state is not None else None,
+            keep_state=running_state is not None
+        )
+        if running_state is not None:
+            running_state[state_key] = result['state']
+        return result['estimate']
     
-    def _is_first_transaction(self, df: pd.DataFrame, column: str) -> np.ndarray:
-        """Check if this is first transaction for account."""
-        df_sorted = df.sort_values('step')
-        is_first = ~df_sorted.duplicated(subset=column, keep='first')
-        
-        # Reorder to match original index
-        is_first_reordered = is_first.reindex(df.index)
-        return is_first_reordered.fillna(False).astype(int).values
+    @staticmethod
+    def _key_values(frame: pd.DataFrame, key: str):
+        """Key column values, or dense pair codes for composite 'a>b' keys."""
+        columns = key_columns(key)
+        if len(columns) == 1:
+            return frame[key]
+        return encode_pairs(frame[columns[0]], frame[columns[1]])
     
-    def _transaction_count(self, df: pd.DataFrame, column: str) -> np.ndarray:
-        """Count total transactions per account."""
-        counts = df.groupby(column).size()
-        return df[column].map(counts).fillna(0).values
+    def engineer_credit_card_features(self, df: pd.DataFrame, source: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Engineer 40+ features from Credit Card Fraud data.
+        
+        Args:
+            df: Raw Credit Card DataFrame
+            source: File ``df`` was read from unchanged (see ``engineer_paysim_features``)
+            
+        Returns:
+            DataFrame with engineered features
+        """
+        logger.info("Engineering Credit Card features...")
+        
+        features_df = df.copy()
+        
+        # Time features only apply when the Time column is available
+        specs = [
+            spec for spec in resolve_features(CREDIT_CARD_FEATURES, self.features)
+            if all(column in features_df.columns for column in spec.inputs)
+        ]
+        features_df = self._apply_cached_feature_specs(features_df, specs, {}, 'credit_card', source=source)
+        
+        logger.info(f"Engineered {len(features_df.columns)} total features")
+        
+        return features_df
     
     def combine_and_prepare(
         self, 
@@ -252,6 +634,7 @@ class FraudFeatureEngineer:
         
         # Combine
         combined_df = pd.concat([paysim_df, credit_df], ignore_index=True)
+        combined_df['dataset'] = combined_df['dataset'].astype('category')
         
         logger.info(f"Combined dataset: {len(combined_df):,} transactions")
         logger.info(f"Fraud rate: {combined_df['is_fraud'].mean():.4f}")
@@ -259,22 +642,40 @@ class FraudFeatureEngineer:
         return combined_df
 
 
-def engineer_features(paysim_df: pd.DataFrame, credit_df: pd.DataFrame) -> pd.DataFrame:
+def engineer_features(
+    paysim_df: pd.DataFrame,
+    credit_df: pd.DataFrame,
+    n_jobs: int = 1,
+    features: Optional[List[str]] = None,
+    cache_dir: Optional[str] = None,
+    engineer: Optional[FraudFeatureEngineer] = None,
+    sources: Optional[Dict[str, Dict]] = None
+) -> pd.DataFrame:
     """
     Main feature engineering function.
     
     Args:
         paysim_df: Raw PaySim DataFrame
         credit_df: Raw Credit Card DataFrame
+        n_jobs: Worker processes for per-account features
+        features: Engineered features to compute (None = all registered)
+        cache_dir: Directory of the on-disk feature cache (None = no caching)
+        engineer: Engineer to run instead of one built from the arguments
+            above; pass one to read its fitted ``amount_stats`` afterwards
+        sources: Files the frames were read from (``FraudDataLoader.sources``),
+            so cache lookups skip hashing the rows
         
     Returns:
         Combined DataFrame with engineered features
     """
-    engineer = FraudFeatureEngineer()
+    if engineer is None:
+        cache = FeatureCache(cache_dir) if cache_dir else None
+        engineer = FraudFeatureEngineer(n_jobs=n_jobs, features=features, cache=cache)
     
     # Engineer features for each dataset
-    paysim_engineered = engineer.engineer_paysim_features(paysim_df)
-    credit_engineered = engineer.engineer_credit_card_features(credit_df)
+    sources = sources or {}
+    paysim_engineered = engineer.engineer_paysim_features(paysim_df, sources.get('paysim'))
+    credit_engineered = engineer.engineer_credit_card_features(credit_df, sources.get('credit_card'))
     
     # Combine datasets
     combined = engineer.combine_and_prepare(
@@ -0,0 +1,355 @@
+"""
+Feature registry for fraud detection.
+Each engineered feature declares its raw inputs, cost and how it is computed,
+so pipelines can build only the columns a trained model actually uses.
+"""
+
+import numpy as np
+import pandas as pd
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when shared engineering code changes every feature (invalidates caches)
+FEATURE_ENGINEERING_VERSION = 1
+
+# Relative cost of computing a feature
+COST_ROW = 1        # vectorized expression over existing columns
+COST_HISTORY = 5    # one sort per account column
+COST_RUNNING = 8    # sort plus grouped cumulative sums per account column
+COST_SKETCH = 8     # sort plus grouped cummax/cumcount over sketch cells
+COST_WINDOW = 10    # sort plus searchsorted sweep per window
+
+# PaySim transaction types (fixed so dummy columns are stable across inputs)
+PAYSIM_TRANSACTION_TYPES = ['CASH_IN', 'CASH_OUT', 'DEBIT', 'PAYMENT', 'TRANSFER']
+
+# The only PaySim types that ever carry fraud
+FRAUD_TRANSACTION_TYPES = ['TRANSFER', 'CASH_OUT']
+
+V_COLUMNS = tuple(f'V{i}' for i in range(1, 29))
+
+# Composite keys join account columns with '>' (e.g. sender>receiver pairs)
+PAIR_KEY = 'nameOrig>nameDest'
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    Declaration of one engineered feature.
+
+    Row features carry a ``compute(df, stats)`` function. Account features
+    (``family`` 'window', 'history', 'running' or 'sketch') are computed per ``key``
+    column by the feature engineer so one sort serves all of them; a
+    ``key`` of 'a>b' groups by the (a, b) pair. ``distinct`` names the
+    counterparty column of 'distinct' window features and sketches.
+    Bump ``version`` when a feature's definition changes so cached
+    columns are recomputed.
+    """
+
+    name: str
+    inputs: Tuple[str, ...]
+    cost: int
+    family: str = 'row'
+    compute: Optional[Callable[[pd.DataFrame, Dict[str, Any]], Any]] = None
+    key: Optional[str] = None
+    window: Optional[int] = None
+    stat: Optional[str] = None
+    distinct: Optional[str] = None
+    version: int = 1
+
+    def signature(self) -> Dict[str, Any]:
+        """Everything that determines this feature's values besides the data."""
+        return {
+            'name': self.name,
+            'inputs': list(self.inputs),
+            'family': self.family,
+            'key': self.key,
+            'window': self.window,
+            'stat': self.stat,
+            'distinct': self.distinct,
+            'version': self.version,
+            'engine_version': FEATURE_ENGINEERING_VERSION,
+        }
+
+
+def _row(name: str, inputs: Tuple[str, ...], compute) -> FeatureSpec:
+    return FeatureSpec(name=name, inputs=inputs, cost=COST_ROW, compute=compute)
+
+
+def key_columns(key: str) -> Tuple[str, ...]:
+    """Raw columns behind a (possibly composite) account key."""
+    return tuple(key.split('>'))
+
+
+def _window(name: str, key: str, window: int, stat: str, distinct: Optional[str] = None) -> FeatureSpec:
+    uses_amount = stat in ('sum', 'mean', 'max')
+    inputs = ('step',) + key_columns(key) + (('amount',) if uses_amount else ()) + ((distinct,) if distinct else ())
+    return FeatureSpec(
+        name=name, inputs=inputs, cost=COST_WINDOW, family='window',
+        key=key, window=window, stat=stat, distinct=distinct
+    )
+
+
+WINDOW_UNITS = {'h': 1, 'd': 24}
+WINDOW_AGGREGATIONS = ('count', 'sum', 'mean', 'max', 'distinct')
+
+
+def parse_window(window: Union[str, int]) -> int:
+    """Window length in steps (hours) from 6, '6h' or '7d'."""
+    if isinstance(window, (int, np.integer)):
+        return int(window)
+    unit = window[-1]
+    if unit not in WINDOW_UNITS or not window[:-1].isdigit():
+        raise ValueError(f"Invalid window '{window}': expected e.g. '6h' or '7d'")
+    return int(window[:-1]) * WINDOW_UNITS[unit]
+
+
+def window_label(window: int) -> str:
+    """Canonical window suffix (1 -> '1h', 168 -> '7d')."""
+    return f"{window // 24}d" if window > 24 and window % 24 == 0 else f"{window}h"
+
+
+@dataclass(frozen=True)
+class WindowAggregation:
+    """
+    Declarative block of window features: one key x windows x aggregations.
+
+    Compiles to window FeatureSpecs named ``{prefix}_{aggregation}_{window}``
+    (overridable per feature through ``names``, keyed ``'{aggregation}_{window}'``).
+    All blocks sharing a key are computed from one sort and one sweep over
+    every requested window by the feature engineer.
+
+    Example::
+
+        WindowAggregation(key='nameOrig', prefix='sender',
+                          windows=('1h', '6h', '24h', '7d'),
+                          aggregations=('count', 'sum', 'mean', 'max'))
+    """
+
+    key: str
+    prefix: str
+    windows: Tuple[Union[str, int], ...]
+    aggregations: Tuple[str, ...]
+    distinct: Optional[str] = None
+    names: Mapping[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        unknown = set(self.aggregations) - set(WINDOW_AGGREGATIONS)
+        if unknown:
+            raise ValueError(f"Unknown aggregations {sorted(unknown)}; expected {WINDOW_AGGREGATIONS}")
+        if 'distinct' in self.aggregations and not self.distinct:
+            raise ValueError("'distinct' aggregation needs the column to count distinct")
+        for window in self.windows:
+            parse_window(window)
+
+    @classmethod
+    def from_dict(cls, config: Mapping[str, Any]) -> "WindowAggregation":
+        """Build from a config mapping (e.g. parsed JSON/YAML)."""
+        return cls(
+            key=config['key'],
+            prefix=config['prefix'],
+            windows=tuple(config['windows']),
+            aggregations=tuple(config['aggregations']),
+            distinct=config.get('distinct'),
+            names=dict(config.get('names', {}))
+        )
+
+    def feature_specs(self) -> List[FeatureSpec]:
+        """Window FeatureSpecs in aggregation-major, window-minor order."""
+        specs = []
+        for aggregation in self.aggregations:
+            for window in self.windows:
+                steps = parse_window(window)
+                default = f"{self.prefix}_{aggregation}_{window_label(steps)}"
+                name = self.names.get(f"{aggregation}_{window_label(steps)}", default)
+                specs.append(_window(
+                    name, self.key, steps, aggregation,
+                    distinct=self.distinct if aggregation == 'distinct' else None
+                ))
+        return specs
+
+
+def compile_window_aggregations(blocks: Sequence[WindowAggregation]) -> Dict[str, FeatureSpec]:
+    """Ordered ``{name: FeatureSpec}`` for a list of aggregation blocks."""
+    registry: Dict[str, FeatureSpec] = {}
+    for block in blocks:
+        for spec in block.feature_specs():
+            if spec.name in registry:
+                raise ValueError(f"Duplicate window feature name '{spec.name}'")
+            registry[spec.name] = spec
+    return registry
+
+
+def _history(name: str, key: str, stat: str, version: int = 1) -> FeatureSpec:
+    return FeatureSpec(
+        name=name, inputs=('step', key), cost=COST_HISTORY, family='history',
+        key=key, stat=stat, version=version
+    )
+
+
+def _running(name: str, key: str, stat: str) -> FeatureSpec:
+    inputs = ('step', key) + (('amount',) if stat != 'time_since_last' else ())
+    return FeatureSpec(
+        name=name, inputs=inputs, cost=COST_RUNNING, family='running',
+        key=key, stat=stat
+    )
+
+
+def _sketch(name: str, key: str, counterparty: str, stat: str) -> FeatureSpec:
+    return FeatureSpec(
+        name=name, inputs=('step', key, counterparty), cost=COST_SKETCH, family='sketch',
+        key=key, stat=stat, distinct=counterparty
+    )
+
+
+def _type_dummy(type_name: str) -> FeatureSpec:
+    return _row(f'type_{type_name}', ('type',), lambda df, stats: df['type'] == type_name)
+
+
+# Window features of the PaySim set, declared per key; several blocks per key
+# still share one sort and sweep
+PAYSIM_WINDOW_AGGREGATIONS = [
+    # Velocity (frequency) and amount velocity of the sender
+    WindowAggregation('nameOrig', 'sender', ('1h', '24h'), ('count',),
+                      names={'count_1h': 'sender_velocity_1h', 'count_24h': 'sender_velocity_24h'}),
+    WindowAggregation('nameDest', 'receiver', ('1h',), ('count',),
+                      names={'count_1h': 'receiver_velocity_1h'}),
+    WindowAggregation('nameOrig', 'sender', ('1h', '24h'), ('sum',),
+                      names={'sum_1h': 'amount_velocity_1h', 'sum_24h': 'amount_velocity_24h'}),
+    # Counterparty features (mule detection)
+    WindowAggregation(PAIR_KEY, 'pair', ('24h', '7d'), ('count',),
+                      names={'count_24h': 'pair_velocity_24h', 'count_7d': 'pair_velocity_7d'}),
+    WindowAggregation('nameDest', 'dest', ('24h',), ('distinct',), distinct='nameOrig',
+                      names={'distinct_24h': 'dest_fan_in_24h'}),
+    WindowAggregation('nameDest', 'dest', ('1h', '24h'), ('sum',),
+                      names={'sum_1h': 'dest_inflow_1h', 'sum_24h': 'dest_inflow_24h'}),
+]
+
+_PAYSIM_WINDOW_FEATURES = compile_window_aggregations(PAYSIM_WINDOW_AGGREGATIONS)
+
+# PaySim features, in output column order
+PAYSIM_FEATURES: Dict[str, FeatureSpec] = {spec.name: spec for spec in [
+    # 1. Temporal features
+    _row('hour', ('step',), lambda df, stats: df['step'] % 24),
+    _row('day_of_week', ('step',), lambda df, stats: (df['step'] // 24) % 7),
+    _row('is_weekend', ('step',), lambda df, stats: (((df['step'] // 24) % 7) >= 5).astype(int)),
+
+    # 2. Amount features
+    _row('amount_log', ('amount',), lambda df, stats: np.log1p(df['amount'])),
+    _row('amount_sqrt', ('amount',), lambda df, stats: np.sqrt(df['amount'])),
+    _row('amount_normalized', ('amount',),
+         lambda df, stats: (df['amount'] - stats['mean']) / (stats['std'] + 1e-8)),
+
+    # 3. Balance features
+    _row('orig_balance_diff', ('newbalanceOrig', 'oldbalanceOrg'),
+         lambda df, stats: df['newbalanceOrig'] - df['oldbalanceOrg']),
+    _row('dest_balance_diff', ('newbalanceDest', 'oldbalanceDest'),
+         lambda df, stats: df['newbalanceDest'] - df['oldbalanceDest']),
+    _row('balance_ratio_orig', ('newbalanceOrig', 'oldbalanceOrg'),
+         lambda df, stats: df['newbalanceOrig'] / (df['oldbalanceOrg'] + 1)),
+    _row('balance_ratio_dest', ('newbalanceDest', 'oldbalanceDest'),
+         lambda df, stats: df['newbalanceDest'] / (df['oldbalanceDest'] + 1)),
+
+    # 4. Transaction type encoding
+    *[_type_dummy(type_name) for type_name in PAYSIM_TRANSACTION_TYPES],
+
+    # 5. Velocity, amount velocity and counterparty window features
+    *_PAYSIM_WINDOW_FEATURES.values(),
+
+    # 6. Behavioral features
+    _history('is_first_transaction', 'nameOrig', 'is_first'),
+    # v2: count to date (point-in-time, as served), not the lifetime total
+    _history('transaction_count', 'nameOrig', 'count', version=2),
+    _running('time_since_last_transaction', 'nameOrig', 'time_since_last'),
+    _running('account_amount_mean', 'nameOrig', 'mean'),
+    _running('account_amount_std', 'nameOrig', 'std'),
+    _running('amount_deviation_from_avg', 'nameOrig', 'deviation'),
+
+    # 7. Sketch-backed counterparty features (fixed memory per account)
+    _sketch('sender_distinct_dests_approx', 'nameOrig', 'nameDest', 'distinct'),
+    _sketch('dest_distinct_senders_approx', 'nameDest', 'nameOrig', 'distinct'),
+    _sketch('pair_frequency_approx', 'nameOrig', 'nameDest', 'frequency'),
+
+    # 8. Risk features
+    _row('balance_depletion_orig', ('oldbalanceOrg', 'newbalanceOrig'),
+         lambda df, stats: ((df['oldbalanceOrg'] == 0) & (df['newbalanceOrig'] == 0)).astype(int)),
+    _row('balance_depletion_dest', ('oldbalanceDest', 'newbalanceDest'),
+         lambda df, stats: ((df['oldbalanceDest'] == 0) & (df['newbalanceDest'] == 0)).astype(int)),
+]}
+
+
+# Credit Card features, in output column order
+CREDIT_CARD_FEATURES: Dict[str, FeatureSpec] = {spec.name: spec for spec in [
+    # 2. Statistical features across V columns
+    _row('v_mean', V_COLUMNS, lambda df, stats: df[list(V_COLUMNS)].mean(axis=1)),
+    _row('v_std', V_COLUMNS, lambda df, stats: df[list(V_COLUMNS)].std(axis=1)),
+    _row('v_min', V_COLUMNS, lambda df, stats: df[list(V_COLUMNS)].min(axis=1)),
+    _row('v_max', V_COLUMNS, lambda df, stats: df[list(V_COLUMNS)].max(axis=1)),
+    _row('v_range', V_COLUMNS,
+         lambda df, stats: df[list(V_COLUMNS)].max(axis=1) - df[list(V_COLUMNS)].min(axis=1)),
+
+    # 3. Amount features
+    _row('amount_log', ('Amount',), lambda df, stats: np.log1p(df['Amount'])),
+    _row('amount_sqrt', ('Amount',), lambda df, stats: np.sqrt(df['Amount'])),
+    _row('amount_cube', ('Amount',), lambda df, stats: np.power(np.abs(df['Amount']), 1/3)),
+
+    # 4. Interaction features (top principal components)
+    _row('v1_x_v2', ('V1', 'V2'), lambda df, stats: df['V1'] * df['V2']),
+    _row('v3_x_v4', ('V3', 'V4'), lambda df, stats: df['V3'] * df['V4']),
+    _row('v14_x_amount', ('V14', 'Amount'), lambda df, stats: df['V14'] * df['Amount']),
+    _row('v17_x_amount', ('V17', 'Amount'), lambda df, stats: df['V17'] * df['Amount']),
+
+    # 5. Time features (if available)
+    _row('time_hour', ('Time',), lambda df, stats: (df['Time'] / 3600) % 24),
+    _row('time_day', ('Time',), lambda df, stats: (df['Time'] / 86400) % 7),
+    _row('is_weekend', ('Time',), lambda df, stats: (((df['Time'] / 86400) % 7) >= 5).astype(int)),
+]}
+
+
+def resolve_features(
+    registry: Dict[str, FeatureSpec],
+    names: Optional[Iterable[str]] = None
+) -> List[FeatureSpec]:
+    """
+    Select feature specs in registry order.
+
+    Args:
+        registry: PAYSIM_FEATURES or CREDIT_CARD_FEATURES
+        names: Feature names to keep (None = all). Names the registry does
+            not know (raw columns, other datasets) are ignored.
+
+    Returns:
+        Ordered list of FeatureSpec
+    """
+    if names is None:
+        return list(registry.values())
+    wanted = set(names)
+    return [spec for name, spec in registry.items() if name in wanted]
+
+
+def booster_feature_names(model) -> List[str]:
+    """Input column names of a fitted XGBoost model (sklearn wrapper or Booster)."""
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    names = booster.feature_names
+    if names is None:
+        raise ValueError("Model was trained without feature names; cannot resolve features")
+    return list(names)
+
+
+def referenced_features(model) -> List[str]:
+    """
+    Columns the booster actually splits on, in input column order.
+
+    Columns with zero split count never change a prediction, so they can
+    be skipped during engineering and filled with 0 at inference time.
+    """
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    used = set(booster.get_score(importance_type='weight'))
+    return [name for name in booster_feature_names(model) if name in used]
+
+
+def align_to_model(features_df: pd.DataFrame, model) -> pd.DataFrame:
+    """Reorder to the model's input columns, filling skipped columns with 0."""
+    return features_df.reindex(columns=booster_feature_names(model), fill_value=0)
@@ -8,10 +8,33 @@ import logging
 from pathlib import Path
 import pandas as pd
 import numpy as np
-from typing import Tuple, Optional
+from typing import Dict, List, Tuple, Optional
+
+from .columnar import (
+    COLUMNAR_FORMATS,
+    CREDIT_CARD_COLUMNAR_DTYPES,
+    PAYSIM_COLUMNAR_DTYPES,
+    PYARROW_AVAILABLE,
+    Filters,
+    apply_filters,
+    ensure_columnar,
+    read_columnar,
+    iter_columnar,
+    write_columnar,
+)
+from .feature_registry import FRAUD_TRANSACTION_TYPES
+from .sampling import stratified_reservoir_sample
+from .compact_dtypes import (
+    PAYSIM_READ_DTYPES,
+    AccountVocabulary,
+    compact_credit_card,
+    compact_paysim,
+)
 
 logger = logging.getLogger(__name__)
 
+PAYSIM_CSV = "PS_20174392719_1491204439457_log.csv"
+
 # Try to import kaggle, but don't fail if it's not available or not configured
 try:
     import kaggle
@@ -25,32 +48,146 @@ except (ImportError, OSError) as e:
 class FraudDataLoader:
     """Load and manage fraud detection datasets."""
     
-    def __init__(self, data_dir: str = "data"):
+    def __init__(
+        self,
+        data_dir: str = "data",
+        compact: bool = False,
+        columnar: Optional[str] = 'parquet'
+    ):
+        """
+        Args:
+            data_dir: Root of the raw/processed data directories
+            compact: Load with compact dtypes (interned account IDs,
+                categorical ``type``, float32 numerics)
+            columnar: Format of the one-time columnar copy of each raw CSV
+                ('parquet' or 'feather'); None reads the CSVs directly.
+                Falls back to CSV when pyarrow is not installed.
+        """
+        if columnar is not None and columnar not in COLUMNAR_FORMATS:
+            raise ValueError(f"Unknown columnar format '{columnar}', expected one of {list(COLUMNAR_FORMATS)}")
+        if columnar is not None and not PYARROW_AVAILABLE:
+            logger.warning("pyarrow not available, reading raw CSVs without a columnar copy")
+            columnar = None
+        
         self.data_dir = Path(data_dir)
         self.raw_dir = self.data_dir / "raw"
         self.processed_dir = self.data_dir / "processed"
+        self.compact = compact
+        self.columnar = columnar
+        self.vocabulary_path = self.processed_dir / "account_vocabulary.txt"
+        self._vocabulary = None
+        # Dataset name -> file the last frame was read from and how, so
+        # FeatureCache can key on the file instead of hashing the rows
+        self.sources: Dict[str, Dict] = {}
         
         # Create directories
         self.raw_dir.mkdir(parents=True, exist_ok=True)
         self.processed_dir.mkdir(parents=True, exist_ok=True)
     
-    def download_paysim(self) -> pd.DataFrame:
+    @property
+    def vocabulary(self) -> AccountVocabulary:
+        """Persisted account ID vocabulary (loaded on first use)."""
+        if self._vocabulary is None:
+            self._vocabulary = AccountVocabulary.load_or_create(self.vocabulary_path)
+        return self._vocabulary
+    
+    def columnar_path(self, csv_path: Path) -> Path:
+        """Location of the columnar copy of a raw CSV."""
+        return self.processed_dir / (Path(csv_path).stem + COLUMNAR_FORMATS[self.columnar])
+    
+    def _record_source(
+        self,
+        dataset: str,
+        path: Path,
+        columns: Optional[List[str]],
+        filters: Optional[Filters]
+    ):
+        """Remember which file (CSV or its columnar copy) ``dataset`` was read from."""
+        read_path = path if self.columnar is None else self.columnar_path(path)
+        self.sources[dataset] = {
+            'path': str(read_path),
+            'options': {'columns': columns, 'filters': filters, 'compact': self.compact},
+        }
+    
+    def _read_raw(
+        self,
+        path: Path,
+        dtype: dict,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None
+    ) -> pd.DataFrame:
+        """Read a raw CSV through its columnar copy (created on first use)."""
+        if self.columnar is None:
+            df = pd.read_csv(path, dtype=dtype, usecols=columns)
+            return apply_filters(df, filters)
+        columnar_path = ensure_columnar(path, self.columnar_path(path), dtype=dtype)
+        return read_columnar(columnar_path, columns=columns, filters=filters)
+    
+    def _read_paysim(
+        self,
+        path: Path,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None
+    ) -> pd.DataFrame:
+        """Read PaySim, interning account IDs when ``compact`` is set."""
+        if not self.compact:
+            df = self._read_raw(path, PAYSIM_COLUMNAR_DTYPES, columns, filters)
+        else:
+            if self.columnar is None:
+                df = apply_filters(pd.read_csv(path, dtype=PAYSIM_READ_DTYPES, usecols=columns), filters)
+            else:
+                df = self._read_raw(path, PAYSIM_COLUMNAR_DTYPES, columns, filters)
+            n_accounts = len(self.vocabulary)
+            compact_paysim(df, self.vocabulary)
+            if len(self.vocabulary) != n_accounts:
+                self.vocabulary.save(self.vocabulary_path)
+        self._record_source('paysim', path, columns, filters)
+        return df
+    
+    def _read_credit_card(
+        self,
+        path: Path,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None
+    ) -> pd.DataFrame:
+        """Read Credit Card, downcasting to float32 when ``compact`` is set."""
+        df = self._read_raw(path, CREDIT_CARD_COLUMNAR_DTYPES, columns, filters)
+        self._record_source('credit_card', path, columns, filters)
+        return compact_credit_card(df) if self.compact else df
+    
+    def download_paysim(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None,
+        fraud_types_only: bool = False
+    ) -> pd.DataFrame:
         """
         Download PaySim fraud dataset from Kaggle.
         
+        Args:
+            columns: Columns to load (None = all)
+            filters: ``(column, op, value)`` row filters pushed down to the
+                columnar copy, e.g. ``[('type', 'in', ['TRANSFER'])]``
+            fraud_types_only: Only load TRANSFER and CASH_OUT rows, the only
+                types that carry fraud (account histories then only see
+                these rows; use ``FraudFeatureEngineer(keep_types=...)`` on
+                the full log to keep complete histories)
+        
         Returns:
             DataFrame with PaySim transactions
         """
         logger.info("Downloading PaySim dataset...")
+        if fraud_types_only:
+            filters = list(filters or []) + [('type', 'in', FRAUD_TRANSACTION_TYPES)]
         
         output_path = self.raw_dir / "guardian"
         output_path.mkdir(exist_ok=True)
         
         # Check if file already exists
-        csv_file = output_path / "PS_20174392719_1491204439457_log.csv"
+        csv_file = output_path / PAYSIM_CSV
         if csv_file.exists():
             logger.info(f"PaySim file already exists at {csv_file}, loading from disk...")
-            df = pd.read_csv(csv_file)
+            df = self._read_paysim(csv_file, columns, filters)
             logger.info(f"PaySim loaded: {len(df):,} transactions")
             return df
         
@@ -73,12 +210,12 @@ class FraudDataLoader:
             
             # Load CSV
             if csv_file.exists():
-                df = pd.read_csv(csv_file)
+                df = self._read_paysim(csv_file, columns, filters)
             else:
                 # Try to find any CSV file in the directory
                 csv_files = list(output_path.glob("*.csv"))
                 if csv_files:
-                    df = pd.read_csv(csv_files[0])
+                    df = self._read_paysim(csv_files[0], columns, filters)
                 else:
                     raise FileNotFoundError(f"PaySim CSV file not found in {output_path}")
             
@@ -91,10 +228,64 @@ class FraudDataLoader:
             logger.info("2. Place it in ~/.kaggle/kaggle.json (Mac/Linux) or C:\\Users\\%USERNAME%\\.kaggle\\kaggle.json (Windows)")
             raise
     
-    def download_credit_card_fraud(self) -> pd.DataFrame:
+    def sample_paysim(
+        self,
+        n_samples: int = 100_000,
+        fraud_rate: Optional[float] = None,
+        seed: int = 0,
+        chunksize: int = 500_000,
+        source_path: Optional[Path] = None
+    ) -> pd.DataFrame:
+        """
+        Draw a class-stratified subset of the raw PaySim log in one pass.
+        
+        Streams the log (through the columnar copy when enabled) into
+        per-class reservoirs, so memory stays at one chunk plus
+        ``n_samples`` rows. Rows keep their log order, so ``step`` stays sorted.
+        
+        Args:
+            n_samples: Target subset size
+            fraud_rate: Target fraud share (None = the log's own rate)
+            seed: Random seed; the same seed gives the same subset
+            chunksize: Rows streamed per chunk
+            source_path: Raw PaySim CSV (default: the downloaded Kaggle file)
+        
+        Returns:
+            Sampled PaySim rows (compact dtypes when ``compact`` is set)
+        """
+        source_path = Path(source_path) if source_path else self.raw_dir / "guardian" / PAYSIM_CSV
+        if not source_path.exists():
+            raise FileNotFoundError(f"PaySim log not found at {source_path}; run download_paysim() first")
+        
+        logger.info(f"Sampling {n_samples:,} PaySim rows from {source_path}...")
+        if self.columnar is None:
+            chunks = pd.read_csv(source_path, dtype=PAYSIM_COLUMNAR_DTYPES, chunksize=chunksize)
+        else:
+            columnar_path = ensure_columnar(source_path, self.columnar_path(source_path), dtype=PAYSIM_COLUMNAR_DTYPES)
+            chunks = iter_columnar(columnar_path, batch_size=chunksize)
+        df = stratified_reservoir_sample(chunks, n_samples, fraud_rate=fraud_rate, seed=seed)
+        # A sample is not the file's rows; the cache hashes it instead
+        self.sources.pop('paysim', None)
+        
+        if self.compact:
+            n_accounts = len(self.vocabulary)
+            compact_paysim(df, self.vocabulary)
+            if len(self.vocabulary) != n_accounts:
+                self.vocabulary.save(self.vocabulary_path)
+        return df
+    
+    def download_credit_card_fraud(
+        self,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None
+    ) -> pd.DataFrame:
         """
         Download Credit Card Fraud dataset from Kaggle.
         
+        Args:
+            columns: Columns to load (None = all)
+            filters: ``(column, op, value)`` row filters
+        
         Returns:
             DataFrame with credit card transactions
         """
@@ -107,7 +298,7 @@ class FraudDataLoader:
         csv_file = output_path / "creditcard.csv"
         if csv_file.exists():
             logger.info(f"Credit Card Fraud file already exists at {csv_file}, loading from disk...")
-            df = pd.read_csv(csv_file)
+            df = self._read_credit_card(csv_file, columns, filters)
             logger.info(f"Credit Card Fraud loaded: {len(df):,} transactions")
             return df
         
@@ -130,12 +321,12 @@ class FraudDataLoader:
             
             # Load CSV
             if csv_file.exists():
-                df = pd.read_csv(csv_file)
+                df = self._read_credit_card(csv_file, columns, filters)
             else:
                 # Try to find any CSV file in the directory
                 csv_files = list(output_path.glob("*.csv"))
                 if csv_files:
-                    df = pd.read_csv(csv_files[0])
+                    df = self._read_credit_card(csv_files[0], columns, filters)
                 else:
                     raise FileNotFoundError(f"Credit Card Fraud CSV file not found in {output_path}")
             
@@ -148,21 +339,51 @@ class FraudDataLoader:
             logger.info("2. Place it in ~/.kaggle/kaggle.json (Mac/Linux) or C:\\Users\\%USERNAME%\\.kaggle\\kaggle.json (Windows)")
             raise
     
-    def save_processed(self, df: pd.DataFrame, filename: str):
-        """Save processed dataset to CSV."""
+    def save_processed(self, df: pd.DataFrame, filename: str) -> Path:
+        """
+        Save a processed dataset (columnar when enabled, else CSV).
+        
+        Args:
+            df: Frame to save
+            filename: Output name; the suffix is set by the format
+                ('.parquet'/'.feather', or '.csv' when ``columnar`` is None)
+        
+        Returns:
+            Path written
+        """
         output_path = self.processed_dir / filename
-        df.to_csv(output_path, index=False)
+        if self.columnar is not None:
+            output_path = write_columnar(df, output_path.with_suffix(COLUMNAR_FORMATS[self.columnar]))
+        else:
+            output_path = output_path.with_suffix('.csv')
+            df.to_csv(output_path, index=False)
         logger.info(f"Saved processed data to {output_path}")
+        return output_path
+    
+    def load_processed(
+        self,
+        filename: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[Filters] = None
+    ) -> pd.DataFrame:
+        """Load a dataset written by ``save_processed``."""
+        path = self.processed_dir / filename
+        if self.columnar is not None:
+            return read_columnar(path.with_suffix(COLUMNAR_FORMATS[self.columnar]), columns, filters)
+        return apply_filters(pd.read_csv(path.with_suffix('.csv'), usecols=columns), filters)
 
 
-def load_datasets() -> Tuple[pd.DataFrame, pd.DataFrame]:
+def load_datasets(compact: bool = False) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Load both fraud datasets.
     
+    Args:
+        compact: Load with compact dtypes (see ``FraudDataLoader``)
+    
     Returns:
         Tuple of (paysim_df, creditcard_df)
     """
-    loader = FraudDataLoader()
+    loader = FraudDataLoader(compact=compact)
     
     # Load PaySim
     paysim_df = loader.download_paysim()
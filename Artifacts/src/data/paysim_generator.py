@@ -0,0 +1,415 @@
+"""
+Scalable synthetic PaySim generator.
+
+Emits step-ordered PaySim-schema transactions in independent chunks, so
+10M+ row logs can be produced in parallel on one machine. Every chunk draws
+from its own child of one ``SeedSequence``; output is identical for any
+number of workers. Accounts are reused with a heavy-tailed popularity, and
+fraud is injected as structures the graph and window features should find:
+
+- ``transfer_cashout``: PaySim's own pattern, a drained account TRANSFERs
+  its balance to a mule that CASH_OUTs it
+- ``mule_chain``: the stolen amount hops through several mule accounts
+  over consecutive steps before being cashed out
+- ``ring``: a fixed group of accounts sharing one device and IP moves
+  money between members and cashes out
+
+Extra columns ``deviceId``, ``ipAddress`` and ``fraudPattern`` carry the
+device/IP graph and the ground truth; drop them for the plain schema.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .feature_registry import PAYSIM_TRANSACTION_TYPES
+
+logger = logging.getLogger(__name__)
+
+# Type mix of the Kaggle PaySim log (CASH_IN, CASH_OUT, DEBIT, PAYMENT, TRANSFER)
+PAYSIM_TYPE_SHARES = np.array([0.22, 0.35, 0.01, 0.34, 0.08])
+
+PAYSIM_COLUMNS = [
+    'step', 'type', 'amount', 'nameOrig', 'oldbalanceOrg', 'newbalanceOrig',
+    'nameDest', 'oldbalanceDest', 'newbalanceDest', 'isFraud', 'isFlaggedFraud'
+]
+GRAPH_COLUMNS = ['deviceId', 'ipAddress', 'fraudPattern']
+
+FRAUD_PATTERNS = ('transfer_cashout', 'mule_chain', 'ring')
+
+
+@dataclass(frozen=True)
+class SyntheticPaySimConfig:
+    """
+    Size and structure of a synthetic PaySim log.
+
+    Args:
+        n_rows: Approximate total rows (fraud structures add a few)
+        n_customers: Customer accounts (C...)
+        n_merchants: Merchant accounts (M...), PAYMENT destinations
+        n_steps: Hours covered (PaySim: 744)
+        fraud_rate: Share of rows belonging to fraud structures
+        pattern_shares: Share of fraud rows per pattern, in ``FRAUD_PATTERNS`` order
+        account_skew: Popularity exponent; larger reuses popular accounts more
+        accounts_per_device: Average customers per shared device (households)
+        devices_per_ip: Average devices behind one IP
+        n_rings: Fraud rings (fixed member sets sharing a device and IP)
+        ring_size: (min, max) members per ring
+        mule_chain_length: (min, max) mule hops per chain
+        chunk_rows: Rows per independently generated chunk
+        seed: Root seed
+        graph_columns: Add ``deviceId``/``ipAddress``/``fraudPattern``
+    """
+
+    n_rows: int = 1_000_000
+    n_customers: int = 200_000
+    n_merchants: int = 50_000
+    n_steps: int = 744
+    fraud_rate: float = 0.0013
+    pattern_shares: Tuple[float, float, float] = (0.6, 0.25, 0.15)
+    account_skew: float = 2.0
+    accounts_per_device: float = 1.5
+    devices_per_ip: float = 3.0
+    n_rings: int = 50
+    ring_size: Tuple[int, int] = (3, 8)
+    mule_chain_length: Tuple[int, int] = (2, 4)
+    chunk_rows: int = 1_000_000
+    seed: int = 42
+    graph_columns: bool = True
+
+    @property
+    def n_chunks(self) -> int:
+        return max(1, -(-self.n_rows // self.chunk_rows))
+
+    def chunk_bounds(self, index: int) -> Tuple[int, int, int, int]:
+        """(first row, row count, first step, last step) of one chunk."""
+        start = index * self.chunk_rows
+        end = min(self.n_rows, start + self.chunk_rows)
+        lo = 1 + start * self.n_steps // self.n_rows
+        hi = 1 + end * self.n_steps // self.n_rows
+        return start, end - start, lo, max(lo, hi - 1)
+
+
+def _labels(ids: np.ndarray, render) -> np.ndarray:
+    """Format ids as strings once per distinct id (accounts recur heavily)."""
+    unique, inverse = np.unique(ids, return_inverse=True)
+    return render(unique).to_numpy(dtype=object)[inverse]
+
+
+def _customer_names(ids: np.ndarray) -> np.ndarray:
+    return _labels(ids, lambda unique: 'C' + pd.Series(unique + 1_000_000_000).astype(str))
+
+
+def _device_of(account_ids: np.ndarray, config: SyntheticPaySimConfig) -> np.ndarray:
+    # Scatter accounts over devices with a fixed multiplicative hash, so
+    # neighbouring (similarly popular) accounts do not share devices
+    n_devices = max(1, int(config.n_customers / config.accounts_per_device))
+    return (account_ids.astype(np.int64) * 2_654_435_761 + config.seed) % n_devices
+
+
+def _device_columns(devices: np.ndarray, config: SyntheticPaySimConfig) -> Tuple[np.ndarray, np.ndarray]:
+    def ip_names(unique):
+        ips = unique // max(1, int(config.devices_per_ip))
+        return ('10.' + pd.Series((ips >> 16) & 255).astype(str) + '.'
+                + pd.Series((ips >> 8) & 255).astype(str) + '.' + pd.Series(ips & 255).astype(str))
+
+    return _labels(devices, lambda unique: 'D' + pd.Series(unique).astype(str)), _labels(devices, ip_names)
+
+
+def fraud_rings(config: SyntheticPaySimConfig) -> List[np.ndarray]:
+    """Member account ids of every ring (ids above the regular customer range)."""
+    rng = np.random.default_rng([config.seed, 1])
+    sizes = rng.integers(config.ring_size[0], config.ring_size[1] + 1, config.n_rings)
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    return [config.n_customers + np.arange(offsets[i], offsets[i + 1]) for i in range(config.n_rings)]
+
+
+def _legitimate_rows(rng: np.random.Generator, n: int, steps: np.ndarray, config: SyntheticPaySimConfig) -> Dict:
+    types = rng.choice(len(PAYSIM_TRANSACTION_TYPES), n, p=PAYSIM_TYPE_SHARES)
+    to_merchant = types == PAYSIM_TRANSACTION_TYPES.index('PAYMENT')
+    amount = rng.lognormal(mean=10.5, sigma=1.3, size=n)
+    amount = np.where(to_merchant, amount / 20, amount).round(2)
+
+    # Heavy-tailed reuse: low ids are the busy accounts
+    orig = np.floor(config.n_customers * rng.random(n) ** config.account_skew).astype(np.int64)
+    dest = np.floor(config.n_customers * rng.random(n) ** config.account_skew).astype(np.int64)
+    merchant = np.floor(config.n_merchants * rng.random(n) ** config.account_skew).astype(np.int64)
+
+    old_orig = rng.lognormal(mean=10, sigma=2, size=n).round(2)
+    incoming = types == PAYSIM_TRANSACTION_TYPES.index('CASH_IN')
+    new_orig = np.where(incoming, old_orig + amount, np.maximum(old_orig - amount, 0))
+    old_dest = np.where(to_merchant, 0.0, rng.lognormal(mean=10, sigma=2, size=n).round(2))
+    new_dest = np.where(to_merchant, 0.0, np.where(incoming, np.maximum(old_dest - amount, 0), old_dest + amount))
+
+    return {
+        'step': steps,
+        'type': types,
+        'amount': amount,
+        'orig': orig,
+        'oldbalanceOrg': old_orig,
+        'newbalanceOrig': new_orig,
+        'dest': np.where(to_merchant, -1 - merchant, dest),
+        'oldbalanceDest': old_dest,
+        'newbalanceDest': new_dest,
+        'isFraud': np.zeros(n, dtype=np.int8),
+        'pattern': np.full(n, '', dtype=object),
+        'device': None,
+    }
+
+
+def _fraud_rows(
+    rng: np.random.Generator,
+    n_target: int,
+    lo: int,
+    hi: int,
+    config: SyntheticPaySimConfig,
+    rings: List[np.ndarray],
+    mule_base: int
+) -> Dict:
+    """Fraud structures totalling about ``n_target`` rows within steps [lo, hi]."""
+    transfer = PAYSIM_TRANSACTION_TYPES.index('TRANSFER')
+    cash_out = PAYSIM_TRANSACTION_TYPES.index('CASH_OUT')
+    rows = {key: [] for key in ('step', 'type', 'amount', 'orig', 'dest', 'oldbalanceOrg', 'pattern', 'device')}
+    n_devices = max(1, int(config.n_customers / config.accounts_per_device))
+    mule = mule_base
+
+    def add(step, type_, amount, orig, dest, balance, pattern, device):
+        rows['step'].append(min(step, hi))
+        rows['type'].append(type_)
+        rows['amount'].append(amount)
+        rows['orig'].append(orig)
+        rows['dest'].append(dest)
+        rows['oldbalanceOrg'].append(balance)
+        rows['pattern'].append(pattern)
+        rows['device'].append(device)
+
+    shares = np.asarray(config.pattern_shares, dtype=float)
+    emitted = 0
+    while emitted < n_target:
+        pattern = FRAUD_PATTERNS[rng.choice(len(FRAUD_PATTERNS), p=shares / shares.sum())]
+        step = int(rng.integers(lo, hi + 1))
+        victim = int(np.floor(config.n_customers * rng.random() ** config.account_skew))
+        balance = round(float(rng.lognormal(mean=12, sigma=1)), 2)
+        victim_device = int(_device_of(np.array([victim]), config)[0])
+
+        if pattern == 'transfer_cashout':
+            add(step, transfer, balance, victim, mule, balance, pattern, victim_device)
+            add(step, cash_out, balance, mule, -1 - int(rng.integers(config.n_merchants)), balance,
+                pattern, n_devices + mule)
+            mule += 1
+            emitted += 2
+        elif pattern == 'mule_chain':
+            hops = int(rng.integers(config.mule_chain_length[0], config.mule_chain_length[1] + 1))
+            chain = [victim] + list(range(mule, mule + hops))
+            amount = balance
+            add(step, transfer, amount, chain[0], chain[1], balance, pattern, victim_device)
+            for hop in range(1, hops):
+                kept = round(amount * float(rng.uniform(0.9, 0.99)), 2)
+                add(step + hop, transfer, kept, chain[hop], chain[hop + 1], amount, pattern, n_devices + chain[hop])
+                amount = kept
+            add(step + hops, cash_out, amount, chain[-1], -1 - int(rng.integers(config.n_merchants)),
+                amount, pattern, n_devices + chain[-1])
+            mule += hops
+            emitted += hops + 1
+        else:
+            ring_id = int(rng.integers(len(rings)))
+            members = rings[ring_id]
+            # One device per ring, keyed by its first member (mule ids never fall in that range)
+            ring_device = n_devices + int(members[0])
+            add(step, transfer, balance, victim, int(members[0]), balance, pattern, victim_device)
+            amount = balance
+            for hop in range(1, len(members)):
+                add(step + hop // 2, transfer, amount, int(members[hop - 1]), int(members[hop]), amount,
+                    pattern, ring_device)
+            add(step + len(members) // 2, cash_out, amount, int(members[-1]),
+                -1 - int(rng.integers(config.n_merchants)), amount, pattern, ring_device)
+            emitted += len(members) + 1
+
+    n = len(rows['step'])
+    old = np.asarray(rows['oldbalanceOrg'], dtype=float)
+    amount = np.asarray(rows['amount'], dtype=float)
+    return {
+        'step': np.asarray(rows['step'], dtype=np.int64),
+        'type': np.asarray(rows['type'], dtype=np.int64),
+        'amount': amount,
+        'orig': np.asarray(rows['orig'], dtype=np.int64),
+        'oldbalanceOrg': old,
+        'newbalanceOrig': np.maximum(old - amount, 0),
+        'dest': np.asarray(rows['dest'], dtype=np.int64),
+        'oldbalanceDest': np.zeros(n),
+        'newbalanceDest': np.where(np.asarray(rows['type']) == transfer, amount, 0.0),
+        'isFraud': np.ones(n, dtype=np.int8),
+        'pattern': np.asarray(rows['pattern'], dtype=object),
+        'device': np.asarray(rows['device'], dtype=np.int64),
+    }
+
+
+def generate_chunk(config: SyntheticPaySimConfig, index: int) -> pd.DataFrame:
+    """
+    One step-ordered chunk; chunks concatenated in index order form the log.
+
+    Args:
+        config: Generator configuration
+        index: Chunk number (0 .. ``config.n_chunks - 1``)
+    """
+    start, n_rows, lo, hi = config.chunk_bounds(index)
+    rng = np.random.default_rng(np.random.SeedSequence(config.seed).spawn(config.n_chunks)[index])
+
+    n_fraud = int(rng.binomial(n_rows, config.fraud_rate))
+    # Mule ids are unique per chunk: above customers and ring members
+    mule_base = config.n_customers + config.n_rings * config.ring_size[1] + start
+    fraud = _fraud_rows(rng, n_fraud, lo, hi, config, fraud_rings(config), mule_base) if n_fraud else None
+    n_legit = n_rows - (len(fraud['step']) if fraud else 0)
+
+    steps = lo + np.floor(np.sort(rng.random(max(n_legit, 0))) * (hi - lo + 1)).astype(np.int64)
+    legit = _legitimate_rows(rng, max(n_legit, 0), steps, config)
+    legit['device'] = _device_of(legit['orig'], config)
+
+    parts = [legit] + ([fraud] if fraud else [])
+    data = {key: np.concatenate([part[key] for part in parts]) for key in legit}
+    order = np.argsort(data['step'], kind='stable')
+    data = {key: values[order] for key, values in data.items()}
+
+    dest = data['dest']
+    # Merchants are negative ids; render them with their own prefix
+    dest_names = _labels(dest, lambda unique: pd.Series(np.where(
+        unique < 0, 'M' + pd.Series(-1 - unique + 1_000_000_000).astype(str),
+        'C' + pd.Series(unique + 1_000_000_000).astype(str)
+    )))
+    df = pd.DataFrame({
+        'step': data['step'].astype(np.int64),
+        'type': np.asarray(PAYSIM_TRANSACTION_TYPES, dtype=object)[data['type']],
+        'amount': data['amount'],
+        'nameOrig': _customer_names(data['orig']),
+        'oldbalanceOrg': data['oldbalanceOrg'],
+        'newbalanceOrig': data['newbalanceOrig'],
+        'nameDest': dest_names,
+        'oldbalanceDest': data['oldbalanceDest'],
+        'newbalanceDest': data['newbalanceDest'],
+        'isFraud': data['isFraud'].astype(np.int64),
+        'isFlaggedFraud': ((data['isFraud'] == 1) & (data['amount'] > 200_000)
+                           & (data['type'] == PAYSIM_TRANSACTION_TYPES.index('TRANSFER'))).astype(np.int64),
+    })
+    if config.graph_columns:
+        df['deviceId'], df['ipAddress'] = _device_columns(data['device'], config)
+        df['fraudPattern'] = data['pattern']
+    return df
+
+
+def _write_chunk(config: SyntheticPaySimConfig, index: int, directory: str, suffix: str) -> str:
+    """Generate one chunk into a part file (runs in a worker process)."""
+    path = Path(directory) / f"part-{index:05d}{suffix}"
+    df = generate_chunk(config, index)
+    if suffix == '.parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False, header=(index == 0))
+    return str(path)
+
+
+def generate_synthetic_paysim(
+    config: SyntheticPaySimConfig = SyntheticPaySimConfig(),
+    output_path: Optional[Union[str, Path]] = None,
+    n_jobs: int = 1
+) -> Union[pd.DataFrame, Path]:
+    """
+    Generate a synthetic PaySim log.
+
+    Args:
+        config: Size, structure and seed
+        output_path: CSV or Parquet destination; None returns a DataFrame
+            (only sensible for small logs)
+        n_jobs: Worker processes generating chunks (-1 = all cores)
+
+    Returns:
+        The log, or the path it was written to. Rows are step-ordered, so the
+        file can go straight into ``engineer_paysim_features_chunked``.
+    """
+    n_jobs = (os.cpu_count() or 1) if n_jobs == -1 else max(1, n_jobs)
+    logger.info(f"Generating {config.n_rows:,} synthetic PaySim rows in {config.n_chunks} chunks...")
+
+    if output_path is None:
+        if n_jobs == 1:
+            chunks = [generate_chunk(config, index) for index in range(config.n_chunks)]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                chunks = list(executor.map(generate_chunk, [config] * config.n_chunks, range(config.n_chunks)))
+        df = pd.concat(chunks, ignore_index=True)
+        logger.info(f"Generated {len(df):,} rows, fraud rate {df['isFraud'].mean():.4f}")
+        return df
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = '.parquet' if output_path.suffix == '.parquet' else '.csv'
+    parts_dir = tempfile.mkdtemp(prefix='paysim-parts-', dir=output_path.parent)
+    args = ([config] * config.n_chunks, range(config.n_chunks), [parts_dir] * config.n_chunks,
+            [suffix] * config.n_chunks)
+    try:
+        if n_jobs == 1:
+            parts = map(_write_chunk, *args)
+            _merge_parts(parts, output_path, suffix)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                _merge_parts(executor.map(_write_chunk, *args), output_path, suffix)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+
+    logger.info(f"Wrote synthetic PaySim log to {output_path}")
+    return output_path
+
+
+def _merge_parts(parts, output_path: Path, suffix: str):
+    """Append part files, in chunk order as they complete, to one output file."""
+    if suffix == '.parquet':
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for part in parts:
+                table = pq.read_table(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema, compression='zstd')
+                writer.write_table(table)
+                os.remove(part)
+        finally:
+            if writer is not None:
+                writer.close()
+        return
+
+    with open(output_path, 'wb') as out:
+        for part in parts:
+            with open(part, 'rb') as f:
+                shutil.copyfileobj(f, out, length=16 * 1024 * 1024)
+            os.remove(part)
+
+
+def sample_config(n_rows: int, **overrides) -> SyntheticPaySimConfig:
+    """Config scaled to ``n_rows`` (accounts and rings grow with the log)."""
+    scaled = SyntheticPaySimConfig(
+        n_rows=n_rows,
+        n_customers=max(100, n_rows // 5),
+        n_merchants=max(20, n_rows // 20),
+        n_rings=max(1, n_rows // 20_000),
+    )
+    return replace(scaled, **overrides)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Generate a synthetic PaySim log")
+    parser.add_argument("--rows", type=int, default=10_000_000, help="Rows to generate")
+    parser.add_argument("--output", type=str, default="data/raw/synthetic_paysim.parquet", help=".csv or .parquet")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="Worker processes (-1 = all cores)")
+    parser.add_argument("--seed", type=int, default=42, help="Root seed")
+    args = parser.parse_args()
+
+    generate_synthetic_paysim(sample_config(args.rows, seed=args.seed), args.output, n_jobs=args.n_jobs)
@@ -0,0 +1,150 @@
+"""
+Streaming class-stratified sampling.
+
+Cuts a fixed-size subset with a chosen fraud rate from a log that does not
+fit in memory. Each row gets a uniform random key; every class keeps the rows
+with the smallest keys seen so far (bottom-k reservoir), which is a uniform
+sample without replacement of that class. Memory is bounded by one chunk
+plus the reservoirs, whatever the length of the log.
+"""
+
+import logging
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class StratifiedReservoir:
+    """
+    Per-class bottom-k reservoirs over a stream of DataFrame chunks.
+
+    Args:
+        capacities: Rows to keep per class label; classes not listed are
+            dropped. ``None`` keeps every class up to ``default_capacity``.
+        default_capacity: Capacity of classes missing from ``capacities``
+        label_column: Column holding the class label
+        seed: Random seed (same stream and seed -> same sample)
+    """
+
+    def __init__(
+        self,
+        capacities: Optional[Dict[int, int]] = None,
+        default_capacity: int = 0,
+        label_column: str = 'isFraud',
+        seed: int = 0
+    ):
+        self.capacities = dict(capacities or {})
+        self.default_capacity = default_capacity
+        self.label_column = label_column
+        self.rng = np.random.default_rng(seed)
+        self.reservoirs: Dict[int, pd.DataFrame] = {}
+        self.seen: Dict[int, int] = {}
+        self.position = 0
+
+    def capacity(self, label) -> int:
+        """Reservoir size for one class label."""
+        return self.capacities.get(label, self.default_capacity)
+
+    def update(self, chunk: pd.DataFrame):
+        """Offer the rows of one chunk to the reservoirs."""
+        chunk = chunk.assign(
+            _row=np.arange(self.position, self.position + len(chunk)),
+            _key=self.rng.random(len(chunk))
+        )
+        self.position += len(chunk)
+
+        for label, rows in chunk.groupby(self.label_column, sort=False, observed=True):
+            self.seen[label] = self.seen.get(label, 0) + len(rows)
+            capacity = self.capacity(label)
+            if capacity <= 0:
+                continue
+            reservoir = self.reservoirs.get(label)
+            if reservoir is not None and len(reservoir) == capacity:
+                # Only keys below the current k-th smallest can enter
+                rows = rows[rows['_key'].to_numpy() < reservoir['_key'].max()]
+            candidates = rows if reservoir is None else pd.concat([reservoir, rows], ignore_index=True)
+            if len(candidates) > capacity:
+                keys = candidates['_key'].to_numpy()
+                keep = np.argpartition(keys, capacity - 1)[:capacity]
+                candidates = candidates.iloc[np.sort(keep)]
+            self.reservoirs[label] = candidates.reset_index(drop=True)
+
+    def sample(self, sizes: Optional[Dict[int, int]] = None) -> pd.DataFrame:
+        """
+        Reservoir contents in stream order.
+
+        Args:
+            sizes: Optional smaller per-class sizes; taking the rows with the
+                smallest keys keeps each class a uniform sample
+
+        Returns:
+            Sampled rows, ordered as in the stream, with a fresh index
+        """
+        parts = []
+        for label, reservoir in self.reservoirs.items():
+            size = len(reservoir) if sizes is None else min(sizes.get(label, 0), len(reservoir))
+            if size < len(reservoir):
+                reservoir = reservoir.nsmallest(size, '_key')
+            parts.append(reservoir)
+        if not parts:
+            return pd.DataFrame()
+        sample = pd.concat(parts, ignore_index=True).sort_values('_row', kind='mergesort')
+        return sample.drop(columns=['_row', '_key']).reset_index(drop=True)
+
+
+def stratified_reservoir_sample(
+    chunks: Iterable[pd.DataFrame],
+    n_samples: int,
+    fraud_rate: Optional[float] = None,
+    label_column: str = 'isFraud',
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    One-pass stratified sample of ``n_samples`` rows from a chunk stream.
+
+    Args:
+        chunks: DataFrame chunks (e.g. ``pd.read_csv(..., chunksize=...)``)
+        n_samples: Target number of rows
+        fraud_rate: Target share of label 1 (None = the stream's own rate,
+            known only at the end, so both classes reserve ``n_samples``)
+        label_column: Binary label column
+        seed: Random seed
+
+    Returns:
+        Sampled rows in stream order (so ``step`` order is preserved).
+        Fewer rows than requested are returned when a class runs out.
+    """
+    if fraud_rate is None:
+        reservoir = StratifiedReservoir(default_capacity=n_samples, label_column=label_column, seed=seed)
+    else:
+        if not 0 <= fraud_rate <= 1:
+            raise ValueError(f"fraud_rate must be in [0, 1], got {fraud_rate}")
+        n_fraud = int(round(n_samples * fraud_rate))
+        reservoir = StratifiedReservoir(
+            {1: n_fraud, 0: n_samples - n_fraud}, label_column=label_column, seed=seed
+        )
+
+    for chunk in chunks:
+        reservoir.update(chunk)
+
+    total = sum(reservoir.seen.values())
+    sizes = None
+    if fraud_rate is None and total:
+        observed = reservoir.seen.get(1, 0) / total
+        n_fraud = int(round(min(n_samples, total) * observed))
+        sizes = {1: n_fraud, 0: min(n_samples, total) - n_fraud}
+
+    sample = reservoir.sample(sizes)
+    for label, capacity in (sizes or reservoir.capacities).items():
+        available = reservoir.seen.get(label, 0)
+        if available < capacity:
+            logger.warning(f"Only {available:,} rows with {label_column}={label}, wanted {capacity:,}")
+
+    logger.info(
+        f"Sampled {len(sample):,} of {total:,} rows "
+        f"(fraud rate {sample[label_column].mean() if len(sample) else 0:.4f})"
+    )
+    return sample
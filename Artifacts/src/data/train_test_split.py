@@ -1,21 +1,156 @@
 """
 Train/test split utility with stratification.
+
+Splits are computed as row index arrays (or per-row test masks) and the
+feature frame is only gathered once per split. Besides the stratified
+random split there is a time-ordered split on ``step`` and an
+account-hash split; both decide each row on its own, so large logs can be
+split chunk by chunk straight into memory-mapped matrices.
 """
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import ShuffleSplit, StratifiedShuffleSplit
 import logging
+from typing import Iterable, List, Optional, Tuple
+
+from .sketches import hash64
 
 logger = logging.getLogger(__name__)
 
+# Target, identifier and categorical columns that are never model inputs
+NON_FEATURE_COLUMNS = [
+    'dataset', 'isFraud', 'isFlaggedFraud', 'nameOrig', 'nameDest', 'type',
+    'deviceId', 'ipAddress', 'fraudPattern'
+]
+
+SPLIT_METHODS = ('random', 'time', 'account')
+
+
+def feature_columns(columns: Iterable[str], target_col: str = 'is_fraud') -> List[str]:
+    """Model input columns: everything except the target, IDs and categoricals."""
+    excluded = set(NON_FEATURE_COLUMNS) | {target_col}
+    return [column for column in columns if column not in excluded]
+
+
+def time_split_cutoff(steps, test_size: float = 0.2) -> float:
+    """
+    Last ``step`` of the training period.
+    
+    Whole steps stay on one side, so the test share is only approximately
+    ``test_size``.
+    
+    Args:
+        steps: ``step`` values of every row (or a representative sample)
+        test_size: Target share of rows after the cutoff
+    """
+    steps = np.asarray(steps)
+    cutoff = np.quantile(steps, 1 - test_size, method='lower')
+    if not (steps > cutoff).any():
+        # The top step holds more than test_size of the rows
+        cutoff = np.max(steps[steps < cutoff], initial=cutoff - 1)
+    return float(cutoff)
+
+
+def account_test_mask(keys, test_size: float = 0.2, salt: str = '') -> np.ndarray:
+    """
+    Hash-based assignment: every row of an account lands on the same side.
+    
+    Depends only on the key value, so chunks can be split independently and
+    no account leaks between train and test. Rows without a key are
+    assigned by row position instead.
+    
+    Args:
+        keys: Account identifiers (e.g. ``nameOrig``)
+        test_size: Expected share of accounts in the test split
+        salt: Changes the assignment (analogous to a random seed)
+    """
+    keys = pd.Series(keys)
+    values = keys.astype(str)
+    if salt:
+        values = salt + values
+    missing = keys.isna().to_numpy()
+    if missing.any():
+        values = values.where(~missing, '#' + pd.Series(np.arange(len(keys)), index=keys.index).astype(str))
+    fractions = (hash64(values) >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+    return fractions < test_size
+
+
+def split_indices(
+    df: pd.DataFrame,
+    target_col: str = 'is_fraud',
+    test_size: float = 0.2,
+    random_state: int = 42,
+    stratify: bool = True,
+    method: str = 'random',
+    time_col: str = 'step',
+    key_col: str = 'nameOrig'
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row positions of the train and test splits; nothing is copied.
+    
+    Args:
+        df: Frame to split (only the label/time/key column is read)
+        target_col: Target column (stratification for ``'random'``)
+        test_size: Proportion of test set
+        random_state: Random seed (``'random'``; salt for ``'account'``)
+        stratify: Whether to stratify the random split by target
+        method: ``'random'`` (shuffled, as sklearn's ``train_test_split``),
+            ``'time'`` (rows after a ``time_col`` cutoff are test) or
+            ``'account'`` (hash of ``key_col``)
+        time_col: Ordering column for the time split
+        key_col: Account column for the account split
+        
+    Returns:
+        (train_positions, test_positions)
+    """
+    if method not in SPLIT_METHODS:
+        raise ValueError(f"Unknown split method '{method}', expected one of {SPLIT_METHODS}")
+    
+    if method == 'time':
+        steps = df[time_col]
+        if steps.isna().any():
+            raise ValueError(f"Time split needs '{time_col}' on every row")
+        is_test = steps.to_numpy() > time_split_cutoff(steps, test_size)
+    elif method == 'account':
+        is_test = account_test_mask(df[key_col], test_size, salt=str(random_state))
+    else:
+        placeholder = np.zeros(len(df))
+        y = df[target_col]
+        if stratify:
+            try:
+                splitter = StratifiedShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+                return next(splitter.split(placeholder, y))
+            except ValueError as e:
+                logger.warning(f"Stratification failed: {e}. Using non-stratified split.")
+        splitter = ShuffleSplit(n_splits=1, test_size=test_size, random_state=random_state)
+        return next(splitter.split(placeholder, y))
+    
+    return np.flatnonzero(~is_test), np.flatnonzero(is_test)
+
+
+def clean_features_inplace(X: pd.DataFrame) -> pd.DataFrame:
+    """Replace NaN and +/-inf with 0 column by column, touching only columns that need it."""
+    for column in X.columns:
+        values = X[column]
+        if pd.api.types.is_float_dtype(values.dtype) and isinstance(values.dtype, np.dtype):
+            array = values.to_numpy()
+            if not np.isfinite(array).all():
+                X[column] = np.nan_to_num(array, nan=0.0, posinf=0.0, neginf=0.0)
+        elif values.hasnans:
+            X[column] = values.fillna(0)
+    return X
+
 
 def create_train_test_split(
     df: pd.DataFrame,
     target_col: str = 'is_fraud',
     test_size: float = 0.2,
     random_state: int = 42,
-    stratify: bool = True
+    stratify: bool = True,
+    method: str = 'random',
+    time_col: str = 'step',
+    key_col: str = 'nameOrig'
 ) -> tuple:
     """
     Create stratified train/test split.
@@ -26,41 +161,26 @@ def create_train_test_split(
         test_size: Proportion of test set
         random_state: Random seed
         stratify: Whether to stratify by target
+        method: 'random', 'time' or 'account' (see ``split_indices``)
+        time_col: Ordering column for the time split
+        key_col: Account column for the account split
         
     Returns:
         X_train, X_test, y_train, y_test
     """
-    logger.info("Creating train/test split...")
-    
-    # Separate features and target
-    # Drop target, dataset, and non-numeric columns (IDs, categorical)
-    columns_to_drop = [target_col, 'dataset', 'isFraud', 'isFlaggedFraud', 
-                       'nameOrig', 'nameDest', 'type']
-    X = df.drop(columns=columns_to_drop, errors='ignore')
-    y = df[target_col]
-    
-    # Handle missing values
-    X = X.fillna(0)
-    
-    # Handle infinite values
-    X = X.replace([np.inf, -np.inf], 0)
-    
-    # Create split
-    if stratify:
-        try:
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=test_size, random_state=random_state, 
-                stratify=y
-            )
-        except ValueError as e:
-            logger.warning(f"Stratification failed: {e}. Using non-stratified split.")
-            X_train, X_test, y_train, y_test = train_test_split(
-                X, y, test_size=test_size, random_state=random_state
-            )
-    else:
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=test_size, random_state=random_state
-        )
+    logger.info(f"Creating {method} train/test split...")
+    
+    train_idx, test_idx = split_indices(
+        df, target_col, test_size, random_state, stratify, method, time_col, key_col
+    )
+    
+    # One gather per split, then clean the gathered frames in place
+    columns = df.columns.get_indexer(feature_columns(df.columns, target_col))
+    target = df.columns.get_loc(target_col)
+    X_train = clean_features_inplace(df.iloc[train_idx, columns])
+    X_test = clean_features_inplace(df.iloc[test_idx, columns])
+    y_train = df.iloc[train_idx, target]
+    y_test = df.iloc[test_idx, target]
     
     logger.info(f"Train set: {len(X_train):,} samples")
     logger.info(f"Test set: {len(X_test):,} samples")
@@ -69,6 +189,70 @@ def create_train_test_split(
     return X_train, X_test, y_train, y_test
 
 
+def stream_split_to_matrices(
+    chunks: Iterable[pd.DataFrame],
+    store,
+    method: str = 'account',
+    target_col: str = 'isFraud',
+    test_size: float = 0.2,
+    cutoff: Optional[float] = None,
+    time_col: str = 'step',
+    key_col: str = 'nameOrig',
+    salt: str = '42'
+) -> dict:
+    """
+    Split a chunked feature log straight into memory-mapped matrices.
+    
+    Each row is assigned on its own (no global shuffle), cleaned and appended
+    to the train or test matrix of ``store``, so memory is one chunk.
+    
+    Args:
+        chunks: Engineered feature chunks (e.g. ``pd.read_csv(..., chunksize=...)``
+            over the output of ``engineer_paysim_features_chunked``)
+        store: ``models.feature_matrix.FeatureMatrixStore`` to write to
+        method: 'time' or 'account'
+        target_col: Label column
+        test_size: Share of accounts in test (account split)
+        cutoff: Last training ``time_col`` value (time split; see
+            ``time_split_cutoff``)
+        time_col: Ordering column for the time split
+        key_col: Account column for the account split
+        salt: Account split salt
+        
+    Returns:
+        {'train': rows, 'test': rows}
+    """
+    if method not in ('time', 'account'):
+        raise ValueError("Streaming splits support 'time' and 'account'")
+    if method == 'time' and cutoff is None:
+        raise ValueError("The time split needs a cutoff when streaming")
+    
+    store.reset()
+    writers = None
+    try:
+        for chunk in chunks:
+            if writers is None:
+                columns = feature_columns(chunk.columns, target_col)
+                writers = {split: store.writer(split, columns) for split in ('train', 'test')}
+            if method == 'time':
+                is_test = chunk[time_col].to_numpy() > cutoff
+            else:
+                is_test = account_test_mask(chunk[key_col], test_size, salt=salt)
+            for split, mask in (('train', ~is_test), ('test', is_test)):
+                rows = chunk[mask]
+                writers[split].append(rows[columns], rows[target_col])
+    except BaseException:
+        for writer in (writers or {}).values():
+            writer.abort()
+        raise
+    
+    for writer in (writers or {}).values():
+        writer.close()
+    counts = {split: writer.rows for split, writer in (writers or {}).items()}
+    logger.info(f"Streamed split: {counts}")
+    return counts
+
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     
@@ -0,0 +1,508 @@
+"""
+Sliding-window aggregation engine for per-account transaction features.
+Sorts once by (account, step) and resolves every window with searchsorted.
+"""
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def encode_keys(keys) -> np.ndarray:
+    """
+    Map account identifiers to dense integer codes.
+
+    Keys that are already interned (non-negative integer codes, e.g. from
+    ``AccountVocabulary``) are used as-is without hashing.
+
+    Args:
+        keys: Sequence of account identifiers (strings or integers)
+
+    Returns:
+        int64 array of codes (missing keys get their own code)
+    """
+    keys = pd.Series(keys)
+    if isinstance(keys.dtype, pd.CategoricalDtype) and not keys.hasnans:
+        return keys.cat.codes.to_numpy(dtype=np.int64)
+    if pd.api.types.is_integer_dtype(keys.dtype) and len(keys):
+        values = keys.to_numpy(dtype=np.int64)
+        if values.min() >= 0 and values.max() < np.iinfo(np.int32).max:
+            return values
+    codes, _ = pd.factorize(keys.to_numpy(), use_na_sentinel=False)
+    return codes.astype(np.int64, copy=False)
+
+
+def encode_pairs(first, second) -> np.ndarray:
+    """
+    Dense int64 codes for (first, second) key pairs, e.g. sender -> receiver.
+
+    Args:
+        first: First key per row
+        second: Second key per row
+
+    Returns:
+        int64 array; rows with the same pair share a code
+    """
+    first_codes = encode_keys(first)
+    second_codes = encode_keys(second)
+    if len(first_codes) == 0:
+        return first_codes
+    combined = first_codes * (int(second_codes.max()) + 1) + second_codes
+    codes, _ = pd.factorize(combined)
+    return codes.astype(np.int64, copy=False)
+
+
+def sort_by_key_and_step(codes: np.ndarray, steps: np.ndarray) -> np.ndarray:
+    """Return the stable permutation that orders rows by (key, step)."""
+    return np.lexsort((steps, codes))
+
+
+def _composite(codes_sorted: np.ndarray, steps_sorted: np.ndarray, max_window: int) -> np.ndarray:
+    """
+    Pack (key, step) into one monotonic int64 so a single searchsorted
+    never crosses a key boundary for windows up to ``max_window``.
+    """
+    if len(steps_sorted) == 0:
+        return np.zeros(0, dtype=np.int64)
+    step_min = steps_sorted.min()
+    span = int(steps_sorted.max() - step_min) + int(max_window) + 1
+    return codes_sorted * span + (steps_sorted - step_min)
+
+
+def window_bounds(composite: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Row bounds of the window ``(step - window, step]`` for each sorted row.
+
+    Rows sharing an account and step are all inside each other's window,
+    matching the original per-row mask ``(step > t - window) & (step <= t)``.
+
+    Returns:
+        (lo, hi) index arrays into the sorted order; the window is ``[lo, hi)``
+    """
+    hi = np.searchsorted(composite, composite, side='right')
+    lo = np.searchsorted(composite, composite - window, side='right')
+    return lo, hi
+
+
+def distinct_window_counts(
+    codes: np.ndarray,
+    steps: np.ndarray,
+    distinct,
+    windows: Iterable[int]
+) -> Dict[int, np.ndarray]:
+    """
+    Distinct ``distinct`` values per key over trailing step windows.
+
+    Each (key, value) occurrence at step ``s`` keeps the value "active" for
+    query steps ``[s, s + window)``; overlapping activity of repeated pairs
+    is trimmed to ``[max(s, s_prev + window), s + window)``. The distinct
+    count at step ``t`` is then (#intervals started by ``t``) minus
+    (#intervals ended by ``t``), two searchsorted calls over packed
+    (key, step) events.
+
+    Args:
+        codes: Integer key codes per row (e.g. interned ``nameDest``)
+        steps: Integer time step per row
+        distinct: Values to count distinct per key (e.g. ``nameOrig``)
+        windows: Window lengths in steps
+
+    Returns:
+        {window: int64 distinct counts} aligned with the input rows
+    """
+    windows = [int(w) for w in windows]
+    codes = np.asarray(codes, dtype=np.int64)
+    steps = np.asarray(steps, dtype=np.int64)
+    n = len(steps)
+    if n == 0:
+        return {window: np.zeros(0, dtype=np.int64) for window in windows}
+
+    pairs = encode_pairs(codes, distinct)
+    pair_order = sort_by_key_and_step(pairs, steps)
+    pair_steps = steps[pair_order]
+    same_pair = np.concatenate(([False], pairs[pair_order][1:] == pairs[pair_order][:-1]))
+    event_codes = codes[pair_order]
+
+    step_min = steps.min()
+    span = int(steps.max() - step_min) + 2 * max(windows) + 1
+    # Sorted queries keep the searchsorted sweeps cache-friendly
+    queries = codes * span + (steps - step_min)
+    query_order = np.argsort(queries, kind='stable')
+    sorted_queries = queries[query_order]
+
+    results = {}
+    for window in windows:
+        previous_end = np.where(same_pair, np.roll(pair_steps, 1) + window, np.iinfo(np.int64).min)
+        start = np.maximum(pair_steps, previous_end)
+        end = pair_steps + window
+        active = start < end
+        base = event_codes[active] * span - step_min
+        starts = np.sort(base + start[active])
+        ends = np.sort(base + end[active])
+        counts = np.empty(n, dtype=np.int64)
+        counts[query_order] = (
+            np.searchsorted(starts, sorted_queries, side='right')
+            - np.searchsorted(ends, sorted_queries, side='right')
+        )
+        results[window] = counts
+
+    return results
+
+
+class RangeMax:
+    """
+    Sparse table answering max(values[lo:hi]) for many ranges at once.
+
+    Built in O(n log L) for ranges up to ``max_length`` rows; each batch of
+    queries is two gathers per distinct power-of-two length.
+    """
+
+    def __init__(self, values: np.ndarray, max_length: int):
+        self.levels = [np.asarray(values, dtype=np.float64)]
+        span = 1
+        while span * 2 <= max_length:
+            previous = self.levels[-1]
+            self.levels.append(np.maximum(previous[:-span], previous[span:]))
+            span *= 2
+
+    def query(self, lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+        """Max over each non-empty ``[lo, hi)``"""
+        level = np.frexp((hi - lo).astype(np.float64))[1] - 1
+        out = np.empty(len(lo), dtype=np.float64)
+        for k in np.unique(level):
+            rows = level == k
+            table = self.levels[k]
+            out[rows] = np.maximum(table[lo[rows]], table[hi[rows] - (1 << int(k))])
+        return out
+
+
+def rolling_window_aggregates(
+    keys,
+    steps,
+    windows: Iterable[int],
+    values=None,
+    distinct=None,
+    maxima: bool = False
+) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Count, sum, mean, max and distinct-count per key over trailing step windows.
+
+    Runs in O(n log n): one sort by (key, step) shared by every window, then
+    two vectorized searchsorted calls per window.
+
+    Args:
+        keys: Account identifier per row (e.g. ``nameOrig``)
+        steps: Integer time step per row (PaySim hours)
+        windows: Window lengths in steps
+        values: Optional values to aggregate per window (e.g. ``amount``);
+            adds 'sum' and 'mean'
+        distinct: Optional values to count distinct per window
+            (e.g. ``nameOrig`` per ``nameDest`` for fan-in)
+        maxima: Also compute the window 'max' of ``values``
+
+    Returns:
+        {window: {'count': ..., 'sum': ..., 'mean': ..., 'max': ..., 'distinct': ...}}
+        aligned with the input rows
+    """
+    windows = [int(w) for w in windows]
+    codes = keys if isinstance(keys, np.ndarray) and keys.dtype.kind in 'iu' else encode_keys(keys)
+    codes = np.asarray(codes, dtype=np.int64)
+    steps = np.asarray(steps, dtype=np.int64)
+    n = len(steps)
+
+    order = sort_by_key_and_step(codes, steps)
+    composite = _composite(codes[order], steps[order], max(windows))
+
+    prefix = None
+    if values is not None:
+        sorted_values = np.asarray(values, dtype=np.float64)[order]
+        prefix = np.concatenate(([0.0], np.cumsum(sorted_values)))
+
+    bounds = {window: window_bounds(composite, window) for window in windows}
+    range_max = None
+    if maxima and values is not None and n:
+        longest = max(int((hi - lo).max()) for lo, hi in bounds.values())
+        range_max = RangeMax(sorted_values, longest)
+
+    results = {}
+    for window in windows:
+        lo, hi = bounds[window]
+        counts = np.empty(n, dtype=np.int64)
+        counts[order] = hi - lo
+        results[window] = {'count': counts}
+        if prefix is not None:
+            sums = np.empty(n, dtype=np.float64)
+            sums[order] = prefix[hi] - prefix[lo]
+            results[window]['sum'] = sums
+            results[window]['mean'] = sums / counts
+        if range_max is not None:
+            peaks = np.empty(n, dtype=np.float64)
+            peaks[order] = range_max.query(lo, hi)
+            results[window]['max'] = peaks
+
+    if distinct is not None:
+        for window, counts in distinct_window_counts(codes, steps, distinct, windows).items():
+            results[window]['distinct'] = counts
+
+    return results
+
+
+def account_history(keys, steps) -> Dict[str, np.ndarray]:
+    """
+    First-transaction flag and transaction count to date per account.
+
+    Rows are ordered by ``step``, ties broken by row order. The count
+    includes the row itself, so it never looks at later transactions.
+
+    Args:
+        keys: Account identifier per row
+        steps: Integer time step per row
+
+    Returns:
+        {'is_first': int array, 'count': int array} aligned with the input rows
+    """
+    codes = keys if isinstance(keys, np.ndarray) and keys.dtype.kind in 'iu' else encode_keys(keys)
+    codes = np.asarray(codes, dtype=np.int64)
+    steps = np.asarray(steps, dtype=np.int64)
+    n = len(codes)
+
+    order = sort_by_key_and_step(codes, steps)
+    codes_sorted = codes[order]
+    starts_sorted = np.concatenate(([True], codes_sorted[1:] != codes_sorted[:-1]))[:n]
+    is_first = np.empty(n, dtype=np.int64)
+    is_first[order] = starts_sorted
+
+    # Position within each account's run in sorted order
+    starts = np.flatnonzero(starts_sorted)
+    lengths = np.diff(np.append(starts, n))
+    counts = np.empty(n, dtype=np.int64)
+    counts[order] = np.arange(n) - np.repeat(starts, lengths) + 1
+
+    return {'is_first': is_first, 'count': counts}
+
+
+RUNNING_STATE_COLUMNS = ['count', 'mean', 'm2', 'last_step']
+
+
+def _merge_moments(n_a, mean_a, m2_a, n_b, mean_b, m2_b):
+    """Chan et al. combination of two (count, mean, M2) summaries."""
+    n = n_a + n_b
+    safe_n = np.where(n > 0, n, 1)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / safe_n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / safe_n
+    return n, mean, m2
+
+
+def account_running_stats(keys, steps, values, state: pd.DataFrame = None) -> Dict:
+    """
+    Point-in-time per-account behaviour from earlier transactions only.
+
+    One stable sort by (key, step), then grouped cumulative sums and a
+    shift; no per-account Python loops. Each row sees the account's
+    transactions that precede it in (step, row) order, so the features are
+    free of look-ahead and match what an online store knows at arrival.
+
+    Args:
+        keys: Account identifier per row
+        steps: Integer time step per row
+        values: Amount per row
+        state: Optional per-key summary of earlier rows (index = key,
+            columns ``RUNNING_STATE_COLUMNS``), e.g. carried across chunks
+
+    Returns:
+        {'time_since_last': steps since the previous transaction (-1 if none),
+         'mean' / 'std': running mean and population std of earlier amounts
+         (0 if none), 'deviation': (amount - mean) / std (0 while std is 0),
+         'state': updated per-key summary including these rows}
+    """
+    keys = pd.Series(keys).reset_index(drop=True)
+    codes, uniques = pd.factorize(keys, use_na_sentinel=False)
+    steps = np.asarray(steps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(codes)
+    if n == 0:
+        empty = {name: np.zeros(0) for name in ('time_since_last', 'mean', 'std', 'deviation')}
+        return {**empty, 'state': state if state is not None else pd.DataFrame(columns=RUNNING_STATE_COLUMNS)}
+
+    order = sort_by_key_and_step(codes.astype(np.int64), steps)
+    codes_sorted = codes[order]
+    steps_sorted = steps[order]
+    values_sorted = values[order]
+
+    starts_sorted = np.concatenate(([True], codes_sorted[1:] != codes_sorted[:-1]))[:n]
+    starts = np.flatnonzero(starts_sorted)
+    lengths = np.diff(np.append(starts, n))
+    group_start = np.repeat(starts, lengths)
+    position = np.arange(n) - group_start
+
+    # Shift by each account's first amount: variance is shift-invariant and
+    # the cumulative sums stay small enough to avoid cancellation
+    base = values_sorted[group_start]
+    shifted = values_sorted - base
+    grouped = pd.Series(shifted).groupby(codes_sorted, sort=False)
+    cum_sum = grouped.cumsum().to_numpy() - shifted
+    cum_sq = pd.Series(shifted ** 2).groupby(codes_sorted, sort=False).cumsum().to_numpy() - shifted ** 2
+
+    count_b = position.astype(np.float64)
+    safe_b = np.where(count_b > 0, count_b, 1)
+    mean_b = np.where(count_b > 0, base + cum_sum / safe_b, 0.0)
+    m2_b = np.maximum(cum_sq - count_b * (cum_sum / safe_b) ** 2, 0.0)
+
+    previous_step = np.empty(n, dtype=np.int64)
+    previous_step[1:] = steps_sorted[:-1]
+    previous_step[starts_sorted] = -1
+
+    if state is not None and len(state):
+        prior = state.reindex(uniques)
+        has_prior = prior['count'].notna().to_numpy()[codes_sorted]
+        count_a = prior['count'].fillna(0).to_numpy(dtype=np.float64)[codes_sorted]
+        mean_a = prior['mean'].fillna(0).to_numpy(dtype=np.float64)[codes_sorted]
+        m2_a = prior['m2'].fillna(0).to_numpy(dtype=np.float64)[codes_sorted]
+        last_a = prior['last_step'].fillna(-1).to_numpy(dtype=np.int64)[codes_sorted]
+        count, mean, m2 = _merge_moments(count_a, mean_a, m2_a, count_b, mean_b, m2_b)
+        previous_step = np.where(starts_sorted & has_prior, last_a, previous_step)
+    else:
+        count, mean, m2 = count_b, mean_b, m2_b
+
+    std = np.sqrt(np.where(count > 0, m2 / np.where(count > 0, count, 1), 0.0))
+    deviation = np.where(std > 0, (values_sorted - mean) / np.where(std > 0, std, 1), 0.0)
+    time_since_last = np.where(previous_step >= 0, steps_sorted - previous_step, -1)
+
+    result = {}
+    for name, sorted_values, dtype in (
+        ('time_since_last', time_since_last, np.int64),
+        ('mean', mean, np.float64),
+        ('std', std, np.float64),
+        ('deviation', deviation, np.float64),
+    ):
+        out = np.empty(n, dtype=dtype)
+        out[order] = sorted_values
+        result[name] = out
+
+    # Fold each account's last row into the carried summary
+    last = np.append(starts[1:], n) - 1
+    final_n, final_mean, final_m2 = _merge_moments(
+        count[last], mean[last], m2[last],
+        1.0, values_sorted[last], 0.0
+    )
+    result['state'] = pd.DataFrame({
+        'count': final_n,
+        'mean': final_mean,
+        'm2': final_m2,
+        'last_step': steps_sorted[last],
+    }, index=pd.Index(uniques[codes_sorted[starts]]))
+    if state is not None and len(state):
+        result['state'] = pd.concat([
+            state[~state.index.isin(result['state'].index)], result['state']
+        ])
+
+    return result
+
+
+def partition_rows(codes: np.ndarray, n_partitions: int) -> List[np.ndarray]:
+    """
+    Hash-partition row indices so every row of an account lands together.
+
+    Args:
+        codes: Integer account codes from ``encode_keys``
+        n_partitions: Number of partitions
+
+    Returns:
+        List of row index arrays, one per partition
+    """
+    hashes = pd.util.hash_array(codes) % np.uint64(n_partitions)
+    order = np.argsort(hashes, kind='stable')
+    bounds = np.cumsum(np.bincount(hashes.astype(np.int64), minlength=n_partitions))[:-1]
+    return np.split(order, bounds)
+
+
+def _scatter(partitions: List[np.ndarray], results: List, n: int, dtype) -> np.ndarray:
+    """Write per-partition results back into original row order."""
+    out = np.empty(n, dtype=dtype)
+    for rows, values in zip(partitions, results):
+        out[rows] = values
+    return out
+
+
+def parallel_account_features(
+    keys,
+    steps,
+    windows: Iterable[int] = (),
+    values=None,
+    include_history: bool = False,
+    n_jobs: int = 2,
+    distinct=None,
+    maxima: bool = False
+) -> Dict:
+    """
+    Compute window aggregates (and account history) across a process pool.
+
+    Rows are hash-partitioned by account so each partition's windows are
+    independent; results are scattered back into original row order and
+    match the single-process functions exactly.
+
+    Args:
+        keys: Account identifier per row
+        steps: Integer time step per row
+        windows: Window lengths in steps
+        values: Optional values to sum per window
+        include_history: Also compute ``account_history`` outputs
+        n_jobs: Number of worker processes
+        distinct: Optional values to count distinct per window
+        maxima: Also compute the window max of ``values``
+
+    Returns:
+        {'windows': rolling_window_aggregates output, 'history': account_history output or None}
+    """
+    windows = tuple(windows)
+    codes = encode_keys(keys)
+    steps = np.asarray(steps, dtype=np.int64)
+    values = None if values is None else np.asarray(values, dtype=np.float64)
+    distinct = None if distinct is None else encode_keys(distinct)
+    n = len(codes)
+    partitions = [rows for rows in partition_rows(codes, n_jobs) if len(rows)]
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        window_futures = [
+            executor.submit(
+                rolling_window_aggregates, codes[rows], steps[rows], windows,
+                None if values is None else values[rows],
+                None if distinct is None else distinct[rows],
+                maxima
+            )
+            for rows in partitions
+        ] if windows else []
+        history_futures = [
+            executor.submit(account_history, codes[rows], steps[rows])
+            for rows in partitions
+        ] if include_history else []
+
+        window_parts = [future.result() for future in window_futures]
+        history_parts = [future.result() for future in history_futures]
+
+    window_results = {}
+    for window in windows:
+        window_results[window] = {
+            stat: _scatter(partitions, [part[window][stat] for part in window_parts], n, dtype)
+            for stat, dtype in (
+                ('count', np.int64), ('sum', np.float64), ('mean', np.float64),
+                ('max', np.float64), ('distinct', np.int64)
+            )
+            if stat == 'count'
+            or (stat in ('sum', 'mean') and values is not None)
+            or (stat == 'max' and maxima and values is not None)
+            or (stat == 'distinct' and distinct is not None)
+        }
+
+    history = None
+    if include_history:
+        history = {
+            stat: _scatter(partitions, [part[stat] for part in history_parts], n, np.int64)
+            for stat in ('is_first', 'count')
+        }
+
+    return {'windows': window_results, 'history': history}
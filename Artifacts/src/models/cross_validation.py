@@ -0,0 +1,346 @@
+"""
+Cross-validation over the memory-mapped training matrix.
+
+Fold membership is computed once per training split and stored as a small
+int8 array next to the matrix, so every run (and every worker) sees the
+same folds without re-splitting. Workers receive only the matrix directory
+and a fold number; each maps the shared ``.npy`` file read-only, so the page
+cache holds one copy of the data however many folds run at once. Fold rows
+are streamed from the mapping in bounded blocks into XGBoost's binned
+matrix and scored block by block, so no fold copies its rows.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score, roc_auc_score
+from sklearn.model_selection import StratifiedKFold, StratifiedShuffleSplit
+
+from .feature_matrix import FeatureMatrixStore
+
+logger = logging.getLogger(__name__)
+
+FOLD_METHODS = ('stratified', 'time')
+
+
+def xgboost_params(y_train, hyperparameters: Optional[Dict] = None, random_state: int = 42) -> Dict:
+    """
+    Default XGBoost hyperparameters (optimized for fraud detection).
+
+    Args:
+        y_train: Training labels (class imbalance sets ``scale_pos_weight``)
+        hyperparameters: Overrides
+        random_state: Random seed
+    """
+    fraud_rate = float(np.mean(y_train))
+    params = {
+        'objective': 'binary:logistic',
+        'eval_metric': 'auc',
+        'max_depth': 8,
+        'learning_rate': 0.01,
+        'n_estimators': 500,
+        'subsample': 0.8,
+        'colsample_bytree': 0.8,
+        'min_child_weight': 3,
+        'gamma': 0.1,
+        'reg_alpha': 0.1,
+        'reg_lambda': 1.0,
+        'scale_pos_weight': (1 - fraud_rate) / fraud_rate,  # Handle class imbalance
+        'random_state': random_state,
+        'n_jobs': -1,
+        'tree_method': 'hist'
+    }
+    if hyperparameters:
+        params.update(hyperparameters)
+    return params
+
+
+def holdout_indices(
+    y: np.ndarray,
+    fraction: float = 0.1,
+    method: str = 'stratified',
+    steps: Optional[np.ndarray] = None,
+    random_state: int = 42
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Carve a validation set out of the training split.
+
+    Args:
+        y: Training labels
+        fraction: Share of rows held out
+        method: 'stratified' (same fraud rate in both parts) or 'time'
+            (the latest steps, so validation lies after everything fitted)
+        steps: Time of each row (required for 'time')
+        random_state: Random seed for the stratified carve-out
+
+    Returns:
+        (fit_positions, validation_positions), both sorted
+    """
+    if method not in FOLD_METHODS:
+        raise ValueError(f"Unknown holdout method '{method}', expected one of {FOLD_METHODS}")
+    if not 0 < fraction < 1:
+        raise ValueError(f"Validation fraction must be in (0, 1), got {fraction}")
+
+    if method == 'stratified':
+        splitter = StratifiedShuffleSplit(n_splits=1, test_size=fraction, random_state=random_state)
+        fit, validation = next(splitter.split(np.zeros(len(y)), y))
+        return np.sort(fit), np.sort(validation)
+
+    if steps is None:
+        raise ValueError("A time holdout needs the step of every row")
+    # Whole steps only, so no step is split between the two parts
+    steps = np.asarray(steps)
+    cutoff = np.quantile(steps, 1 - fraction, method='lower')
+    validation = steps > cutoff
+    if not validation.any():
+        raise ValueError(f"All rows share step {cutoff}; cannot hold out later steps")
+    return np.flatnonzero(~validation), np.flatnonzero(validation)
+
+
+class CrossValidationFolds:
+    """
+    Persisted fold assignment for one training split.
+
+    ``assignment[i]`` is the fold in which row ``i`` is validated. For
+    stratified folds every fold trains on all other rows; for time folds
+    (expanding window) fold ``k`` trains on rows of earlier folds only and
+    rows marked -1 (the first period) are never validated.
+    """
+
+    def __init__(
+        self,
+        assignment: np.ndarray,
+        method: str,
+        n_folds: int,
+        split: str = 'train',
+        random_state: int = 42
+    ):
+        self.assignment = assignment
+        self.method = method
+        self.n_folds = n_folds
+        self.split = split
+        self.random_state = random_state
+
+    @property
+    def name(self) -> str:
+        """File stem of the stored folds; one per split and fold parameters."""
+        return fold_file_stem(self.split, self.method, self.n_folds, self.random_state)
+
+    @classmethod
+    def compute(
+        cls,
+        y: np.ndarray,
+        n_folds: int = 5,
+        method: str = 'stratified',
+        steps: Optional[np.ndarray] = None,
+        random_state: int = 42
+    ) -> "CrossValidationFolds":
+        """
+        Assign rows to folds.
+
+        Args:
+            y: Labels of the training split
+            n_folds: Number of folds
+            method: 'stratified' (shuffled StratifiedKFold) or 'time'
+            steps: Time of each row (required for 'time')
+            random_state: Random seed for stratified folds
+        """
+        if method not in FOLD_METHODS:
+            raise ValueError(f"Unknown fold method '{method}', expected one of {FOLD_METHODS}")
+        assignment = np.full(len(y), -1, dtype=np.int8)
+
+        if method == 'stratified':
+            splitter = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=random_state)
+            for fold, (_, val_idx) in enumerate(splitter.split(np.zeros(len(y)), y)):
+                assignment[val_idx] = fold
+        else:
+            if steps is None:
+                raise ValueError("Time folds need the step of every row")
+            # n_folds + 1 periods of whole steps; period 0 only ever trains
+            steps = np.asarray(steps)
+            edges = np.quantile(steps, np.linspace(0, 1, n_folds + 2)[1:-1], method='lower')
+            periods = np.searchsorted(edges, steps, side='left')
+            assignment = (periods - 1).astype(np.int8)
+
+        return cls(assignment, method, n_folds, random_state=random_state)
+
+    def indices(self, fold: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(train_positions, validation_positions) of one fold."""
+        if self.method == 'time':
+            train = np.flatnonzero(self.assignment < fold)
+        else:
+            train = np.flatnonzero(self.assignment != fold)
+        return train, np.flatnonzero(self.assignment == fold)
+
+    def save(self, store: FeatureMatrixStore):
+        """Write ``<name>.npy`` and its metadata next to the matrix."""
+        np.save(store.directory / f"{self.name}.npy", self.assignment)
+        meta = {
+            'method': self.method,
+            'n_folds': self.n_folds,
+            'random_state': self.random_state,
+            'rows': len(self.assignment),
+            'matrix_created_at': store.manifest()['splits'][self.split]['created_at'],
+            'created_at': datetime.now().isoformat()
+        }
+        with open(store.directory / f"{self.name}.json", 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    @classmethod
+    def load(cls, store: FeatureMatrixStore, name: str, split: str = 'train') -> "CrossValidationFolds":
+        """Read folds stored under ``name`` by ``save``."""
+        meta = json.loads((store.directory / f"{name}.json").read_text())
+        assignment = np.load(store.directory / f"{name}.npy", mmap_mode='r')
+        return cls(np.asarray(assignment), meta['method'], meta['n_folds'], split, meta['random_state'])
+
+    @classmethod
+    def load_or_create(
+        cls,
+        store: FeatureMatrixStore,
+        n_folds: int = 5,
+        method: str = 'stratified',
+        random_state: int = 42,
+        split: str = 'train'
+    ) -> "CrossValidationFolds":
+        """
+        Reuse stored folds if they match the request and the current matrix, else compute and store.
+
+        Folds are stored per (split, method, n_folds, random_state), so
+        requests with different parameters never share an assignment.
+        """
+        name = fold_file_stem(split, method, n_folds, random_state)
+        meta_path = store.directory / f"{name}.json"
+        entry = store.manifest()['splits'][split]
+        if meta_path.exists():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            stored = (meta['method'], meta['n_folds'], meta.get('random_state'), meta['matrix_created_at'])
+            if stored == (method, n_folds, random_state, entry['created_at']):
+                logger.info(f"Reusing {n_folds} {method} folds from {meta_path}")
+                return cls.load(store, name, split)
+
+        X, y = store.load_split(split)
+        steps = X['step'].to_numpy() if method == 'time' else None
+        folds = cls.compute(np.asarray(y), n_folds, method, steps, random_state)
+        folds.split = split
+        folds.save(store)
+        logger.info(f"Computed and stored {n_folds} {method} folds for {entry['rows']:,} rows")
+        return folds
+
+
+def fold_file_stem(split: str, method: str, n_folds: int, random_state: int) -> str:
+    """Name of the stored fold assignment for one set of fold parameters."""
+    return f"folds_{split}_{method}_{n_folds}_{random_state}"
+
+
+def json_safe(value):
+    """Copy of a report with NaN/inf floats replaced by None (valid JSON null)."""
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    if isinstance(value, (float, np.floating)) and not np.isfinite(value):
+        return None
+    return value
+
+
+def _run_fold(
+    directory: str,
+    split: str,
+    name: str,
+    fold: int,
+    hyperparameters: Optional[Dict],
+    random_state: int,
+    threads: int,
+    batch_rows: int
+) -> Dict:
+    """Train and score one fold (runs in a worker process)."""
+    # external_memory imports xgboost_params from this module
+    from .external_memory import matrix_chunks, train_chunked
+
+    store = FeatureMatrixStore(directory)
+    _, y = store.load_split(split)
+    folds = CrossValidationFolds.load(store, name, split)
+    train_idx, val_idx = folds.indices(fold)
+
+    labels = y.to_numpy()
+    y_train, y_val = labels[train_idx], labels[val_idx]
+    model = train_chunked(
+        matrix_chunks(store, split, batch_rows, rows=train_idx),
+        store.columns,
+        {**(hyperparameters or {}), 'n_jobs': threads},
+        random_state,
+        labels=y_train
+    )
+    proba = np.concatenate([
+        model.predict_proba(block)[:, 1]
+        for block, _ in matrix_chunks(store, split, batch_rows, rows=val_idx)()
+    ])
+    predictions = (proba >= 0.5).astype(int)
+
+    return {
+        'fold': fold,
+        'train_rows': int(len(train_idx)),
+        'validation_rows': int(len(val_idx)),
+        'auc_roc': float(roc_auc_score(y_val, proba)) if len(np.unique(y_val)) > 1 else float('nan'),
+        'average_precision': float(average_precision_score(y_val, proba)) if y_val.any() else float('nan'),
+        'precision': float(precision_score(y_val, predictions, zero_division=0)),
+        'recall': float(recall_score(y_val, predictions, zero_division=0)),
+        'f1_score': float(f1_score(y_val, predictions, zero_division=0)),
+    }
+
+
+def run_cross_validation(
+    store: FeatureMatrixStore,
+    folds: CrossValidationFolds,
+    hyperparameters: Optional[Dict] = None,
+    random_state: int = 42,
+    n_jobs: int = 1,
+    batch_rows: int = 250_000
+) -> Dict:
+    """
+    Train and score every fold, ``n_jobs`` folds at a time.
+
+    Args:
+        store: Matrix store holding the split and its stored folds
+        folds: Fold assignment (already saved in ``store``)
+        hyperparameters: XGBoost overrides
+        random_state: Random seed
+        n_jobs: Parallel fold workers (XGBoost threads are divided among them)
+        batch_rows: Rows per block read from the matrix when training and scoring
+
+    Returns:
+        Per-fold metrics plus mean/std of each metric. ``n_folds`` is the
+        number of folds actually scored (time folds without earlier rows to
+        train on are skipped); ``requested_folds`` is the configured count.
+    """
+    fold_ids = list(range(folds.n_folds))
+    if folds.method == 'time':
+        fold_ids = [fold for fold in fold_ids if (folds.assignment < fold).any()]
+    n_jobs = max(1, min(n_jobs, len(fold_ids)))
+    threads = max(1, (os.cpu_count() or 1) // n_jobs)
+    args = [
+        (str(store.directory), folds.split, folds.name, fold, hyperparameters, random_state, threads, batch_rows)
+        for fold in fold_ids
+    ]
+
+    logger.info(f"Cross-validating {len(fold_ids)} {folds.method} folds with {n_jobs} worker(s)...")
+    if n_jobs == 1:
+        per_fold: List[Dict] = [_run_fold(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            per_fold = list(executor.map(_run_fold, *zip(*args)))
+
+    summary = {'method': folds.method, 'n_folds': len(per_fold), 'requested_folds': folds.n_folds, 'folds': per_fold}
+    for metric in ('auc_roc', 'average_precision', 'precision', 'recall', 'f1_score'):
+        values = np.array([result[metric] for result in per_fold], dtype=float)
+        summary[f'{metric}_mean'] = float(np.nanmean(values)) if np.isfinite(values).any() else float('nan')
+        summary[f'{metric}_std'] = float(np.nanstd(values)) if np.isfinite(values).any() else float('nan')
+
+    logger.info(f"CV AUC-ROC: {summary['auc_roc_mean']:.4f} +/- {summary['auc_roc_std']:.4f}")
+    return summary
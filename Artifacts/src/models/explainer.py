@@ -227,14 +227,15 @@ if __name__ == "__main__":
     # Example usage
     # explainer = FraudExplainer("models/xgboost_fraud_latest.pkl")
     
-    # Load training data for background
-    # X_train = pd.read_csv("data/processed/X_train.csv")
+    # Map training data for background (no parsing, shared page cache)
+    # from models.feature_matrix import FeatureMatrixStore
+    # X_train, _ = FeatureMatrixStore("data/processed").load_split('train')
     
     # Create explainer
     # explainer.create_explainer(X_train, sample_size=1000)
     
     # Explain single prediction
-    # X_test = pd.read_csv("data/processed/X_test.csv").head(1)
+    # X_test = FeatureMatrixStore("data/processed").load_split('test')[0].head(1)
     # explanation = explainer.explain_prediction(X_test.iloc[0])
     
     # print(f"Top contributing features: {explanation['top_features']}")
@@ -0,0 +1,219 @@
+"""
+Chunked XGBoost training data for splits larger than RAM.
+
+A ``ChunkIter`` feeds XGBoost one block of rows at a time from disk (the
+memory-mapped ``FeatureMatrixStore`` split, or feature/label CSVs read with
+``chunksize``). XGBoost sketches quantiles over the blocks and keeps only
+the binned matrix:
+
+- 'quantile': ``QuantileDMatrix`` holds the bins in memory (about one byte
+  per value instead of a float copy of the frame plus XGBoost's own)
+- 'external': ``ExtMemQuantileDMatrix`` pages the bins to a disk cache, so
+  memory is bounded by the block size
+
+Both need ``tree_method='hist'``.
+"""
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from .cross_validation import xgboost_params
+from .feature_matrix import FeatureMatrixStore
+
+logger = logging.getLogger(__name__)
+
+DMATRIX_MODES = ('quantile', 'external')
+
+Chunks = Iterable[Tuple[np.ndarray, np.ndarray]]
+
+
+class ChunkIter(xgb.DataIter):
+    """
+    XGBoost data iterator over a re-startable stream of (X, y) blocks.
+
+    Args:
+        chunks: Called on every pass (XGBoost reads the data more than once);
+            returns an iterable of (float32 features, labels)
+        feature_names: Column names passed to XGBoost
+        cache_prefix: Disk cache prefix (external memory only)
+    """
+
+    def __init__(
+        self,
+        chunks: Callable[[], Chunks],
+        feature_names: List[str],
+        cache_prefix: Optional[str] = None
+    ):
+        self.chunks = chunks
+        self.feature_names = feature_names
+        self._blocks: Optional[Iterator[Tuple[np.ndarray, np.ndarray]]] = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data: Callable) -> bool:
+        if self._blocks is None:
+            self._blocks = iter(self.chunks())
+        block = next(self._blocks, None)
+        if block is None:
+            return False
+        X, y = block
+        input_data(data=X, label=y, feature_names=self.feature_names)
+        return True
+
+    def reset(self):
+        self._blocks = None
+
+
+def matrix_chunks(
+    store: FeatureMatrixStore,
+    split: str = 'train',
+    batch_rows: int = 250_000,
+    rows: Optional[np.ndarray] = None
+) -> Callable[[], Chunks]:
+    """
+    Block reader over a stored split.
+
+    Each block is copied out of a fresh mapping of the file, so pages of
+    earlier blocks leave the process and only one block is resident.
+
+    Args:
+        store: Matrix store holding ``split``
+        split: Split name
+        batch_rows: Rows per block
+        rows: Optional sorted row positions to read (e.g. one CV fold)
+    """
+    def chunks():
+        total = store.manifest()['splits'][split]['rows'] if rows is None else len(rows)
+        for start in range(0, total, batch_rows):
+            X, y = store.load_split(split)
+            if rows is None:
+                block = slice(start, start + batch_rows)
+                yield np.array(X.to_numpy()[block]), np.array(y.to_numpy()[block])
+            else:
+                block = rows[start:start + batch_rows]
+                yield X.to_numpy()[block], y.to_numpy()[block]
+            del X, y
+
+    return chunks
+
+
+def csv_chunks(X_path: str, y_path: str, batch_rows: int = 250_000) -> Callable[[], Chunks]:
+    """Block reader over feature/label CSVs (cleaned like ``load_training_data``)."""
+    def chunks():
+        X_reader = pd.read_csv(X_path, chunksize=batch_rows)
+        y_reader = pd.read_csv(y_path, chunksize=batch_rows)
+        for X, y in zip(X_reader, y_reader):
+            block = X.to_numpy(dtype=np.float32, na_value=np.nan)
+            np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            yield block, y.iloc[:, 0].to_numpy()
+
+    return chunks
+
+
+def label_stats(chunks: Callable[[], Chunks]) -> Tuple[int, float]:
+    """(rows, fraud rate) from one pass over the labels."""
+    rows = positives = 0
+    for _, y in chunks():
+        rows += len(y)
+        positives += int(np.sum(y))
+    return rows, positives / rows if rows else 0.0
+
+
+def build_dmatrix(
+    chunks: Callable[[], Chunks],
+    feature_names: List[str],
+    mode: str = 'quantile',
+    max_bin: int = 256,
+    cache_dir: Optional[str] = None,
+    ref: Optional[xgb.DMatrix] = None
+) -> xgb.DMatrix:
+    """
+    Quantile-binned XGBoost matrix built block by block.
+
+    Args:
+        chunks: Block reader (``matrix_chunks`` / ``csv_chunks``)
+        feature_names: Column names
+        mode: 'quantile' (bins in memory) or 'external' (bins paged to disk)
+        max_bin: Histogram bins per feature
+        cache_dir: Directory of the external-memory cache (required for
+            'external'; the caller owns it and removes it after training)
+        ref: Training matrix whose bin edges an evaluation matrix must reuse
+    """
+    if mode not in DMATRIX_MODES:
+        raise ValueError(f"Unknown mode '{mode}', expected one of {DMATRIX_MODES}")
+
+    if mode == 'quantile':
+        return xgb.QuantileDMatrix(ChunkIter(chunks, feature_names), max_bin=max_bin, ref=ref)
+
+    if cache_dir is None:
+        raise ValueError("External-memory mode needs a cache_dir")
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    iterator = ChunkIter(chunks, feature_names, cache_prefix=os.path.join(cache_dir, 'cache'))
+    return xgb.ExtMemQuantileDMatrix(iterator, max_bin=max_bin, ref=ref)
+
+
+def booster_params(params: Dict) -> Tuple[Dict, int]:
+    """Translate ``xgboost_params`` (sklearn names) to ``xgb.train`` params and rounds."""
+    params = dict(params)
+    rounds = params.pop('n_estimators', 100)
+    if 'random_state' in params:
+        params['seed'] = params.pop('random_state')
+    if 'n_jobs' in params:
+        n_jobs = params.pop('n_jobs')
+        params['nthread'] = os.cpu_count() if n_jobs in (None, -1) else n_jobs
+    return params, rounds
+
+
+def train_chunked(
+    chunks: Callable[[], Chunks],
+    feature_names: List[str],
+    hyperparameters: Optional[Dict] = None,
+    random_state: int = 42,
+    mode: str = 'quantile',
+    max_bin: int = 256,
+    cache_dir: Optional[str] = None,
+    labels: Optional[np.ndarray] = None
+) -> xgb.XGBClassifier:
+    """
+    Train on a block stream without materializing the training frame.
+
+    Args:
+        chunks: Training block reader
+        feature_names: Column names
+        hyperparameters: Overrides of the default training hyperparameters
+        random_state: Random seed
+        mode: 'quantile' or 'external'
+        max_bin: Histogram bins per feature
+        cache_dir: External-memory cache directory (default: a temporary
+            directory removed after training)
+        labels: Training labels, if cheap to load (else read in an extra pass)
+
+    Returns:
+        Classifier wrapping the trained booster (same interface as ``train_xgboost``)
+    """
+    if labels is None:
+        rows, fraud_rate = label_stats(chunks)
+    else:
+        rows, fraud_rate = len(labels), float(np.mean(labels))
+    # xgboost_params only needs the mean of the labels
+    params = xgboost_params(np.array([fraud_rate]), hyperparameters, random_state)
+    params['tree_method'] = 'hist'
+    train_params, rounds = booster_params(params)
+    train_params['max_bin'] = max_bin
+
+    logger.info(f"Building {mode} DMatrix over {rows:,} rows (fraud rate {fraud_rate:.4f})...")
+    with tempfile.TemporaryDirectory(prefix='xgb-cache-') as tmp_dir:
+        dtrain = build_dmatrix(chunks, feature_names, mode, max_bin, cache_dir or tmp_dir)
+        booster = xgb.train(train_params, dtrain, num_boost_round=rounds)
+        # Release the cache pages before the directory is removed
+        del dtrain
+
+    model = xgb.XGBClassifier(**params)
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    return model
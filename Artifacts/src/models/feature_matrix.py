@@ -0,0 +1,279 @@
+"""
+Memory-mapped feature matrices for training, evaluation and SHAP.
+
+Processed splits are stored once as contiguous float32 ``.npy`` arrays
+(features) and int8 arrays (labels), with a JSON manifest holding the shared
+column order. Missing and infinite values are zeroed at write time, so
+loading is an ``np.load(..., mmap_mode='r')`` with no parsing or cleaning
+copies. Processes that map the same files share one page-cache copy.
+"""
+
+import json
+import logging
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "feature_matrices.json"
+FEATURE_DTYPE = np.float32
+LABEL_DTYPE = np.int8
+
+# Fixed .npy (v1.0) header size, so row counts can be patched in after streaming
+NPY_HEADER_BYTES = 128
+
+
+def _npy_header(shape: Tuple[int, ...], dtype) -> bytes:
+    """Version 1.0 .npy header padded to ``NPY_HEADER_BYTES``."""
+    header = repr({'descr': np.dtype(dtype).str, 'fortran_order': False, 'shape': tuple(shape)})
+    prefix = b'\x93NUMPY\x01\x00'
+    padding = NPY_HEADER_BYTES - len(prefix) - 2 - len(header) - 1
+    if padding < 0:
+        raise ValueError(f"Shape {shape} does not fit in a {NPY_HEADER_BYTES}-byte header")
+    return prefix + struct.pack('<H', NPY_HEADER_BYTES - len(prefix) - 2) + (header + ' ' * padding + '\n').encode('latin1')
+
+
+class SplitWriter:
+    """
+    Append rows to one split without knowing its final length.
+
+    Rows are cleaned (NaN/inf -> 0) and appended to the ``.npy`` bodies;
+    ``close`` patches the row count into the fixed-size headers and records
+    the split in the manifest. Used by ``FeatureMatrixStore.save_split`` and
+    for streaming splits chunk by chunk.
+    """
+
+    def __init__(self, store: "FeatureMatrixStore", split: str, columns: Sequence[str], labels: bool = True):
+        self.store = store
+        self.split = split
+        self.columns = [str(column) for column in columns]
+        self.label = None
+        self.rows = 0
+        self.X_path = store.directory / f"X_{split}.npy"
+        self.y_path = store.directory / f"y_{split}.npy" if labels else None
+        store.directory.mkdir(parents=True, exist_ok=True)
+
+        self._X = open(self.X_path, 'wb')
+        self._X.write(_npy_header((0, len(self.columns)), FEATURE_DTYPE))
+        self._y = None
+        if self.y_path is not None:
+            self._y = open(self.y_path, 'wb')
+            self._y.write(_npy_header((0,), LABEL_DTYPE))
+
+    def append(self, X: pd.DataFrame, y=None, chunk_rows: int = 250_000):
+        """Clean and append a block of rows (and their labels)."""
+        if [str(column) for column in X.columns] != self.columns:
+            raise ValueError(f"Columns of block differ from split '{self.split}'")
+        for start in range(0, len(X), chunk_rows):
+            block = np.array(
+                X.iloc[start:start + chunk_rows].to_numpy(dtype=FEATURE_DTYPE, na_value=np.nan),
+                dtype=FEATURE_DTYPE, order='C'
+            )
+            np.nan_to_num(block, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+            self._X.write(block.tobytes())
+        if self._y is not None:
+            if y is None:
+                raise ValueError(f"Split '{self.split}' was opened with labels")
+            self.label = self.label or str(getattr(y, 'name', None) or 'label')
+            self._y.write(np.asarray(y, dtype=LABEL_DTYPE).tobytes())
+        self.rows += len(X)
+
+    def close(self) -> Path:
+        """Finalize headers and register the split in the manifest."""
+        self._X.seek(0)
+        self._X.write(_npy_header((self.rows, len(self.columns)), FEATURE_DTYPE))
+        self._X.close()
+        entry = {'rows': self.rows, 'X': self.X_path.name, 'created_at': datetime.now().isoformat()}
+        if self._y is not None:
+            self._y.seek(0)
+            self._y.write(_npy_header((self.rows,), LABEL_DTYPE))
+            self._y.close()
+            entry.update({'y': self.y_path.name, 'label': self.label or 'label'})
+        self.store._register(self.split, self.columns, entry)
+        logger.info(f"Saved split '{self.split}' ({self.rows:,} x {len(self.columns)}) to {self.X_path}")
+        return self.X_path
+
+    def abort(self):
+        """Close the files without registering the (incomplete) split."""
+        self._X.close()
+        if self._y is not None:
+            self._y.close()
+
+    def __enter__(self) -> "SplitWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class FeatureMatrixStore:
+    """
+    Directory of memory-mapped split matrices sharing one column manifest.
+
+    Layout::
+
+        feature_matrices.json   columns, dtypes and per-split row counts
+        X_train.npy / y_train.npy
+        X_test.npy  / y_test.npy
+    """
+
+    def __init__(self, directory: Union[str, Path] = "data/processed"):
+        self.directory = Path(directory)
+        self.manifest_path = self.directory / MANIFEST_NAME
+
+    def exists(self, *splits: str) -> bool:
+        """Whether the manifest lists every requested split."""
+        if not self.manifest_path.exists():
+            return False
+        manifest = self.manifest()
+        return all(split in manifest['splits'] for split in splits)
+
+    def is_fresh(self, *splits: str, sources: Sequence[Union[str, Path]] = ()) -> bool:
+        """
+        Whether every split exists and was written after the given source files.
+
+        Writers that only refresh the CSV splits leave older matrices behind;
+        comparing modification times keeps readers from mapping them.
+
+        Args:
+            splits: Split names that must be stored
+            sources: Files the splits were derived from (missing ones are ignored)
+        """
+        if not self.exists(*splits):
+            return False
+        manifest = self.manifest()
+        written = min(
+            (self.directory / entry[key]).stat().st_mtime
+            for split in splits
+            for entry in [manifest['splits'][split]]
+            for key in ('X', 'y') if key in entry
+        ) if splits else self.manifest_path.stat().st_mtime
+        changed = [Path(source).stat().st_mtime for source in sources if Path(source).exists()]
+        if changed and max(changed) > written:
+            logger.warning(f"Feature matrices in {self.directory} are older than their source CSVs; ignoring them")
+            return False
+        return True
+
+    def reset(self):
+        """Forget stored splits (their files are overwritten by the next save)."""
+        if self.manifest_path.exists():
+            self.manifest_path.unlink()
+
+    def manifest(self) -> Dict:
+        """Parsed manifest."""
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    @property
+    def columns(self) -> List[str]:
+        """Feature column order shared by every split."""
+        return self.manifest()['columns']
+
+    def save_split(
+        self,
+        split: str,
+        X: pd.DataFrame,
+        y: Optional[pd.Series] = None,
+        chunk_rows: int = 250_000
+    ) -> Path:
+        """
+        Write one split as float32 features (and int8 labels).
+
+        Rows are converted in blocks and appended to the output file, so peak
+        memory is one block rather than a full float32 copy of ``X``.
+
+        Args:
+            split: Split name ('train', 'test', ...)
+            X: Feature frame; column order must match other saved splits
+            y: Optional labels aligned with ``X``
+            chunk_rows: Rows converted per block
+
+        Returns:
+            Path to the feature array
+        """
+        self._check_columns(split, X.columns)
+        with self.writer(split, X.columns, labels=y is not None) as writer:
+            writer.append(X, y, chunk_rows=chunk_rows)
+        return writer.X_path
+
+    def writer(self, split: str, columns: Sequence[str], labels: bool = True) -> SplitWriter:
+        """Open a streaming writer for one split (use as a context manager)."""
+        self._check_columns(split, columns)
+        return SplitWriter(self, split, columns, labels=labels)
+
+    def _check_columns(self, split: str, columns: Sequence[str]):
+        if self.manifest_path.exists() and self.manifest()['columns'] != [str(column) for column in columns]:
+            raise ValueError(
+                f"Columns of split '{split}' differ from the stored manifest; "
+                "save all splits with the same column order"
+            )
+
+    def _register(self, split: str, columns: List[str], entry: Dict):
+        """Record a finished split in the manifest (written atomically)."""
+        manifest = self.manifest() if self.manifest_path.exists() else {
+            'columns': columns,
+            'feature_dtype': np.dtype(FEATURE_DTYPE).name,
+            'label_dtype': np.dtype(LABEL_DTYPE).name,
+            'splits': {}
+        }
+        manifest['splits'][split] = entry
+
+        tmp_path = self.manifest_path.with_suffix('.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        tmp_path.replace(self.manifest_path)
+
+    def load_split(
+        self,
+        split: str,
+        mmap_mode: Optional[str] = 'r'
+    ) -> Tuple[pd.DataFrame, Optional[pd.Series]]:
+        """
+        Map one split without parsing or copying.
+
+        Args:
+            split: Split name
+            mmap_mode: ``np.load`` mode ('r' = shared read-only pages,
+                None = read into memory)
+
+        Returns:
+            (X, y): X is a DataFrame view over the mapped array; y is None
+            when the split was saved without labels
+        """
+        manifest = self.manifest()
+        if split not in manifest['splits']:
+            raise KeyError(f"Split '{split}' not in {self.manifest_path}")
+        entry = manifest['splits'][split]
+
+        matrix = np.load(self.directory / entry['X'], mmap_mode=mmap_mode)
+        X = pd.DataFrame(matrix, columns=manifest['columns'], copy=False)
+        y = None
+        if 'y' in entry:
+            y = pd.Series(np.load(self.directory / entry['y'], mmap_mode=mmap_mode), name=entry['label'])
+        return X, y
+
+    def save_splits(
+        self,
+        X_train: pd.DataFrame,
+        X_test: pd.DataFrame,
+        y_train: pd.Series,
+        y_test: pd.Series
+    ):
+        """Write the train and test splits, replacing any stored splits."""
+        self.reset()
+        self.save_split('train', X_train, y_train)
+        self.save_split('test', X_test, y_test)
+
+    def load_splits(self) -> Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]:
+        """Map the train and test splits as X_train, y_train, X_test, y_test."""
+        X_train, y_train = self.load_split('train')
+        X_test, y_test = self.load_split('test')
+        return X_train, y_train, X_test, y_test
@@ -0,0 +1,257 @@
+"""
+Compiled single-row feature plan for the serving path.
+Turns a raw transaction straight into a float32 vector in training column order.
+"""
+
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Raw request fields copied through unchanged
+PASSTHROUGH_FIELDS = [
+    'amount', 'step', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest'
+]
+
+
+def _value(transaction: Any, name: str):
+    """Read a field from a dict, a pydantic request or its ``features`` dict."""
+    if isinstance(transaction, Mapping):
+        value = transaction.get(name)
+        extra = transaction.get('features')
+    else:
+        value = getattr(transaction, name, None)
+        extra = getattr(transaction, 'features', None)
+    if value is None and extra:
+        value = extra.get(name)
+    return value
+
+
+def _number(value, default: float = 0.0) -> float:
+    """Coerce to float, mapping missing and non-finite values like training did."""
+    if value is None:
+        return default
+    value = float(value)
+    return value if math.isfinite(value) else default
+
+
+class FeaturePlan:
+    """
+    Fitted, serializable mapping from raw transaction fields to model input.
+
+    Captures the training column order and the training-time statistics
+    (e.g. amount mean/std for ``amount_normalized``) so serving never
+    recomputes them from the request. Derivations mirror
+    ``FraudFeatureEngineer.engineer_paysim_features``; columns the request
+    cannot provide fall back to 0, which is what ``fillna(0)`` gave them
+    during training.
+    """
+
+    def __init__(
+        self,
+        feature_columns: Sequence[str],
+        amount_mean: float,
+        amount_std: float,
+        used_columns: Optional[Sequence[str]] = None
+    ):
+        self.feature_columns = list(feature_columns)
+        self.amount_mean = float(amount_mean)
+        self.amount_std = float(amount_std)
+        self.used_columns = list(used_columns) if used_columns is not None else None
+        self._ops = self._compile()
+
+    @classmethod
+    def fit(cls, feature_columns: Sequence[str], engineer) -> "FeaturePlan":
+        """
+        Build a plan from the training columns and the engineer that made them.
+
+        The amount statistics are the engineer's own ``amount_stats``, so
+        options such as ``keep_types`` that change which rows they describe
+        apply at serving time too.
+
+        Args:
+            feature_columns: Model input columns in training order (``X_train.columns``)
+            engineer: ``FraudFeatureEngineer`` that engineered the PaySim features
+
+        Returns:
+            Fitted FeaturePlan
+        """
+        if engineer.amount_stats is None:
+            raise ValueError("Engineer has not engineered PaySim features yet")
+        plan = cls(
+            feature_columns,
+            amount_mean=engineer.amount_stats['mean'],
+            amount_std=engineer.amount_stats['std']
+        )
+        logger.info(f"Feature plan fitted for {len(plan.feature_columns)} columns")
+        return plan
+
+    def restrict_to_model(self, model) -> "FeaturePlan":
+        """
+        Skip columns the booster never splits on (they are emitted as 0).
+
+        Args:
+            model: Fitted XGBClassifier or Booster trained on ``feature_columns``
+
+        Returns:
+            self, recompiled
+        """
+        try:
+            from ..data.feature_registry import referenced_features
+        except ImportError:  # imported as top-level ``models`` (scripts put src on sys.path)
+            from data.feature_registry import referenced_features
+
+        used = set(referenced_features(model))
+        self.used_columns = [column for column in self.feature_columns if column in used]
+        self._ops = self._compile()
+        logger.info(f"Feature plan restricted to {len(self.used_columns)}/{len(self.feature_columns)} columns")
+        return self
+
+    def _derivations(self) -> Dict[str, Callable[[Dict[str, Any]], float]]:
+        """Per-column functions over a dict of already-extracted raw values."""
+        mean, std = self.amount_mean, self.amount_std
+
+        def given_or(field, fallback):
+            return lambda raw: _number(raw[field]) if raw[field] is not None else fallback(raw)
+
+        derivations = {
+            # Temporal
+            'hour': given_or('hour', lambda raw: _number(raw['step']) % 24),
+            'day_of_week': given_or('day_of_week', lambda raw: (_number(raw['step']) // 24) % 7),
+            'is_weekend': lambda raw: float(derivations['day_of_week'](raw) >= 5),
+            # Amount
+            'amount_log': lambda raw: math.log1p(_number(raw['amount'])),
+            'amount_sqrt': lambda raw: math.sqrt(_number(raw['amount'])),
+            'amount_normalized': lambda raw: (_number(raw['amount']) - mean) / (std + 1e-8),
+            # Balance
+            'orig_balance_diff': lambda raw: _number(raw['newbalanceOrig']) - _number(raw['oldbalanceOrg']),
+            'dest_balance_diff': lambda raw: _number(raw['newbalanceDest']) - _number(raw['oldbalanceDest']),
+            'balance_ratio_orig': lambda raw: _number(raw['newbalanceOrig']) / (_number(raw['oldbalanceOrg']) + 1),
+            'balance_ratio_dest': lambda raw: _number(raw['newbalanceDest']) / (_number(raw['oldbalanceDest']) + 1),
+            # Risk
+            'balance_depletion_orig': lambda raw: float(
+                raw['oldbalanceOrg'] is not None and raw['newbalanceOrig'] is not None
+                and _number(raw['oldbalanceOrg']) == 0 and _number(raw['newbalanceOrig']) == 0
+            ),
+            'balance_depletion_dest': lambda raw: float(
+                raw['oldbalanceDest'] is not None and raw['newbalanceDest'] is not None
+                and _number(raw['oldbalanceDest']) == 0 and _number(raw['newbalanceDest']) == 0
+            ),
+        }
+        return derivations
+
+    def _compile(self) -> List[Callable[[Dict[str, Any]], float]]:
+        """Resolve every training column to one function, once."""
+        derivations = self._derivations()
+        used = set(self.used_columns) if self.used_columns is not None else None
+        ops = []
+        for column in self.feature_columns:
+            if used is not None and column not in used:
+                ops.append(lambda raw: 0.0)
+            elif column in derivations:
+                ops.append(derivations[column])
+            elif column in PASSTHROUGH_FIELDS:
+                ops.append(lambda raw, column=column: _number(raw[column]))
+            elif column.startswith('type_'):
+                type_name = column[len('type_'):]
+                ops.append(lambda raw, type_name=type_name: float(raw['type'] == type_name))
+            else:
+                # Velocity, behavioral or dataset-specific columns: supplied
+                # by the caller (e.g. account state) or defaulted to 0
+                ops.append(lambda raw, column=column: _number(raw['extra'].get(column)))
+        return ops
+
+    def _extract(self, transaction: Any, extra: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        """Pull the raw fields the compiled ops read, exactly once."""
+        raw = {name: _value(transaction, name) for name in PASSTHROUGH_FIELDS}
+        for name in ('hour', 'day_of_week', 'type'):
+            raw[name] = _value(transaction, name)
+
+        additional = {}
+        if isinstance(transaction, Mapping):
+            additional.update(transaction.get('features') or {})
+            additional.update(transaction)
+        else:
+            additional.update(getattr(transaction, 'features', None) or {})
+        if extra:
+            additional.update(extra)
+        raw['extra'] = additional
+        return raw
+
+    def transform(
+        self,
+        transaction: Any,
+        extra: Optional[Mapping[str, Any]] = None,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Build the model input vector for one transaction.
+
+        Args:
+            transaction: TransactionRequest or dict of raw fields
+            extra: Additional precomputed features (e.g. online velocity features)
+            out: Optional preallocated float32 row to fill
+
+        Returns:
+            float32 vector in training column order
+        """
+        if out is None:
+            out = np.empty(len(self._ops), dtype=np.float32)
+        raw = self._extract(transaction, extra)
+        for i, op in enumerate(self._ops):
+            value = op(raw)
+            out[i] = value if math.isfinite(value) else 0.0
+        return out
+
+    def transform_batch(
+        self,
+        transactions: Sequence[Any],
+        extras: Optional[Sequence[Optional[Mapping[str, Any]]]] = None
+    ) -> np.ndarray:
+        """
+        Build a 2-D float32 model input matrix.
+
+        Args:
+            transactions: TransactionRequests or dicts
+            extras: Optional per-transaction precomputed features
+
+        Returns:
+            Array of shape (len(transactions), n_features)
+        """
+        matrix = np.empty((len(transactions), len(self._ops)), dtype=np.float32)
+        for i, transaction in enumerate(transactions):
+            self.transform(transaction, extras[i] if extras else None, out=matrix[i])
+        return matrix
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable representation"""
+        return {
+            'feature_columns': self.feature_columns,
+            'amount_mean': self.amount_mean,
+            'amount_std': self.amount_std,
+            'used_columns': self.used_columns
+        }
+
+    def save(self, path: Union[str, Path]) -> Path:
+        """Save plan as JSON"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Feature plan saved to: {path}")
+        return path
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "FeaturePlan":
+        """Load a plan saved with ``save``"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(
+            data['feature_columns'], data['amount_mean'], data['amount_std'],
+            used_columns=data.get('used_columns')
+        )
@@ -0,0 +1,163 @@
+"""
+Warm-start retraining from the current production model.
+
+Instead of rebuilding the ensemble on the full history, the production
+booster is updated with newly labeled transactions only:
+
+- 'continue': boost a few more rounds on top of the existing trees
+- 'refresh': keep the tree structure and re-fit leaf values on the new rows
+
+New labels come from analyst feedback (``POST /api/v1/feedback``) stored
+on the ``transaction_logs`` row of the scored request; the logged request
+and online account features are vectorized with the saved ``FeaturePlan``,
+exactly as the serving path does.
+"""
+
+import json
+import logging
+import warnings
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+logger = logging.getLogger(__name__)
+
+RETRAIN_MODES = ('continue', 'refresh')
+
+# Key of the confirmed label inside a logged transaction's ``features``
+DEFAULT_LABEL_KEY = 'confirmed_fraud'
+
+
+# File suffix ``FraudModelTrainer.save_model`` writes per format
+MODEL_SUFFIXES = {'joblib': '.pkl', 'json': '.json'}
+
+
+def latest_model_path(
+    models_dir: Union[str, Path] = "models",
+    model_name: str = "xgboost_fraud",
+    format: str = "joblib"
+) -> Path:
+    """Newest versioned artifact written by ``FraudModelTrainer.save_model`` in ``format``."""
+    if format not in MODEL_SUFFIXES:
+        raise ValueError(f"Unknown format: {format}")
+    candidates = [
+        path for path in Path(models_dir).glob(f"{model_name}_*{MODEL_SUFFIXES[format]}")
+        if path.stem[len(model_name) + 1:].replace('_', '').isdigit()
+    ]
+    if not candidates:
+        raise FileNotFoundError(f"No '{model_name}' {format} model in {models_dir}")
+    # Stamps (YYYYmmdd_HHMMSS[_ffffff[_n]]) compare chronologically field by field
+    return max(candidates, key=lambda path: tuple(int(part) for part in path.stem[len(model_name) + 1:].split('_')))
+
+
+def load_labeled_logs(
+    database_url: str,
+    label_key: str = DEFAULT_LABEL_KEY,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None
+) -> Tuple[List[Dict], np.ndarray]:
+    """
+    Logged transactions that have received a confirmed label.
+
+    Args:
+        database_url: SQLAlchemy URL of the API database
+        label_key: Key of the confirmed label in the logged ``features``
+        since: Only rows logged after this time
+        limit: Maximum rows (newest last)
+
+    Returns:
+        (logged feature dicts, labels) in logging order
+    """
+    from sqlalchemy import create_engine, text
+
+    query = "SELECT features FROM transaction_logs"
+    params = {}
+    if since is not None:
+        query += " WHERE created_at > :since"
+        params['since'] = since
+    query += " ORDER BY id"
+    if limit is not None:
+        query += " LIMIT :limit"
+        params['limit'] = limit
+
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(query), params).fetchall()
+    finally:
+        engine.dispose()
+
+    records, labels = [], []
+    for (features,) in rows:
+        if isinstance(features, str):
+            features = json.loads(features)
+        if not features or features.get(label_key) is None:
+            continue
+        labels.append(int(features[label_key]))
+        records.append(features)
+
+    logger.info(f"Loaded {len(records):,} labeled of {len(rows):,} logged transactions")
+    return records, np.asarray(labels, dtype=np.int8)
+
+
+def continue_boosting(
+    base_model: xgb.XGBClassifier,
+    X: Union[pd.DataFrame, np.ndarray],
+    y,
+    n_rounds: int = 50,
+    hyperparameters: Optional[Dict] = None
+) -> xgb.XGBClassifier:
+    """Add ``n_rounds`` trees fitted to the new rows on top of the base booster."""
+    params = {**base_model.get_params(), **(hyperparameters or {})}
+    params.update(n_estimators=n_rounds, early_stopping_rounds=None)
+    model = xgb.XGBClassifier(**params)
+    model.fit(X, y, xgb_model=base_model.get_booster(), verbose=False)
+    return model
+
+
+def booster_train_params(booster: xgb.Booster) -> Dict[str, str]:
+    """Objective, class weighting, tree parameters and seed stored in a booster's config."""
+    learner = json.loads(booster.save_config())['learner']
+    params = dict(learner['gradient_booster'].get('tree_train_param', {}))
+    params['objective'] = learner['objective']['name']
+    params.update(learner['objective'].get('reg_loss_param', {}))
+    params['seed'] = learner['generic_param']['seed']
+    return params
+
+
+def refresh_leaves(
+    base_model: xgb.XGBClassifier,
+    X: Union[pd.DataFrame, np.ndarray],
+    y,
+    hyperparameters: Optional[Dict] = None
+) -> xgb.XGBClassifier:
+    """
+    Re-fit the leaf values of every existing tree on the new rows (structure unchanged).
+
+    The base booster's own training parameters (``scale_pos_weight``,
+    regularization, ...) are reused so the leaves are fitted to the same
+    objective as the original trees.
+    """
+    base = base_model.get_booster()
+    params = {
+        **booster_train_params(base),
+        'process_type': 'update',
+        'updater': 'refresh',
+        'refresh_leaf': True,
+        **(hyperparameters or {})
+    }
+    dtrain = xgb.DMatrix(X, label=y, feature_names=base.feature_names)
+    with warnings.catch_warnings():
+        # The refresh updater is set explicitly on purpose
+        warnings.filterwarnings('ignore', message='.*updater.*')
+        booster = xgb.train(params, dtrain, num_boost_round=base.num_boosted_rounds(), xgb_model=base.copy())
+
+    model = xgb.XGBClassifier(**base_model.get_params())
+    model.load_model(bytearray(booster.save_raw('ubj')))
+    # Keep the base training config (not the refresh updater) for later updates
+    model.get_booster().load_config(base.save_config())
+    return model
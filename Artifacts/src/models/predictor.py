@@ -10,7 +10,9 @@ import pandas as pd
 import numpy as np
 import joblib
 import xgboost as xgb
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
+
+from .feature_plan import FeaturePlan
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +20,15 @@ logger = logging.getLogger(__name__)
 class FraudPredictor:
     """Load trained models and make fraud predictions."""
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, feature_plan_path: Optional[str] = None):
         self.model = None
         self.model_path = model_path
+        self.feature_plan = None
         
         if model_path:
             self.load_model(model_path)
+        if feature_plan_path:
+            self.load_feature_plan(feature_plan_path)
     
     def load_model(self, model_path: str):
         """
@@ -45,6 +50,16 @@ class FraudPredictor:
         self.model_path = model_path
         logger.info("Model loaded successfully!")
     
+    def load_feature_plan(self, feature_plan_path: str):
+        """
+        Load the fitted feature plan used to vectorize raw transactions.
+        
+        Args:
+            feature_plan_path: Path to plan JSON saved by FeaturePlan.save()
+        """
+        self.feature_plan = FeaturePlan.load(feature_plan_path)
+        logger.info(f"Feature plan loaded ({len(self.feature_plan.feature_columns)} columns)")
+    
     def predict(
         self,
         X: Union[pd.DataFrame, np.ndarray],
@@ -83,21 +98,28 @@ class FraudPredictor:
     
     def predict_single(
         self,
-        transaction: Dict,
-        threshold: float = 0.5
+        transaction: Any,
+        threshold: float = 0.5,
+        extra_features: Optional[Dict] = None
     ) -> Dict:
         """
         Predict fraud for a single transaction.
         
+        With a feature plan loaded, ``transaction`` may be a raw
+        TransactionRequest (or dict) and is vectorized without pandas.
+        
         Args:
-            transaction: Dictionary of transaction features
+            transaction: Dictionary of transaction features, or raw request
             threshold: Classification threshold
+            extra_features: Precomputed features (e.g. online velocity)
             
         Returns:
             Dictionary with prediction and probability
         """
-        # Convert to DataFrame
-        X = pd.DataFrame([transaction])
+        if self.feature_plan is not None:
+            X = self.feature_plan.transform(transaction, extra_features)[np.newaxis, :]
+        else:
+            X = pd.DataFrame([transaction])
         
         # Predict
         y_pred, y_proba = self.predict(X, threshold=threshold, return_proba=True)
@@ -110,21 +132,25 @@ class FraudPredictor:
     
     def predict_batch(
         self,
-        transactions: List[Dict],
-        threshold: float = 0.5
+        transactions: List[Any],
+        threshold: float = 0.5,
+        extra_features: Optional[List[Optional[Dict]]] = None
     ) -> List[Dict]:
         """
         Predict fraud for multiple transactions.
         
         Args:
-            transactions: List of transaction dictionaries
+            transactions: List of transaction dictionaries (or raw requests)
             threshold: Classification threshold
+            extra_features: Optional per-transaction precomputed features
             
         Returns:
             List of prediction dictionaries
         """
-        # Convert to DataFrame
-        X = pd.DataFrame(transactions)
+        if self.feature_plan is not None:
+            X = self.feature_plan.transform_batch(transactions, extra_features)
+        else:
+            X = pd.DataFrame(transactions)
         
         # Predict
         y_pred, y_proba = self.predict(X, threshold=threshold, return_proba=True)
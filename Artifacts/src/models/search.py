@@ -0,0 +1,233 @@
+"""
+Hyperparameter search with successive halving.
+
+Candidate configurations are sampled from a search space and trained for a
+few boosting rounds; only the best ``1/eta`` of each rung continue, warm
+started from their own booster, for ``eta`` times more rounds. Trials run in
+a process pool where every worker maps the same training matrix and gets a
+fixed share of the cores for XGBoost, so workers do not oversubscribe.
+The validation carve-out goes to a per-run temporary file that the
+workers map, so concurrent searches over one matrix do not collide.
+"""
+
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import xgboost as xgb
+from sklearn.metrics import average_precision_score, f1_score, precision_score, recall_score, roc_auc_score
+
+from .cross_validation import holdout_indices, xgboost_params
+from .feature_matrix import FeatureMatrixStore
+
+logger = logging.getLogger(__name__)
+
+# Values sampled uniformly per parameter
+DEFAULT_SEARCH_SPACE = {
+    'max_depth': [3, 4, 6, 8, 10],
+    'learning_rate': [0.02, 0.05, 0.1, 0.2, 0.3],
+    'subsample': [0.6, 0.7, 0.8, 0.9, 1.0],
+    'colsample_bytree': [0.5, 0.7, 0.8, 1.0],
+    'min_child_weight': [1, 3, 5, 10],
+    'gamma': [0.0, 0.1, 0.5, 1.0],
+    'reg_lambda': [0.5, 1.0, 2.0, 5.0],
+}
+
+LEADERBOARD_METRICS = ('auc_roc', 'average_precision')
+
+# Single-row predictions timed per trial (median reported)
+LATENCY_SAMPLES = 50
+
+
+def sample_configurations(
+    n_candidates: int,
+    search_space: Optional[Dict[str, List]] = None,
+    random_state: int = 42
+) -> List[Dict]:
+    """Draw ``n_candidates`` distinct configurations from the search space."""
+    space = search_space or DEFAULT_SEARCH_SPACE
+    rng = np.random.default_rng(random_state)
+    configs, seen = [], set()
+    for _ in range(n_candidates * 20):
+        config = {name: values[rng.integers(len(values))] for name, values in space.items()}
+        config = {name: value.item() if isinstance(value, np.generic) else value for name, value in config.items()}
+        key = tuple(sorted(config.items()))
+        if key not in seen:
+            seen.add(key)
+            configs.append(config)
+        if len(configs) == n_candidates:
+            break
+    return configs
+
+
+def rung_schedule(n_candidates: int, min_rounds: int, max_rounds: int, eta: int) -> List[Dict[str, int]]:
+    """Candidates and cumulative boosting rounds of every rung."""
+    rungs = []
+    candidates, rounds = n_candidates, min_rounds
+    while True:
+        rungs.append({'candidates': candidates, 'rounds': min(rounds, max_rounds)})
+        if candidates <= 1 or rounds >= max_rounds:
+            return rungs
+        candidates = max(1, candidates // eta)
+        rounds *= eta
+
+
+def _run_trial(
+    directory: str,
+    split: str,
+    holdout_path: str,
+    params: Dict,
+    rounds: int,
+    trained_rounds: int,
+    booster: Optional[bytearray],
+    threads: int
+) -> Dict:
+    """Boost one configuration up to ``rounds`` and score it (runs in a worker process)."""
+    store = FeatureMatrixStore(directory)
+    X, y = store.load_split(split)
+    holdout = np.load(holdout_path, mmap_mode='r')
+    fit_idx, val_idx = np.flatnonzero(holdout == 0), np.flatnonzero(holdout == 1)
+    matrix, labels = X.to_numpy(), y.to_numpy()
+
+    previous = None
+    if booster is not None:
+        previous = xgb.Booster()
+        previous.load_model(booster)
+
+    model = xgb.XGBClassifier(**{**params, 'n_estimators': rounds - trained_rounds, 'n_jobs': threads})
+    start = time.perf_counter()
+    model.fit(matrix[fit_idx], labels[fit_idx], xgb_model=previous, verbose=False)
+    train_seconds = time.perf_counter() - start
+
+    X_val, y_val = matrix[val_idx], labels[val_idx]
+    start = time.perf_counter()
+    proba = model.predict_proba(X_val)[:, 1]
+    batch_seconds = time.perf_counter() - start
+
+    single = []
+    for row in range(min(LATENCY_SAMPLES, len(X_val))):
+        start = time.perf_counter()
+        model.predict_proba(X_val[row:row + 1])
+        single.append(time.perf_counter() - start)
+
+    predictions = (proba >= 0.5).astype(int)
+    return {
+        'rounds': rounds,
+        'train_seconds': train_seconds,
+        'auc_roc': float(roc_auc_score(y_val, proba)) if len(np.unique(y_val)) > 1 else float('nan'),
+        'average_precision': float(average_precision_score(y_val, proba)) if y_val.any() else float('nan'),
+        'precision': float(precision_score(y_val, predictions, zero_division=0)),
+        'recall': float(recall_score(y_val, predictions, zero_division=0)),
+        'f1_score': float(f1_score(y_val, predictions, zero_division=0)),
+        'latency_us_per_row': batch_seconds / max(len(X_val), 1) * 1e6,
+        'single_row_latency_ms': float(np.median(single)) * 1000 if single else float('nan'),
+        'booster': bytearray(model.get_booster().save_raw('ubj')),
+    }
+
+
+def successive_halving(
+    store: FeatureMatrixStore,
+    n_candidates: int = 27,
+    min_rounds: int = 25,
+    max_rounds: int = 500,
+    eta: int = 3,
+    search_space: Optional[Dict[str, List]] = None,
+    metric: str = 'auc_roc',
+    validation_fraction: float = 0.2,
+    random_state: int = 42,
+    n_jobs: int = 1,
+    split: str = 'train'
+) -> Dict:
+    """
+    Successive-halving search over a stored training split.
+
+    Args:
+        store: Matrix store holding ``split``
+        n_candidates: Configurations sampled for the first rung
+        min_rounds: Boosting rounds of the first rung
+        max_rounds: Rounds of the final rung
+        eta: Survivors per rung are the best ``1/eta``; rounds grow by ``eta``
+        search_space: Parameter -> candidate values (default ``DEFAULT_SEARCH_SPACE``)
+        metric: Ranking metric ('auc_roc' or 'average_precision')
+        validation_fraction: Share of the split held out (stratified) for scoring
+        random_state: Random seed
+        n_jobs: Trials run in parallel (XGBoost threads are divided among them)
+        split: Split name
+
+    Returns:
+        Schedule, leaderboard (best first) and the best configuration
+    """
+    if metric not in LEADERBOARD_METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {LEADERBOARD_METRICS}")
+
+    _, y = store.load_split(split)
+    labels = np.asarray(y)
+    fit_idx, val_idx = holdout_indices(labels, validation_fraction, random_state=random_state)
+    holdout = np.zeros(len(labels), dtype=np.int8)
+    holdout[val_idx] = 1
+
+    base = xgboost_params(labels[fit_idx], random_state=random_state)
+    configs = sample_configurations(n_candidates, search_space, random_state)
+    schedule = rung_schedule(len(configs), min_rounds, max_rounds, eta)
+    n_jobs = max(1, min(n_jobs, len(configs)))
+    threads = max(1, (os.cpu_count() or 1) // n_jobs)
+
+    trials = [{'id': i, 'params': config, 'rung': 0, 'train_seconds': 0.0, 'booster': None, 'rounds': 0}
+              for i, config in enumerate(configs)]
+    alive = list(trials)
+    logger.info(f"Successive halving: {len(configs)} candidates, rungs {schedule}, {n_jobs} worker(s)")
+
+    # One pool for all rungs, so workers are not restarted between rungs
+    executor = ProcessPoolExecutor(max_workers=n_jobs) if n_jobs > 1 else None
+    run_dir = tempfile.TemporaryDirectory(prefix='search-')
+    try:
+        holdout_path = os.path.join(run_dir.name, f"holdout_{split}.npy")
+        np.save(holdout_path, holdout)
+        for rung, step in enumerate(schedule):
+            for dropped in alive[step['candidates']:]:
+                dropped['booster'] = None
+            alive = alive[:step['candidates']]
+            args = [
+                (str(store.directory), split, holdout_path, {**base, **trial['params']}, step['rounds'],
+                 trial['rounds'], trial['booster'], threads)
+                for trial in alive
+            ]
+            if executor is None:
+                results = [_run_trial(*arg) for arg in args]
+            else:
+                results = list(executor.map(_run_trial, *zip(*args)))
+            for trial, result in zip(alive, results):
+                trial['train_seconds'] += result.pop('train_seconds')
+                trial.update(result, rung=rung)
+            alive.sort(key=lambda trial: _score(trial, metric), reverse=True)
+            best = alive[0]
+            logger.info(
+                f"Rung {rung}: {len(alive)} x {step['rounds']} rounds, "
+                f"best #{best['id']} {metric}={best[metric]:.4f}"
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        run_dir.cleanup()
+
+    for trial in trials:
+        trial.pop('booster', None)
+    leaderboard = sorted(trials, key=lambda trial: (trial['rung'], _score(trial, metric)), reverse=True)
+    return {
+        'metric': metric,
+        'eta': eta,
+        'schedule': schedule,
+        'validation_rows': int(len(val_idx)),
+        'leaderboard': leaderboard,
+        'best': leaderboard[0],
+    }
+
+
+def _score(trial: Dict, metric: str) -> float:
+    value = trial.get(metric, float('nan'))
+    return float('-inf') if value is None or np.isnan(value) else value
+
@@ -4,6 +4,7 @@ Handles model training, hyperparameter tuning, and evaluation.
 """
 
 import os
+import shutil
 import logging
 from pathlib import Path
 import pandas as pd
@@ -13,12 +14,18 @@ from sklearn.metrics import (
     accuracy_score, precision_score, recall_score, f1_score,
     roc_auc_score, roc_curve, confusion_matrix, classification_report
 )
-from sklearn.model_selection import cross_val_score
 import joblib
 import json
 from datetime import datetime
 from typing import Dict, Tuple, Optional
 
+from .cross_validation import CrossValidationFolds, holdout_indices, json_safe, run_cross_validation, xgboost_params
+from .external_memory import csv_chunks, matrix_chunks, train_chunked
+from .feature_matrix import FeatureMatrixStore
+from .incremental import MODEL_SUFFIXES, RETRAIN_MODES, continue_boosting, latest_model_path, refresh_leaves
+from .predictor import FraudPredictor
+from .search import successive_halving
+
 logger = logging.getLogger(__name__)
 
 
@@ -42,28 +49,48 @@ class FraudModelTrainer:
         self.model = None
         self.feature_importance = None
         self.evaluation_metrics = {}
+        self.cv_results = None
+        self.training_info = {}
+        self.search_results = None
         
     def load_training_data(
         self,
         X_train_path: str = "data/processed/X_train.csv",
         y_train_path: str = "data/processed/y_train.csv",
         X_test_path: str = "data/processed/X_test.csv",
-        y_test_path: str = "data/processed/y_test.csv"
+        y_test_path: str = "data/processed/y_test.csv",
+        use_matrices: bool = True
     ) -> Tuple[pd.DataFrame, pd.Series, pd.DataFrame, pd.Series]:
         """
         Load training and test data.
         
+        Memory-mapped matrices saved by ``FeatureMatrixStore`` next to
+        ``X_train_path`` are preferred over the CSVs unless a CSV was
+        rewritten after them. They are already
+        float32 with missing/infinite values zeroed, so nothing is parsed
+        or copied.
+        
         Args:
             X_train_path: Path to training features
             y_train_path: Path to training labels
             X_test_path: Path to test features
             y_test_path: Path to test labels
+            use_matrices: Use the memory-mapped matrices when present
             
         Returns:
             X_train, y_train, X_test, y_test
         """
         logger.info("Loading training data...")
         
+        store = FeatureMatrixStore(Path(X_train_path).parent)
+        sources = (X_train_path, y_train_path, X_test_path, y_test_path)
+        if use_matrices and store.is_fresh('train', 'test', sources=sources):
+            logger.info(f"Mapping feature matrices from {store.directory}")
+            X_train, y_train, X_test, y_test = store.load_splits()
+            logger.info(f"Training set: {X_train.shape[0]:,} samples, {X_train.shape[1]} features")
+            logger.info(f"Test set: {X_test.shape[0]:,} samples")
+            return X_train, y_train, X_test, y_test
+        
         X_train = pd.read_csv(X_train_path)
         y_train = pd.read_csv(y_train_path).squeeze()
         X_test = pd.read_csv(X_test_path)
@@ -87,57 +114,92 @@ class FraudModelTrainer:
         self,
         X_train: pd.DataFrame,
         y_train: pd.Series,
-        hyperparameters: Optional[Dict] = None
+        hyperparameters: Optional[Dict] = None,
+        early_stopping_rounds: Optional[int] = 50,
+        validation_fraction: float = 0.1,
+        validation_method: str = "stratified",
+        eval_metric: str = "aucpr"
     ) -> xgb.XGBClassifier:
         """
         Train XGBoost fraud classifier.
         
+        A validation set is held out of the training split and boosting
+        stops once ``eval_metric`` on it has not improved for
+        ``early_stopping_rounds`` rounds. Trees after the best iteration are
+        dropped, so the saved model only carries the useful ones.
+        
         Args:
             X_train: Training features
             y_train: Training labels
             hyperparameters: Optional custom hyperparameters
+            early_stopping_rounds: Patience in rounds (None = train every round)
+            validation_fraction: Share of the training split held out
+            validation_method: 'stratified' or 'time' (latest steps; needs a 'step' column)
+            eval_metric: Metric watched for early stopping ('aucpr' or 'auc')
             
         Returns:
             Trained XGBoost model
         """
         logger.info("Training XGBoost fraud classifier...")
         
-        # Default hyperparameters (optimized for fraud detection)
-        default_params = {
-            'objective': 'binary:logistic',
-            'eval_metric': 'auc',
-            'max_depth': 8,
-            'learning_rate': 0.01,
-            'n_estimators': 500,
-            'subsample': 0.8,
-            'colsample_bytree': 0.8,
-            'min_child_weight': 3,
-            'gamma': 0.1,
-            'reg_alpha': 0.1,
-            'reg_lambda': 1.0,
-            'scale_pos_weight': (1 - y_train.mean()) / y_train.mean(),  # Handle class imbalance
-            'random_state': self.random_state,
-            'n_jobs': -1,
-            'tree_method': 'hist'
-        }
-        
-        # Merge with custom hyperparameters if provided
-        if hyperparameters:
-            default_params.update(hyperparameters)
+        X_fit, y_fit, X_val, y_val = X_train, y_train, None, None
+        if early_stopping_rounds:
+            if validation_method == 'time' and 'step' not in X_train.columns:
+                raise ValueError("Time-based validation needs a 'step' column in X_train")
+            steps = X_train['step'].to_numpy() if validation_method == 'time' else None
+            fit_idx, val_idx = holdout_indices(
+                np.asarray(y_train), validation_fraction, validation_method, steps, self.random_state
+            )
+            X_fit, y_fit = X_train.iloc[fit_idx], y_train.iloc[fit_idx]
+            X_val, y_val = X_train.iloc[val_idx], y_train.iloc[val_idx]
+            logger.info(
+                f"Held out {len(val_idx):,} {validation_method} validation rows "
+                f"(fraud rate {y_val.mean():.4f}) for early stopping on {eval_metric}"
+            )
+        
+        default_params = xgboost_params(y_fit, hyperparameters, self.random_state)
+        if X_val is not None:
+            default_params.update(eval_metric=eval_metric, early_stopping_rounds=early_stopping_rounds)
         
         logger.info(f"Hyperparameters: {default_params}")
         
         # Create and train model
         self.model = xgb.XGBClassifier(**default_params)
         
-        # Train with early stopping
+        # Train with early stopping on the held-out rows
         self.model.fit(
-            X_train,
-            y_train,
-            eval_set=[(X_train, y_train)],
+            X_fit,
+            y_fit,
+            eval_set=[(X_fit, y_fit) if X_val is None else (X_val, y_val)],
             verbose=100
         )
         
+        rounds = self.model.get_booster().num_boosted_rounds()
+        self.training_info = {
+            'model_type': 'XGBoost Classifier',
+            'training_samples': int(len(X_fit)),
+            'training_date': datetime.now().isoformat(),
+            'hyperparameters': default_params,
+            'rounds_trained': rounds,
+        }
+        if X_val is not None:
+            self._keep_best_trees()
+            self.training_info.update({
+                'best_iteration': int(self.model.best_iteration),
+                'best_score': float(self.model.best_score),
+                'eval_metric': eval_metric,
+                'early_stopping_rounds': early_stopping_rounds,
+                'validation': {
+                    'method': validation_method,
+                    'rows': int(len(X_val)),
+                    'fraud_rate': float(y_val.mean()),
+                },
+            })
+            logger.info(
+                f"Best iteration {self.model.best_iteration} of {rounds} "
+                f"(validation {eval_metric} {self.model.best_score:.4f})"
+            )
+        
         logger.info("Model training complete!")
         
         # Extract feature importance
@@ -150,6 +212,255 @@ class FraudModelTrainer:
         
         return self.model
     
+    def _keep_best_trees(self):
+        """Drop trees boosted after the best iteration (recorded as booster attributes)."""
+        best_iteration = self.model.best_iteration
+        best_score = self.model.best_score
+        booster = self.model.get_booster()[:best_iteration + 1]
+        booster.set_attr(best_iteration=str(best_iteration), best_score=str(best_score))
+        self.model.load_model(bytearray(booster.save_raw('ubj')))
+    
+    def train_xgboost_chunked(
+        self,
+        X_train_path: str = "data/processed/X_train.csv",
+        y_train_path: str = "data/processed/y_train.csv",
+        hyperparameters: Optional[Dict] = None,
+        mode: str = "quantile",
+        batch_rows: int = 250_000,
+        max_bin: int = 256,
+        cache_dir: Optional[str] = None
+    ) -> xgb.XGBClassifier:
+        """
+        Train XGBoost from on-disk features without loading the training split.
+        
+        Reads the memory-mapped 'train' matrix next to ``X_train_path`` when
+        present, else the CSVs, ``batch_rows`` at a time; XGBoost builds its
+        quantile-binned matrix from the blocks. With ``mode='external'`` the
+        bins are paged to disk too, so memory is bounded by the block size.
+        
+        Args:
+            X_train_path: Path to training features
+            y_train_path: Path to training labels
+            hyperparameters: Optional custom hyperparameters
+            mode: 'quantile' (binned matrix in memory) or 'external' (on disk)
+            batch_rows: Rows read per block
+            max_bin: Histogram bins per feature
+            cache_dir: External-memory cache directory (default: temp dir, removed after training)
+            
+        Returns:
+            Trained XGBoost model
+        """
+        store = FeatureMatrixStore(Path(X_train_path).parent)
+        if store.is_fresh('train', sources=(X_train_path, y_train_path)):
+            logger.info(f"Streaming training matrix from {store.directory} ({mode} mode)...")
+            chunks = matrix_chunks(store, 'train', batch_rows)
+            columns = store.columns
+            labels = store.load_split('train')[1].to_numpy()
+        else:
+            logger.info(f"Streaming training CSVs from {X_train_path} ({mode} mode)...")
+            chunks = csv_chunks(X_train_path, y_train_path, batch_rows)
+            columns = list(pd.read_csv(X_train_path, nrows=0).columns)
+            labels = pd.read_csv(y_train_path).squeeze().to_numpy()
+        
+        # Labels are one small column; only the features are streamed
+        self.model = train_chunked(
+            chunks, columns, hyperparameters, self.random_state, mode, max_bin, cache_dir, labels
+        )
+        
+        logger.info("Model training complete!")
+        
+        self.feature_importance = pd.DataFrame({
+            'feature': columns,
+            'importance': self.model.feature_importances_
+        }).sort_values('importance', ascending=False)
+        
+        logger.info(f"Top 10 features:\n{self.feature_importance.head(10)}")
+        
+        return self.model
+    
+    def cross_validate(
+        self,
+        matrix_dir: str = "data/processed",
+        n_folds: int = 5,
+        method: str = "stratified",
+        hyperparameters: Optional[Dict] = None,
+        n_jobs: int = 1
+    ) -> Dict:
+        """
+        Cross-validate on the memory-mapped training matrix.
+        
+        Fold indices are computed once and stored next to the matrix
+        (reused while the split is unchanged); folds run in ``n_jobs`` worker
+        processes that each map the same matrix file.
+        
+        Args:
+            matrix_dir: Directory of the ``FeatureMatrixStore`` with a 'train' split
+            n_folds: Number of folds
+            method: 'stratified' or 'time' (expanding window; needs a 'step' column)
+            hyperparameters: Overrides of the training hyperparameters
+            n_jobs: Folds trained in parallel
+            
+        Returns:
+            Cross-validation summary (also stored in the evaluation report)
+        """
+        store = FeatureMatrixStore(matrix_dir)
+        folds = CrossValidationFolds.load_or_create(store, n_folds, method, self.random_state)
+        self.cv_results = run_cross_validation(store, folds, hyperparameters, self.random_state, n_jobs)
+        return self.cv_results
+    
+    def search_hyperparameters(
+        self,
+        matrix_dir: str = "data/processed",
+        n_candidates: int = 27,
+        min_rounds: int = 25,
+        max_rounds: int = 500,
+        eta: int = 3,
+        search_space: Optional[Dict] = None,
+        metric: str = "auc_roc",
+        n_jobs: int = 1
+    ) -> Dict:
+        """
+        Successive-halving hyperparameter search on the memory-mapped training matrix.
+        
+        Candidates are scored on a stratified holdout of the 'train' split;
+        the best ``1/eta`` of each rung continue boosting. The leaderboard
+        (AUC, training time, per-row inference latency) is written to
+        ``reports/hyperparameter_search_<timestamp>.json``.
+        
+        Args:
+            matrix_dir: Directory of the ``FeatureMatrixStore`` with a 'train' split
+            n_candidates: Configurations in the first rung
+            min_rounds: Boosting rounds of the first rung
+            max_rounds: Boosting rounds of the last rung
+            eta: Halving rate
+            search_space: Parameter -> candidate values
+            metric: 'auc_roc' or 'average_precision'
+            n_jobs: Trials trained in parallel
+            
+        Returns:
+            Search summary; ``['best']['params']`` can be passed to ``train_xgboost``
+        """
+        store = FeatureMatrixStore(matrix_dir)
+        self.search_results = successive_halving(
+            store, n_candidates, min_rounds, max_rounds, eta, search_space, metric,
+            random_state=self.random_state, n_jobs=n_jobs
+        )
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        report_path = self.reports_dir / f"hyperparameter_search_{timestamp}.json"
+        with open(report_path, 'w') as f:
+            json.dump({'timestamp': datetime.now().isoformat(), **self.search_results}, f, indent=2)
+        
+        best = self.search_results['best']
+        logger.info(f"Best configuration #{best['id']} ({metric}={best[metric]:.4f}): {best['params']}")
+        logger.info(f"Search leaderboard saved to: {report_path}")
+        
+        return self.search_results
+    
+    def retrain_incremental(
+        self,
+        X_new: pd.DataFrame,
+        y_new: pd.Series,
+        base_model_path: Optional[str] = None,
+        mode: str = "continue",
+        n_rounds: int = 50,
+        hyperparameters: Optional[Dict] = None,
+        validation_fraction: float = 0.2,
+        max_auc_drop: float = 0.0,
+        model_name: str = "xgboost_fraud",
+        deploy: bool = True
+    ) -> Dict:
+        """
+        Update the production model with newly labeled transactions only.
+        
+        The current model is warm started: 'continue' boosts ``n_rounds``
+        more trees on the new rows, 'refresh' re-fits the leaf values of the
+        existing trees. A stratified share of the new rows is held out and
+        the update is kept only if its AUC there is at least the previous
+        version's minus ``max_auc_drop``; accepted models are saved as a new
+        versioned artifact and, with ``deploy``, become the model the API
+        loads (see ``deploy_model``).
+        
+        Args:
+            X_new: Features of the newly labeled transactions (training column order)
+            y_new: Their labels
+            base_model_path: Model to start from (default: newest ``model_name`` artifact)
+            mode: 'continue' or 'refresh'
+            n_rounds: Trees added in 'continue' mode
+            hyperparameters: Overrides for the update (e.g. a lower learning_rate)
+            validation_fraction: Share of the new rows used by the AUC guard
+            max_auc_drop: Tolerated AUC loss against the previous version
+            model_name: Artifact name
+            deploy: Point ``<model_name>_latest.pkl`` at an accepted update
+            
+        Returns:
+            Guard result: both AUCs, whether the update was accepted, its path
+            and the deployed path
+        """
+        if mode not in RETRAIN_MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {RETRAIN_MODES}")
+        
+        base_path = Path(base_model_path) if base_model_path else latest_model_path(self.models_dir, model_name)
+        previous = FraudPredictor(str(base_path)).model
+        logger.info(f"Warm starting from {base_path} ({mode} mode, {len(X_new):,} new rows)...")
+        
+        labels = np.asarray(y_new)
+        fit_idx, val_idx = holdout_indices(labels, validation_fraction, random_state=self.random_state)
+        X_fit, y_fit = X_new.iloc[fit_idx], labels[fit_idx]
+        X_val, y_val = X_new.iloc[val_idx], labels[val_idx]
+        
+        start = datetime.now()
+        if mode == 'continue':
+            model = continue_boosting(previous, X_fit, y_fit, n_rounds, hyperparameters)
+        else:
+            model = refresh_leaves(previous, X_fit, y_fit, hyperparameters)
+        seconds = (datetime.now() - start).total_seconds()
+        
+        previous_auc = float(roc_auc_score(y_val, previous.predict_proba(X_val)[:, 1]))
+        new_auc = float(roc_auc_score(y_val, model.predict_proba(X_val)[:, 1]))
+        accepted = new_auc >= previous_auc - max_auc_drop
+        
+        result = {
+            'mode': mode,
+            'base_model': str(base_path),
+            'new_rows': int(len(fit_idx)),
+            'validation_rows': int(len(val_idx)),
+            'trees': model.get_booster().num_boosted_rounds(),
+            'seconds': seconds,
+            'previous_auc': previous_auc,
+            'new_auc': new_auc,
+            'max_auc_drop': max_auc_drop,
+            'accepted': bool(accepted),
+            'model_path': None,
+            'deployed_path': None,
+        }
+        
+        if accepted:
+            logger.info(f"✅ Update accepted: AUC {previous_auc:.4f} -> {new_auc:.4f} ({seconds:.1f}s)")
+            self.model = model
+            self.feature_importance = pd.DataFrame({
+                'feature': X_new.columns,
+                'importance': self.model.feature_importances_
+            }).sort_values('importance', ascending=False)
+            self.training_info = {**self.training_info, 'incremental': result}
+            model_path = self.save_model(model_name)
+            result['model_path'] = str(model_path)
+            if deploy:
+                result['deployed_path'] = str(self.deploy_model(model_path, model_name))
+        else:
+            logger.warning(
+                f"⚠️  Update rejected: AUC {previous_auc:.4f} -> {new_auc:.4f} "
+                f"(allowed drop {max_auc_drop}); keeping {base_path}"
+            )
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        report_path = self.reports_dir / f"{model_name}_retrain_{timestamp}.json"
+        with open(report_path, 'w') as f:
+            json.dump(result, f, indent=2)
+        logger.info(f"Retrain report saved to: {report_path}")
+        
+        return result
+    
     def evaluate_model(
         self,
         X_test: pd.DataFrame,
@@ -242,13 +553,13 @@ class FraudModelTrainer:
         
         logger.info(f"Saving model as {model_name}...")
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = self._artifact_stamp(model_name)
         
         if format == "joblib":
-            model_path = self.models_dir / f"{model_name}_{timestamp}.pkl"
+            model_path = self.models_dir / f"{model_name}_{timestamp}{MODEL_SUFFIXES[format]}"
             joblib.dump(self.model, model_path)
         elif format == "json":
-            model_path = self.models_dir / f"{model_name}_{timestamp}.json"
+            model_path = self.models_dir / f"{model_name}_{timestamp}{MODEL_SUFFIXES[format]}"
             self.model.save_model(str(model_path))
         else:
             raise ValueError(f"Unknown format: {format}")
@@ -263,6 +574,42 @@ class FraudModelTrainer:
         
         return model_path
     
+    def _artifact_stamp(self, model_name: str) -> str:
+        """Version stamp (microsecond timestamp) that no artifact of ``model_name`` uses yet."""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        stamp, n = timestamp, 0
+        while any(self.models_dir.glob(f"{model_name}_{stamp}.*")):
+            n += 1
+            stamp = f"{timestamp}_{n}"
+        return stamp
+    
+    def deploy_model(self, model_path: Path, model_name: str = "xgboost_fraud") -> Path:
+        """
+        Make a saved artifact the one the API serves.
+        
+        Copies it over ``<model_name>_latest<suffix>`` (the API's default
+        ``MODEL_PATH``) through a temporary file and ``os.replace``, so a
+        starting API never reads a partial model.
+        
+        Args:
+            model_path: Artifact written by ``save_model``
+            model_name: Artifact name
+            
+        Returns:
+            Path of the deployed copy
+        """
+        model_path = Path(model_path)
+        latest_path = self.models_dir / f"{model_name}_latest{model_path.suffix}"
+        tmp_path = latest_path.with_name(f".{latest_path.name}.{os.getpid()}.tmp")
+        try:
+            shutil.copyfile(model_path, tmp_path)
+            os.replace(tmp_path, latest_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        logger.info(f"Deployed {model_path} as {latest_path}")
+        return latest_path
+    
     def save_evaluation_report(self, model_name: str = "xgboost_fraud") -> Path:
         """
         Save evaluation metrics to JSON report.
@@ -276,8 +623,14 @@ class FraudModelTrainer:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         report_path = self.reports_dir / f"{model_name}_evaluation_{timestamp}.json"
         
+        report = dict(self.evaluation_metrics)
+        if self.training_info:
+            report['training_info'] = self.training_info
+        if self.cv_results is not None:
+            report['cross_validation'] = self.cv_results
+        
         with open(report_path, 'w') as f:
-            json.dump(self.evaluation_metrics, f, indent=2)
+            json.dump(json_safe(report), f, indent=2, allow_nan=False)
         
         logger.info(f"Evaluation report saved to: {report_path}")
         
@@ -0,0 +1,32 @@
+"""
+Shared test fixtures
+Small synthetic inputs used across the data, feature and serving tests
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _make_paysim(n_samples: int = 400, n_accounts: int = 25, seed: int = 0) -> pd.DataFrame:
+    """Small PaySim-shaped frame with heavy account reuse"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'step': rng.integers(1, 60, n_samples),
+        'type': rng.choice(['PAYMENT', 'TRANSFER', 'CASH_OUT', 'DEBIT', 'CASH_IN'], n_samples),
+        'amount': rng.lognormal(mean=6, sigma=1, size=n_samples),
+        'nameOrig': [f'C{i}' for i in rng.integers(0, n_accounts, n_samples)],
+        'oldbalanceOrg': rng.lognormal(mean=8, sigma=1, size=n_samples),
+        'nameDest': [f'M{i}' for i in rng.integers(0, n_accounts, n_samples)],
+        'oldbalanceDest': rng.lognormal(mean=8, sigma=1, size=n_samples),
+        'isFraud': rng.choice([0, 1], n_samples, p=[0.95, 0.05]),
+    })
+    df['newbalanceOrig'] = (df['oldbalanceOrg'] - df['amount']).clip(lower=0)
+    df['newbalanceDest'] = df['oldbalanceDest'] + df['amount']
+    return df
+
+
+@pytest.fixture
+def make_paysim():
+    """Factory for small PaySim-shaped frames: ``make_paysim(n_samples, n_accounts, seed)``"""
+    return _make_paysim
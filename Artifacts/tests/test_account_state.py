@@ -0,0 +1,100 @@
+"""
+Online account state tests
+The streaming store must reproduce the batch velocity features
+"""
+
+import numpy as np
+import pytest
+
+from src.api.account_state import AccountStateStore, CounterpartyWindow
+from src.data.feature_engineering import FraudFeatureEngineer
+
+
+class TestAccountStateStore:
+    """Test the in-process velocity state store"""
+
+    def test_matches_batch_velocity(self, make_paysim):
+        """Replaying a step-ordered log reproduces the batch window features"""
+        df = make_paysim(n_samples=600).sort_values('step', kind='mergesort').reset_index(drop=True)
+        batch = FraudFeatureEngineer().engineer_paysim_features(df)
+
+        # Batch windows include later rows at the same step, so compare the
+        # online value seen by the last transaction of each (account, step)
+        store = AccountStateStore()
+        online = [
+            store.observe(row.nameOrig, row.nameDest, int(row.step), float(row.amount))
+            for row in df.itertuples()
+        ]
+        last_in_step = ~df.duplicated(subset=['nameOrig', 'step'], keep='last')
+        for i in np.flatnonzero(last_in_step):
+            assert online[i]['sender_velocity_1h'] == batch.loc[i, 'sender_velocity_1h']
+            assert online[i]['sender_velocity_24h'] == batch.loc[i, 'sender_velocity_24h']
+            assert online[i]['amount_velocity_24h'] == pytest.approx(batch.loc[i, 'amount_velocity_24h'])
+
+        last_pair_in_step = ~df.duplicated(subset=['nameOrig', 'nameDest', 'step'], keep='last')
+        for i in np.flatnonzero(last_pair_in_step):
+            assert online[i]['pair_velocity_24h'] == batch.loc[i, 'pair_velocity_24h']
+            assert online[i]['pair_velocity_7d'] == batch.loc[i, 'pair_velocity_7d']
+
+        last_dest_in_step = ~df.duplicated(subset=['nameDest', 'step'], keep='last')
+        for i in np.flatnonzero(last_dest_in_step):
+            assert online[i]['dest_fan_in_24h'] == batch.loc[i, 'dest_fan_in_24h']
+            assert online[i]['dest_inflow_24h'] == pytest.approx(batch.loc[i, 'dest_inflow_24h'])
+
+        # History features count the row itself and earlier rows only, so every row matches
+        for column in ['is_first_transaction', 'transaction_count']:
+            np.testing.assert_array_equal([features[column] for features in online], batch[column], err_msg=column)
+
+        # Running behaviour features and sketches only look at earlier rows, so every row matches
+        for column in ['time_since_last_transaction', 'account_amount_mean',
+                       'account_amount_std', 'amount_deviation_from_avg',
+                       'sender_distinct_dests_approx', 'dest_distinct_senders_approx',
+                       'pair_frequency_approx']:
+            np.testing.assert_allclose(
+                [features[column] for features in online], batch[column], atol=1e-6, err_msg=column
+            )
+
+    def test_window_expiry(self):
+        """Buckets older than the window stop counting"""
+        store = AccountStateStore()
+        store.observe('C1', None, 10, 100.0)
+        store.observe('C1', None, 20, 50.0)
+        features = store.observe('C1', None, 34, 25.0)
+        assert features['sender_velocity_24h'] == 2
+        assert features['amount_velocity_24h'] == pytest.approx(75.0)
+        assert features['sender_velocity_1h'] == 1
+        assert features['transaction_count'] == 3
+
+    def test_counterparty_buckets_expire(self):
+        """Pair counts and fan-in drop buckets that leave the window and stay bounded"""
+        store = AccountStateStore()
+        store.observe('C1', 'M1', 10, 1.0)
+        store.observe('C2', 'M1', 20, 1.0)
+        features = store.observe('C1', 'M1', 40, 1.0)
+        assert features['pair_velocity_24h'] == 1
+        assert features['pair_velocity_7d'] == 2
+        assert features['dest_fan_in_24h'] == 2
+
+        window = CounterpartyWindow((24,), max_per_step=3)
+        for i in range(10):
+            window.add(f'C{i}', 5)
+        assert window.distinct(24) == 3
+        window.add('C0', 40)
+        assert window.distinct(24) == 1 and window.count('C0', 24) == 1
+
+    def test_lru_and_idle_eviction(self):
+        """Account count is capped and idle accounts are dropped"""
+        store = AccountStateStore(max_accounts=2, idle_steps=5)
+        store.observe('C1', None, 1, 1.0)
+        store.observe('C2', None, 2, 1.0)
+        store.observe('C3', None, 3, 1.0)
+        assert store.size()['senders'] == 2
+        store.observe('C4', None, 20, 1.0)
+        assert store.size()['senders'] == 1
+        assert store.size()['evictions'] == 3
+        # An evicted account starts over
+        assert store.observe('C1', None, 21, 1.0)['is_first_transaction'] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
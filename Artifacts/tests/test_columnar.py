@@ -0,0 +1,92 @@
+"""
+Columnar ingestion tests
+The Parquet/Feather copy must load the same rows as the raw CSV
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.data.columnar import (
+    PAYSIM_COLUMNAR_DTYPES,
+    apply_filters,
+    convert_csv,
+    read_columnar,
+)
+from src.data.feature_engineering import FraudFeatureEngineer
+from src.data.loader import FraudDataLoader
+
+FILTERS = [('type', 'in', ['TRANSFER', 'CASH_OUT']), ('step', '<=', 30)]
+
+
+@pytest.fixture
+def paysim_csv(tmp_path, make_paysim):
+    df = make_paysim(n_samples=2_000).sort_values('step', kind='mergesort').reset_index(drop=True)
+    df['isFlaggedFraud'] = 0
+    path = tmp_path / "raw" / "paysim.csv"
+    path.parent.mkdir(parents=True)
+    df.to_csv(path, index=False)
+    return path
+
+
+class TestConversion:
+    """Test CSV to columnar conversion"""
+
+    @pytest.mark.parametrize("suffix", [".parquet", ".feather"])
+    def test_round_trip_with_projection_and_filters(self, paysim_csv, tmp_path, suffix):
+        """Projected, filtered reads equal filtering the CSV in memory"""
+        output = convert_csv(
+            paysim_csv, tmp_path / f"paysim{suffix}", PAYSIM_COLUMNAR_DTYPES,
+            chunksize=300, row_group_size=250
+        )
+        raw = pd.read_csv(paysim_csv)
+
+        full = read_columnar(output)
+        assert len(full) == len(raw)
+        assert isinstance(full['type'].dtype, pd.CategoricalDtype)
+        np.testing.assert_array_equal(full['amount'], raw['amount'])
+
+        subset = read_columnar(output, columns=['step', 'type', 'amount'], filters=FILTERS)
+        expected = apply_filters(raw, FILTERS)
+        assert list(subset.columns) == ['step', 'type', 'amount']
+        np.testing.assert_array_equal(subset['amount'], expected['amount'])
+
+
+class TestLoader:
+    """Test loading through the columnar copy"""
+
+    def test_loader_converts_once_and_filters(self, paysim_csv, tmp_path):
+        """The first read writes the copy; later reads use it with pushdown"""
+        loader = FraudDataLoader(data_dir=str(tmp_path))
+        first = loader._read_paysim(paysim_csv)
+        copy = loader.columnar_path(paysim_csv)
+        assert copy.exists()
+        written = copy.stat().st_mtime_ns
+
+        filtered = loader._read_paysim(paysim_csv, columns=['step', 'type', 'amount'], filters=FILTERS)
+        assert copy.stat().st_mtime_ns == written
+        assert set(filtered['type']) <= {'TRANSFER', 'CASH_OUT'}
+        assert len(filtered) == len(apply_filters(first, FILTERS))
+
+        csv_loader = FraudDataLoader(data_dir=str(tmp_path), columnar=None)
+        from_csv = csv_loader._read_paysim(paysim_csv, columns=['step', 'type', 'amount'], filters=FILTERS)
+        np.testing.assert_array_equal(filtered['amount'], from_csv['amount'])
+
+    def test_chunked_features_from_columnar_copy(self, paysim_csv, tmp_path):
+        """Out-of-core engineering reads the Parquet copy like the CSV"""
+        copy = FraudDataLoader(data_dir=str(tmp_path)).columnar_path(paysim_csv)
+        convert_csv(paysim_csv, copy, PAYSIM_COLUMNAR_DTYPES, row_group_size=400)
+
+        from_csv = pd.read_csv(FraudFeatureEngineer().engineer_paysim_features_chunked(
+            paysim_csv, tmp_path / "csv_features.csv", chunksize=333
+        ))
+        from_copy = pd.read_csv(FraudFeatureEngineer().engineer_paysim_features_chunked(
+            copy, tmp_path / "parquet_features.csv", chunksize=333
+        ))
+        pd.testing.assert_frame_equal(from_copy, from_csv)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
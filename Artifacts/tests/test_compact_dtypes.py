@@ -0,0 +1,102 @@
+"""
+Compact dtype tests
+Interned account IDs and downcast columns must not change engineered features
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.compact_dtypes import AccountVocabulary, compact_paysim
+from src.data.feature_engineering import FraudFeatureEngineer
+from src.data.loader import FraudDataLoader
+
+ACCOUNT_FEATURES = [
+    'sender_velocity_1h', 'sender_velocity_24h', 'receiver_velocity_1h',
+    'is_first_transaction', 'transaction_count'
+]
+SKETCH_FEATURES = ['sender_distinct_dests_approx', 'dest_distinct_senders_approx', 'pair_frequency_approx']
+
+
+class TestAccountVocabulary:
+    """Test account ID interning"""
+
+    def test_codes_are_stable_as_vocabulary_grows(self):
+        """Existing accounts keep their codes when new ones are added"""
+        vocabulary = AccountVocabulary()
+        first = vocabulary.encode(['C1', 'C2', 'C1'])
+        second = vocabulary.encode(['C3', 'C2'])
+
+        assert first.dtype == np.int32
+        assert list(first) == [0, 1, 0]
+        assert list(second) == [2, 1]
+        assert list(vocabulary.encode(['C4'], grow=False)) == [-1]
+        assert list(vocabulary.decode(second)) == ['C3', 'C2']
+
+    def test_round_trip(self, tmp_path):
+        """Saved vocabularies reload with identical codes"""
+        vocabulary = AccountVocabulary()
+        codes = vocabulary.encode(['C9', 'M7', 'C9', 'C1'])
+        loaded = AccountVocabulary.load(vocabulary.save(tmp_path / "vocab.txt"))
+        assert len(loaded) == 3
+        np.testing.assert_array_equal(loaded.encode(['C9', 'M7', 'C9', 'C1'], grow=False), codes)
+
+
+class TestCompactPaySim:
+    """Test compact PaySim frames"""
+
+    def test_compact_dtypes(self, make_paysim):
+        """Accounts become int codes, type categorical, floats float32"""
+        df = compact_paysim(make_paysim(), AccountVocabulary())
+        assert df['nameOrig'].dtype == np.int32
+        assert df['nameDest'].dtype == np.int32
+        assert isinstance(df['type'].dtype, pd.CategoricalDtype)
+        assert df['amount'].dtype == np.float32
+
+    def test_features_match_string_keys(self, make_paysim):
+        """Account features are identical; float features agree to float32 precision"""
+        raw = make_paysim()
+        vocabulary = AccountVocabulary()
+        expected = FraudFeatureEngineer().engineer_paysim_features(raw.copy())
+        compact = FraudFeatureEngineer(vocabulary=vocabulary).engineer_paysim_features(
+            compact_paysim(raw.copy(), vocabulary)
+        )
+
+        for column in ACCOUNT_FEATURES + ['type_TRANSFER', 'type_CASH_OUT', 'hour']:
+            np.testing.assert_array_equal(compact[column].to_numpy(), expected[column].to_numpy())
+        np.testing.assert_allclose(
+            compact['amount_velocity_24h'], expected['amount_velocity_24h'], rtol=1e-6
+        )
+        np.testing.assert_allclose(compact['amount_log'], expected['amount_log'], rtol=1e-6)
+
+    def test_sketches_hash_decoded_ids(self, make_paysim):
+        """Sketch features of a compact frame equal those of the raw IDs the API hashes"""
+        raw = make_paysim(n_samples=2_000, n_accounts=200)
+        vocabulary = AccountVocabulary()
+        expected = FraudFeatureEngineer().engineer_paysim_features(raw.copy())
+        compact = FraudFeatureEngineer(vocabulary=vocabulary).engineer_paysim_features(
+            compact_paysim(raw.copy(), vocabulary)
+        )
+
+        for column in SKETCH_FEATURES:
+            np.testing.assert_array_equal(compact[column].to_numpy(), expected[column].to_numpy())
+        with pytest.raises(ValueError):
+            FraudFeatureEngineer().engineer_paysim_features(compact_paysim(raw.copy(), AccountVocabulary()))
+
+    def test_loader_persists_vocabulary(self, tmp_path, make_paysim):
+        """Compact loading interns IDs and reuses the saved vocabulary"""
+        loader = FraudDataLoader(data_dir=str(tmp_path), compact=True)
+        csv_path = tmp_path / "raw" / "paysim.csv"
+        raw = make_paysim(n_samples=50)
+        raw.to_csv(csv_path, index=False)
+
+        first = loader._read_paysim(csv_path)
+        assert loader.vocabulary_path.exists()
+
+        reloaded = FraudDataLoader(data_dir=str(tmp_path), compact=True)._read_paysim(csv_path)
+        np.testing.assert_array_equal(first['nameOrig'], reloaded['nameOrig'])
+        assert list(loader.vocabulary.decode(reloaded['nameDest'])) == list(raw['nameDest'])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,168 @@
+"""
+Cross-validation tests
+Folds are computed once, stored next to the matrix and run in parallel workers
+"""
+
+import json
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.cross_validation import CrossValidationFolds, holdout_indices, run_cross_validation
+from src.models.feature_matrix import FeatureMatrixStore
+from src.models.trainer import FraudModelTrainer
+
+FAST = {'n_estimators': 10, 'max_depth': 3, 'learning_rate': 0.3}
+
+
+@pytest.fixture
+def store(tmp_path):
+    """Training matrix with a learnable signal and a step column"""
+    rng = np.random.default_rng(0)
+    n = 1_200
+    X = pd.DataFrame({
+        'step': np.sort(rng.integers(1, 100, n)),
+        'amount': rng.normal(size=n),
+        'noise': rng.normal(size=n),
+    })
+    y = pd.Series((X['amount'] + 0.3 * rng.normal(size=n) > 1.2).astype(int), name='isFraud')
+    store = FeatureMatrixStore(tmp_path)
+    store.save_split('train', X, y)
+    return store
+
+
+class TestCrossValidationFolds:
+    """Test fold assignment and persistence"""
+
+    def test_stratified_folds_partition_rows(self, store):
+        """Every row is validated once and fraud is spread evenly"""
+        _, y = store.load_split('train')
+        folds = CrossValidationFolds.compute(np.asarray(y), n_folds=4)
+        rates = [y.to_numpy()[folds.indices(fold)[1]].mean() for fold in range(4)]
+        assert sorted(np.unique(folds.assignment)) == [0, 1, 2, 3]
+        assert max(rates) - min(rates) < 0.02
+        train, val = folds.indices(2)
+        assert len(np.intersect1d(train, val)) == 0 and len(train) + len(val) == len(y)
+
+    def test_time_folds_only_train_on_the_past(self, store):
+        """Expanding-window folds validate later steps than they train on"""
+        X, y = store.load_split('train')
+        folds = CrossValidationFolds.compute(np.asarray(y), n_folds=3, method='time', steps=X['step'].to_numpy())
+        for fold in range(3):
+            train, val = folds.indices(fold)
+            assert X['step'].to_numpy()[train].max() <= X['step'].to_numpy()[val].min()
+
+    def test_folds_are_stored_once(self, store):
+        """A second request reuses the stored assignment"""
+        first = CrossValidationFolds.load_or_create(store, n_folds=3)
+        meta = json.loads((store.directory / f"{first.name}.json").read_text())
+        second = CrossValidationFolds.load_or_create(store, n_folds=3)
+        assert json.loads((store.directory / f"{first.name}.json").read_text()) == meta
+        np.testing.assert_array_equal(first.assignment, second.assignment)
+
+    def test_stored_folds_are_keyed_on_parameters(self, store):
+        """A different seed or method gets its own assignment instead of a stale one"""
+        first = CrossValidationFolds.load_or_create(store, n_folds=3, random_state=1)
+        other_seed = CrossValidationFolds.load_or_create(store, n_folds=3, random_state=2)
+        assert other_seed.random_state == 2
+        assert not np.array_equal(first.assignment, other_seed.assignment)
+        assert CrossValidationFolds.load_or_create(store, n_folds=3, method='time').method == 'time'
+        reloaded = CrossValidationFolds.load_or_create(store, n_folds=3, random_state=1)
+        np.testing.assert_array_equal(reloaded.assignment, first.assignment)
+
+
+class TestRunCrossValidation:
+    """Test fold training"""
+
+    def test_parallel_matches_sequential(self, store):
+        """Worker processes score each fold exactly like in-process runs"""
+        folds = CrossValidationFolds.load_or_create(store, n_folds=3)
+        sequential = run_cross_validation(store, folds, FAST, n_jobs=1)
+        parallel = run_cross_validation(store, folds, FAST, n_jobs=3)
+        assert [fold['auc_roc'] for fold in parallel['folds']] == pytest.approx(
+            [fold['auc_roc'] for fold in sequential['folds']]
+        )
+        assert sequential['auc_roc_mean'] > 0.9
+
+    def test_folds_stream_in_blocks(self, store):
+        """Blocks smaller than a fold still train and score every validation row"""
+        folds = CrossValidationFolds.load_or_create(store, n_folds=3)
+        results = run_cross_validation(store, folds, FAST, batch_rows=97)
+        assert [fold['validation_rows'] for fold in results['folds']] == [
+            len(folds.indices(fold)[1]) for fold in range(3)
+        ]
+        assert results['auc_roc_mean'] > 0.9
+
+    def test_trainer_reports_cross_validation(self, store, tmp_path):
+        """The evaluation report carries the fold count and scores"""
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "models"), reports_dir=str(tmp_path / "reports"))
+        results = trainer.cross_validate(str(store.directory), n_folds=3, method='time', hyperparameters=FAST)
+        assert results['n_folds'] == 3 and len(results['folds']) == 3
+
+        report = json.loads(trainer.save_evaluation_report().read_text())
+        assert report['cross_validation']['n_folds'] == 3
+
+    def test_report_counts_scored_folds_and_writes_null(self, store, tmp_path):
+        """Skipped time folds are not counted and NaN scores are saved as null"""
+        folds = CrossValidationFolds.load_or_create(store, n_folds=3, method='time')
+        # With the first period merged into fold 0, nothing precedes it to train on
+        folds.assignment[folds.assignment == -1] = 0
+        folds.save(store)
+        results = run_cross_validation(store, folds, FAST)
+        assert results['requested_folds'] == 3 and results['n_folds'] == len(results['folds']) == 2
+
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "models"), reports_dir=str(tmp_path / "reports"))
+        trainer.cv_results = {**results, 'auc_roc_std': float('nan')}
+        text = trainer.save_evaluation_report().read_text()
+        assert 'NaN' not in text
+        assert json.loads(text)['cross_validation']['auc_roc_std'] is None
+
+
+class TestEarlyStopping:
+    """Test the validation carve-out and early stopping in train_xgboost"""
+
+    def test_holdout_methods(self, store):
+        """Stratified keeps the fraud rate; time holds out the latest steps"""
+        X, y = store.load_split('train')
+        fit, val = holdout_indices(y.to_numpy(), 0.25)
+        assert len(val) == 300 and abs(y.to_numpy()[val].mean() - y.mean()) < 0.01
+
+        steps = X['step'].to_numpy()
+        fit, val = holdout_indices(y.to_numpy(), 0.2, 'time', steps)
+        assert steps[fit].max() < steps[val].min()
+        assert len(fit) + len(val) == len(y)
+
+    @pytest.mark.parametrize("method", ["stratified", "time"])
+    def test_stops_and_keeps_best_trees(self, store, tmp_path, method):
+        """Training stops early and the saved model holds only the best trees"""
+        X, y = store.load_split('train')
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "models"), reports_dir=str(tmp_path / "reports"))
+        model = trainer.train_xgboost(
+            X, y, {'n_estimators': 500, 'max_depth': 3, 'learning_rate': 0.3},
+            early_stopping_rounds=10, validation_method=method
+        )
+        info = trainer.training_info
+        assert info['rounds_trained'] < 500
+        assert info['rounds_trained'] == info['best_iteration'] + 11
+        assert model.get_booster().num_boosted_rounds() == info['best_iteration'] + 1
+
+        reloaded = joblib.load(trainer.save_model())
+        assert int(reloaded.get_booster().attr('best_iteration')) == info['best_iteration']
+        np.testing.assert_allclose(reloaded.predict_proba(X)[:, 1], model.predict_proba(X)[:, 1])
+
+        report = json.loads(trainer.save_evaluation_report().read_text())
+        assert report['training_info']['validation']['method'] == method
+
+    def test_disabled_trains_every_round(self, store, tmp_path):
+        """Without patience every round is trained on the full split"""
+        X, y = store.load_split('train')
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "models"), reports_dir=str(tmp_path / "reports"))
+        model = trainer.train_xgboost(X, y, FAST, early_stopping_rounds=None)
+        assert model.get_booster().num_boosted_rounds() == FAST['n_estimators']
+        assert trainer.training_info['training_samples'] == len(X)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,95 @@
+"""
+Chunked training tests
+Block-streamed QuantileDMatrix/external-memory training must match in-memory training
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost as xgb
+
+from src.models.cross_validation import xgboost_params
+from src.models.external_memory import build_dmatrix, csv_chunks, matrix_chunks
+from src.models.feature_matrix import FeatureMatrixStore
+from src.models.trainer import FraudModelTrainer
+
+FAST = {'n_estimators': 20, 'max_depth': 3, 'learning_rate': 0.3}
+
+
+def make_split(n: int = 3_000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({
+        'amount': rng.normal(size=n).astype(np.float32),
+        'balance': rng.normal(size=n).astype(np.float32),
+        'noise': rng.normal(size=n).astype(np.float32),
+    })
+    y = pd.Series((X['amount'] - X['balance'] + 0.3 * rng.normal(size=n) > 1.5).astype(int), name='isFraud')
+    return X, y
+
+
+@pytest.fixture
+def store(tmp_path):
+    X, y = make_split()
+    store = FeatureMatrixStore(tmp_path)
+    store.save_split('train', X, y)
+    return store
+
+
+class TestChunkedDMatrix:
+    """Test building binned matrices block by block"""
+
+    def test_blocks_cover_the_split(self, store):
+        """All blocks together carry every row and label"""
+        X, y = store.load_split('train')
+        dtrain = build_dmatrix(matrix_chunks(store, batch_rows=700), store.columns)
+        assert (dtrain.num_row(), dtrain.num_col()) == X.shape
+        np.testing.assert_array_equal(dtrain.get_label(), y.to_numpy())
+        assert dtrain.feature_names == store.columns
+
+
+class TestChunkedTraining:
+    """Test the trainer's chunked mode"""
+
+    def test_single_block_matches_in_memory_hist(self, store, tmp_path):
+        """One block sketches the same bins as the in-memory classifier"""
+        X, y = store.load_split('train')
+        params = xgboost_params(y, FAST, 42)
+        params['n_jobs'] = 1
+        reference = xgb.XGBClassifier(**params).fit(np.asarray(X), y)
+
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "m"), reports_dir=str(tmp_path / "r"))
+        model = trainer.train_xgboost_chunked(
+            str(store.directory / "X_train.csv"), hyperparameters={**FAST, 'n_jobs': 1}, batch_rows=len(X)
+        )
+        np.testing.assert_allclose(model.predict_proba(X)[:, 1], reference.predict_proba(np.asarray(X))[:, 1], rtol=1e-5)
+        assert list(trainer.feature_importance['feature'])[0] in ('amount', 'balance')
+
+    @pytest.mark.parametrize("mode", ["quantile", "external"])
+    def test_modes_learn_from_many_blocks(self, store, tmp_path, mode):
+        """Multi-block training in either mode separates the classes"""
+        X_test, y_test = make_split(n=1_000, seed=1)
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "m"), reports_dir=str(tmp_path / "r"))
+        trainer.train_xgboost_chunked(
+            str(store.directory / "X_train.csv"), hyperparameters=FAST, mode=mode,
+            batch_rows=500, cache_dir=str(tmp_path / "cache")
+        )
+        metrics = trainer.evaluate_model(X_test, y_test)
+        assert metrics['auc_roc'] > 0.95
+
+    def test_csv_fallback(self, tmp_path):
+        """Without stored matrices the feature/label CSVs are streamed"""
+        X, y = make_split()
+        X.to_csv(tmp_path / "X_train.csv", index=False)
+        y.to_csv(tmp_path / "y_train.csv", index=False)
+        blocks = list(csv_chunks(tmp_path / "X_train.csv", tmp_path / "y_train.csv", batch_rows=1_000)())
+        assert [len(block) for block, _ in blocks] == [1_000] * 3
+
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "m"), reports_dir=str(tmp_path / "r"))
+        model = trainer.train_xgboost_chunked(
+            str(tmp_path / "X_train.csv"), str(tmp_path / "y_train.csv"), hyperparameters=FAST, batch_rows=1_000
+        )
+        assert model.predict_proba(X).shape == (len(X), 2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
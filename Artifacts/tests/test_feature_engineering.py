@@ -0,0 +1,332 @@
+"""
+Feature engineering tests
+Checks vectorized window features against a brute-force reference
+"""
+
+import os
+from dataclasses import replace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.feature_engineering import FraudFeatureEngineer
+from src.data.feature_cache import FeatureCache, fingerprint_frame
+from src.data.feature_registry import (
+    FRAUD_TRANSACTION_TYPES,
+    PAYSIM_FEATURES,
+    WindowAggregation,
+    align_to_model,
+    parse_window,
+    resolve_features,
+)
+from src.data.loader import FraudDataLoader
+from src.data.window_features import rolling_window_aggregates
+
+
+def brute_force_window(df: pd.DataFrame, column: str, window: int):
+    """Reference implementation: explicit mask per row"""
+    counts, sums = [], []
+    for _, row in df.iterrows():
+        mask = (
+            (df[column] == row[column])
+            & (df['step'] > row['step'] - window)
+            & (df['step'] <= row['step'])
+        )
+        counts.append(int(mask.sum()))
+        sums.append(float(df.loc[mask, 'amount'].sum()))
+    return np.array(counts), np.array(sums)
+
+
+class TestRollingWindowAggregates:
+    """Test the sorted searchsorted window engine"""
+
+    @pytest.mark.parametrize("window", [1, 3, 24])
+    def test_matches_brute_force(self, window, make_paysim):
+        """Counts and sums match the per-row mask definition"""
+        df = make_paysim()
+        result = rolling_window_aggregates(
+            df['nameOrig'], df['step'], windows=(window,), values=df['amount']
+        )
+        expected_counts, expected_sums = brute_force_window(df, 'nameOrig', window)
+        np.testing.assert_array_equal(result[window]['count'], expected_counts)
+        np.testing.assert_allclose(result[window]['sum'], expected_sums)
+
+    @pytest.mark.parametrize("window", [1, 6, 168])
+    def test_mean_and_max_match_brute_force(self, window, make_paysim):
+        """Window mean and maximum match the per-row mask definition"""
+        df = make_paysim()
+        result = rolling_window_aggregates(
+            df['nameOrig'], df['step'], windows=(window,), values=df['amount'], maxima=True
+        )
+        for i, row in df.iterrows():
+            mask = (
+                (df['nameOrig'] == row['nameOrig'])
+                & (df['step'] > row['step'] - window)
+                & (df['step'] <= row['step'])
+            )
+            assert result[window]['mean'][i] == pytest.approx(df.loc[mask, 'amount'].mean())
+            assert result[window]['max'][i] == df.loc[mask, 'amount'].max()
+
+    def test_windows_do_not_cross_accounts(self):
+        """Adjacent account codes never leak into each other's window"""
+        result = rolling_window_aggregates(
+            np.array([0, 0, 1, 1]), np.array([10, 12, 1, 2]), windows=(24,)
+        )
+        np.testing.assert_array_equal(result[24]['count'], [1, 2, 1, 2])
+
+
+class TestPaySimFeatures:
+    """Test engineered PaySim features"""
+
+    def test_velocity_populated_above_former_cutoff(self, make_paysim):
+        """Velocity columns are computed for large frames, not zero-filled"""
+        df = make_paysim(n_samples=60_000, n_accounts=5_000)
+        features = FraudFeatureEngineer().engineer_paysim_features(df)
+        assert (features['sender_velocity_1h'] >= 1).all()
+        assert (features['sender_velocity_24h'] >= features['sender_velocity_1h']).all()
+        assert (features['amount_velocity_24h'] >= features['amount'] - 1e-6).all()
+
+    def test_velocity_matches_brute_force(self, make_paysim):
+        """Engineered velocity columns match the reference per row"""
+        df = make_paysim()
+        features = FraudFeatureEngineer().engineer_paysim_features(df)
+        counts_24h, sums_24h = brute_force_window(df, 'nameOrig', 24)
+        receiver_1h, _ = brute_force_window(df, 'nameDest', 1)
+        np.testing.assert_array_equal(features['sender_velocity_24h'], counts_24h)
+        np.testing.assert_allclose(features['amount_velocity_24h'], sums_24h)
+        np.testing.assert_array_equal(features['receiver_velocity_1h'], receiver_1h)
+
+    def test_counterparty_features_match_brute_force(self, make_paysim):
+        """Pair counts, fan-in and inflow match explicit per-row masks"""
+        df = make_paysim(n_accounts=10)
+        features = FraudFeatureEngineer().engineer_paysim_features(df)
+
+        for i, row in df.iterrows():
+            in_24h = (df['step'] > row['step'] - 24) & (df['step'] <= row['step'])
+            in_7d = (df['step'] > row['step'] - 168) & (df['step'] <= row['step'])
+            to_dest = df['nameDest'] == row['nameDest']
+            pair = (df['nameOrig'] == row['nameOrig']) & to_dest
+            assert features.loc[i, 'pair_velocity_24h'] == (pair & in_24h).sum()
+            assert features.loc[i, 'pair_velocity_7d'] == (pair & in_7d).sum()
+            assert features.loc[i, 'dest_fan_in_24h'] == df.loc[to_dest & in_24h, 'nameOrig'].nunique()
+            assert features.loc[i, 'dest_inflow_24h'] == pytest.approx(df.loc[to_dest & in_24h, 'amount'].sum())
+
+    def test_running_stats_use_only_earlier_rows(self, make_paysim):
+        """Time since last and amount deviation match a per-row reference"""
+        df = make_paysim()
+        features = FraudFeatureEngineer().engineer_paysim_features(df)
+        ordered = df.sort_values('step', kind='mergesort')
+
+        for i in df.index[:80]:
+            row = df.loc[i]
+            account = ordered[ordered['nameOrig'] == row['nameOrig']]
+            earlier = account.loc[:i].iloc[:-1]
+            if earlier.empty:
+                assert features.loc[i, 'time_since_last_transaction'] == -1
+                assert features.loc[i, 'amount_deviation_from_avg'] == 0
+                continue
+            mean, std = earlier['amount'].mean(), earlier['amount'].std(ddof=0)
+            assert features.loc[i, 'time_since_last_transaction'] == row['step'] - earlier['step'].iloc[-1]
+            assert features.loc[i, 'account_amount_mean'] == pytest.approx(mean)
+            assert features.loc[i, 'account_amount_std'] == pytest.approx(std, abs=1e-6)
+            expected = (row['amount'] - mean) / std if std > 0 else 0.0
+            assert features.loc[i, 'amount_deviation_from_avg'] == pytest.approx(expected)
+
+    def test_chunked_matches_in_memory(self, tmp_path, make_paysim):
+        """Chunked mode carries window state across chunk boundaries"""
+        df = make_paysim(n_samples=500).sort_values('step', kind='mergesort').reset_index(drop=True)
+        source = tmp_path / "paysim.csv"
+        df.to_csv(source, index=False)
+
+        expected = FraudFeatureEngineer().engineer_paysim_features(df)
+        output = FraudFeatureEngineer().engineer_paysim_features_chunked(
+            source, tmp_path / "features.csv", chunksize=37
+        )
+        chunked = pd.read_csv(output)
+
+        assert len(chunked) == len(expected)
+        for column in expected.columns:
+            if not pd.api.types.is_numeric_dtype(expected[column]):
+                assert (chunked[column] == expected[column]).all(), column
+            else:
+                np.testing.assert_allclose(
+                    chunked[column].astype(float), expected[column].astype(float), err_msg=column
+                )
+
+    def test_chunked_requires_step_order(self, tmp_path, make_paysim):
+        """Unsorted logs are rejected instead of producing wrong windows"""
+        df = make_paysim(n_samples=100)
+        source = tmp_path / "paysim.csv"
+        df.to_csv(source, index=False)
+        with pytest.raises(ValueError):
+            FraudFeatureEngineer().engineer_paysim_features_chunked(source, tmp_path / "out.csv")
+
+    def test_fraud_types_keep_full_history(self, tmp_path, make_paysim):
+        """Kept rows match the full run; without history they see only kept rows"""
+        df = make_paysim(n_samples=600).sort_values('step', kind='mergesort').reset_index(drop=True)
+        kept = df['type'].isin(FRAUD_TRANSACTION_TYPES).to_numpy()
+        full = FraudFeatureEngineer().engineer_paysim_features(df)
+
+        with_history = FraudFeatureEngineer(keep_types=FRAUD_TRANSACTION_TYPES).engineer_paysim_features(df)
+        assert len(with_history) == kept.sum()
+        account_columns = [name for name, spec in PAYSIM_FEATURES.items() if spec.family != 'row']
+        pd.testing.assert_frame_equal(with_history[account_columns], full.loc[kept, account_columns])
+
+        without = FraudFeatureEngineer(
+            keep_types=FRAUD_TRANSACTION_TYPES, full_history=False
+        ).engineer_paysim_features(df)
+        expected = FraudFeatureEngineer().engineer_paysim_features(df[kept].reset_index(drop=True))
+        np.testing.assert_array_equal(without['sender_velocity_24h'], expected['sender_velocity_24h'])
+
+        source = tmp_path / "paysim.csv"
+        df.to_csv(source, index=False)
+        for full_history, reference in [(True, with_history), (False, without)]:
+            engineer = FraudFeatureEngineer(keep_types=FRAUD_TRANSACTION_TYPES, full_history=full_history)
+            chunked = pd.read_csv(engineer.engineer_paysim_features_chunked(
+                source, tmp_path / f"features_{full_history}.csv", chunksize=53
+            ))
+            assert len(chunked) == len(reference)
+            for column in account_columns + ['amount_normalized']:
+                np.testing.assert_allclose(
+                    chunked[column].astype(float), reference[column].astype(float), err_msg=column
+                )
+
+    def test_parallel_matches_sequential(self, make_paysim):
+        """Hash-partitioned process pool reproduces single-process features"""
+        df = make_paysim(n_samples=2_000, n_accounts=150)
+        sequential = FraudFeatureEngineer().engineer_paysim_features(df)
+        parallel = FraudFeatureEngineer(n_jobs=3).engineer_paysim_features(df)
+        pd.testing.assert_frame_equal(parallel, sequential)
+
+
+class TestFeatureRegistry:
+    """Test model-driven feature selection"""
+
+    def test_window_aggregation_compiles_names(self):
+        """Blocks expand key x window x aggregation with optional aliases"""
+        block = WindowAggregation(
+            'nameOrig', 'sender', ('1h', '6h', '7d'), ('count', 'max'),
+            names={'count_1h': 'sender_velocity_1h'}
+        )
+        specs = block.feature_specs()
+        assert [spec.name for spec in specs] == [
+            'sender_velocity_1h', 'sender_count_6h', 'sender_count_7d',
+            'sender_max_1h', 'sender_max_6h', 'sender_max_7d',
+        ]
+        assert [spec.window for spec in specs[:3]] == [1, 6, 168]
+        assert 'amount' in specs[-1].inputs and 'amount' not in specs[0].inputs
+        assert parse_window('2d') == 48
+        with pytest.raises(ValueError):
+            WindowAggregation('nameDest', 'dest', ('1h',), ('distinct',))
+
+    def test_configured_blocks_are_engineered(self, tmp_path, make_paysim):
+        """Extra blocks are computed in memory and chunked like built-in features"""
+        df = make_paysim(n_samples=300).sort_values('step', kind='mergesort').reset_index(drop=True)
+        blocks = [WindowAggregation.from_dict({
+            'key': 'nameOrig', 'prefix': 'sender', 'windows': ['6h', '7d'],
+            'aggregations': ['sum', 'mean', 'max'],
+        })]
+        engineer = FraudFeatureEngineer(window_aggregations=blocks)
+        features = engineer.engineer_paysim_features(df)
+        result = rolling_window_aggregates(
+            df['nameOrig'], df['step'], windows=(6, 168), values=df['amount'], maxima=True
+        )
+        np.testing.assert_allclose(features['sender_mean_6h'], result[6]['mean'])
+        np.testing.assert_allclose(features['sender_max_7d'], result[168]['max'])
+
+        source = tmp_path / "paysim.csv"
+        df.to_csv(source, index=False)
+        output = FraudFeatureEngineer(window_aggregations=blocks).engineer_paysim_features_chunked(
+            source, tmp_path / "features.csv", chunksize=41
+        )
+        chunked = pd.read_csv(output)
+        np.testing.assert_allclose(chunked['sender_sum_7d'], features['sender_sum_7d'])
+        np.testing.assert_allclose(chunked['sender_max_6h'], features['sender_max_6h'])
+
+    def test_only_referenced_features_are_built(self, make_paysim):
+        """An engineer built for a model skips columns the booster never uses"""
+        xgb = pytest.importorskip("xgboost")
+        df = make_paysim(n_samples=300)
+        full = FraudFeatureEngineer().engineer_paysim_features(df)
+        columns = ['amount_log', 'hour', 'sender_velocity_24h', 'balance_ratio_orig']
+        model = xgb.XGBClassifier(n_estimators=5, max_depth=2)
+        model.fit(full[columns], full['isFraud'])
+
+        engineer = FraudFeatureEngineer.for_model(model)
+        lazy = engineer.engineer_paysim_features(df)
+        assert 'receiver_velocity_1h' not in lazy.columns
+        assert 'amount_velocity_1h' not in lazy.columns
+
+        X = align_to_model(lazy, model)
+        assert list(X.columns) == columns
+        np.testing.assert_allclose(model.predict_proba(X), model.predict_proba(full[columns]))
+
+
+class TestFeatureCache:
+    """Test the materialized feature cache"""
+
+    def test_cache_round_trip(self, tmp_path, make_paysim):
+        """A second run loads every column and returns an identical frame"""
+        df = make_paysim(n_samples=300)
+        first = FraudFeatureEngineer(cache=FeatureCache(tmp_path)).engineer_paysim_features(df)
+
+        cache = FeatureCache(tmp_path)
+        _, missing = cache.load('paysim', fingerprint_frame(df), resolve_features(PAYSIM_FEATURES), len(df))
+        assert missing == []
+        # Writes go through temporary files that are renamed into place
+        assert not list(tmp_path.rglob("*.tmp"))
+
+        second = FraudFeatureEngineer(cache=cache).engineer_paysim_features(df)
+        pd.testing.assert_frame_equal(second, first)
+
+    def test_changed_feature_only_recomputes_that_column(self, tmp_path, make_paysim):
+        """Bumping one feature's version invalidates only its column"""
+        df = make_paysim(n_samples=300)
+        FraudFeatureEngineer(cache=FeatureCache(tmp_path)).engineer_paysim_features(df)
+
+        specs = resolve_features(PAYSIM_FEATURES)
+        specs = [replace(spec, version=2) if spec.name == 'hour' else spec for spec in specs]
+        _, missing = FeatureCache(tmp_path).load('paysim', fingerprint_frame(df), specs, len(df))
+        assert [spec.name for spec in missing] == ['hour']
+
+        changed = df.assign(amount=df['amount'] + 1)
+        _, missing = FeatureCache(tmp_path).load('paysim', fingerprint_frame(changed), specs, len(df))
+        assert len(missing) == len(specs)
+
+    def test_file_backed_frames_are_keyed_on_the_file(self, tmp_path, make_paysim, monkeypatch):
+        """Re-runs on an unchanged file hash neither rows nor bytes; rewriting it invalidates"""
+        raw = make_paysim(n_samples=300)
+        csv_path = tmp_path / "paysim.csv"
+        raw.to_csv(csv_path, index=False)
+        loader = FraudDataLoader(data_dir=str(tmp_path / "data"), columnar=None)
+        cache = FeatureCache(tmp_path / "cache")
+        df = loader._read_paysim(csv_path)
+        first = FraudFeatureEngineer(cache=cache).engineer_paysim_features(df, loader.sources['paysim'])
+
+        def fail(*args):
+            raise AssertionError("unchanged input was hashed again")
+
+        with monkeypatch.context() as patch:
+            patch.setattr('src.data.feature_engineering.fingerprint_frame', fail)
+            patch.setattr('src.data.feature_cache.fingerprint_bytes', fail)
+            source = loader.sources['paysim']
+            _, missing = cache.load(
+                'paysim', cache.fingerprint_source(df, source), resolve_features(PAYSIM_FEATURES), len(df)
+            )
+            assert missing == []
+            second = FraudFeatureEngineer(cache=cache).engineer_paysim_features(df, source)
+            pd.testing.assert_frame_equal(second, first)
+
+        raw.assign(amount=raw['amount'] + 1).to_csv(csv_path, index=False)
+        os.utime(csv_path, ns=(0, 1))
+        changed = loader._read_paysim(csv_path)
+        _, missing = cache.load(
+            'paysim', cache.fingerprint_source(changed, loader.sources['paysim']),
+            resolve_features(PAYSIM_FEATURES), len(changed)
+        )
+        assert len(missing) == len(resolve_features(PAYSIM_FEATURES))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+"""
+Feature matrix tests
+Memory-mapped splits must load the same values the CSV path produces
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.feature_matrix import FeatureMatrixStore
+from src.models.trainer import FraudModelTrainer
+
+
+def make_splits(n_rows: int = 200, seed: int = 0):
+    """Train/test frames with missing and infinite values"""
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n_rows, 4)), columns=['amount', 'hour', 'velocity', 'ratio'])
+    X.loc[::7, 'ratio'] = np.nan
+    X.loc[::11, 'velocity'] = np.inf
+    y = pd.Series(rng.integers(0, 2, n_rows), name='isFraud')
+    half = n_rows // 2
+    return X.iloc[:half], X.iloc[half:], y.iloc[:half], y.iloc[half:]
+
+
+class TestFeatureMatrixStore:
+    """Test the memory-mapped split store"""
+
+    def test_round_trip_is_mapped_and_clean(self, tmp_path):
+        """Loaded splits are read-only float32 views with NaN/inf zeroed"""
+        X_train, X_test, y_train, y_test = make_splits()
+        store = FeatureMatrixStore(tmp_path)
+        store.save_splits(X_train, X_test, y_train, y_test)
+
+        X, y = store.load_split('train')
+        assert list(X.columns) == list(X_train.columns)
+        assert (X.dtypes == np.float32).all()
+        assert not X.to_numpy().flags.writeable
+        expected = X_train.replace([np.inf, -np.inf], 0).fillna(0).astype(np.float32)
+        np.testing.assert_array_equal(X.to_numpy(), expected.to_numpy())
+        np.testing.assert_array_equal(y, y_train)
+        assert y.name == 'isFraud'
+
+    def test_small_blocks_and_column_mismatch(self, tmp_path):
+        """Block-wise writes match one-shot writes; mismatched columns are rejected"""
+        X_train, X_test, y_train, y_test = make_splits(n_rows=101)
+        store = FeatureMatrixStore(tmp_path)
+        store.save_split('train', X_train, y_train, chunk_rows=7)
+        X, _ = store.load_split('train', mmap_mode=None)
+        np.testing.assert_array_equal(
+            X.to_numpy(), np.nan_to_num(X_train.to_numpy(np.float32), nan=0, posinf=0, neginf=0)
+        )
+        with pytest.raises(ValueError):
+            store.save_split('test', X_test.rename(columns={'hour': 'hour_of_day'}), y_test)
+
+    def test_trainer_prefers_matrices(self, tmp_path):
+        """load_training_data maps the matrices stored next to the CSV paths"""
+        X_train, X_test, y_train, y_test = make_splits()
+        for name, frame in [('X_train', X_train), ('X_test', X_test), ('y_train', y_train), ('y_test', y_test)]:
+            frame.to_csv(tmp_path / f"{name}.csv", index=False)
+        paths = {f"{name}_path": str(tmp_path / f"{name}.csv") for name in ['X_train', 'y_train', 'X_test', 'y_test']}
+        trainer = FraudModelTrainer(models_dir=str(tmp_path / "models"), reports_dir=str(tmp_path / "reports"))
+
+        from_csv = trainer.load_training_data(**paths)
+        FeatureMatrixStore(tmp_path).save_splits(X_train, X_test, y_train, y_test)
+        mapped = trainer.load_training_data(**paths)
+
+        assert mapped[0].dtypes.iloc[0] == np.float32
+        for expected, actual in zip(from_csv, mapped):
+            np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float), rtol=1e-6)
+
+        # A CSV rewritten after the matrices makes them stale
+        os.utime(tmp_path / "X_train.csv", (time.time() + 10, time.time() + 10))
+        assert not FeatureMatrixStore(tmp_path).is_fresh('train', 'test', sources=list(paths.values()))
+        assert trainer.load_training_data(**paths)[0].dtypes.iloc[0] == np.float64
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,83 @@
+"""
+Feature plan tests
+The compiled serving plan must reproduce the training feature matrix
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.feature_engineering import FraudFeatureEngineer
+from src.data.feature_registry import PAYSIM_FEATURES
+from src.data.train_test_split import create_train_test_split
+from src.models.feature_plan import FeaturePlan
+
+RAW_FIELDS = ['amount', 'step', 'type', 'oldbalanceOrg', 'newbalanceOrig', 'oldbalanceDest', 'newbalanceDest']
+# Per-account features come from the online state store at serving time
+ACCOUNT_FIELDS = [spec.name for spec in PAYSIM_FEATURES.values() if spec.family != 'row']
+
+
+@pytest.fixture
+def training_frame(make_paysim):
+    """Engineered PaySim features, the raw rows they came from and the engineer"""
+    raw = make_paysim(n_samples=300)
+    engineer = FraudFeatureEngineer()
+    engineered = engineer.engineer_paysim_features(raw)
+    engineered['is_fraud'] = engineered['isFraud']
+    X_train, _, _, _ = create_train_test_split(engineered, test_size=0.2)
+    return raw, engineered, X_train, engineer
+
+
+class TestFeaturePlan:
+    """Test the compiled single-row feature plan"""
+
+    def test_transform_matches_training_rows(self, training_frame):
+        """Raw fields plus account features map onto the exact training row"""
+        raw, engineered, X_train, engineer = training_frame
+        plan = FeaturePlan.fit(X_train.columns, engineer)
+
+        for index in X_train.index[:25]:
+            transaction = raw.loc[index, RAW_FIELDS].to_dict()
+            extra = engineered.loc[index, ACCOUNT_FIELDS].to_dict()
+            vector = plan.transform(transaction, extra)
+            assert vector.dtype == np.float32
+            np.testing.assert_allclose(
+                vector, X_train.loc[index].to_numpy(dtype=np.float32), rtol=1e-5
+            )
+
+    def test_batch_and_round_trip(self, training_frame, tmp_path):
+        """Saved plans reload and fill a 2-D batch in column order"""
+        raw, _, X_train, engineer = training_frame
+        plan = FeaturePlan.fit(X_train.columns, engineer)
+        loaded = FeaturePlan.load(plan.save(tmp_path / "plan.json"))
+
+        transactions = raw[RAW_FIELDS].head(5).to_dict('records')
+        batch = loaded.transform_batch(transactions)
+        assert batch.shape == (5, len(X_train.columns))
+        np.testing.assert_array_equal(batch[2], plan.transform(transactions[2]))
+
+    def test_statistics_come_from_training(self, training_frame):
+        """amount_normalized uses training statistics, not the request"""
+        raw, _, X_train, engineer = training_frame
+        plan = FeaturePlan.fit(X_train.columns, engineer)
+        column = list(X_train.columns).index('amount_normalized')
+        vector = plan.transform({'amount': raw['amount'].mean()})
+        assert vector[column] == pytest.approx(0.0, abs=1e-6)
+
+    def test_statistics_follow_engineer_options(self, make_paysim):
+        """With keep_types the plan normalizes like the engineer did, not over all raw rows"""
+        raw = make_paysim(n_samples=300)
+        engineer = FraudFeatureEngineer(keep_types=['TRANSFER', 'CASH_OUT'])
+        engineered = engineer.engineer_paysim_features(raw)
+        plan = FeaturePlan.fit(['amount', 'amount_normalized'], engineer)
+
+        kept = raw['type'].isin(['TRANSFER', 'CASH_OUT'])
+        assert plan.amount_mean == pytest.approx(raw.loc[kept, 'amount'].mean())
+        assert plan.amount_mean != pytest.approx(raw['amount'].mean())
+        row = engineered.index[0]
+        vector = plan.transform(raw.loc[row, RAW_FIELDS].to_dict())
+        assert vector[1] == pytest.approx(engineered.loc[row, 'amount_normalized'], rel=1e-5)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,153 @@
+"""
+Incremental retraining tests
+Warm-started updates must build on the production booster and respect the AUC guard
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.models.incremental import booster_train_params, latest_model_path, load_labeled_logs
+from src.models.trainer import FraudModelTrainer
+
+BASE = {'n_estimators': 30, 'max_depth': 3, 'learning_rate': 0.3}
+
+
+def make_data(n: int, shift: float = 0.0, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame({'amount': rng.normal(size=n), 'balance': rng.normal(size=n), 'noise': rng.normal(size=n)})
+    # ``shift`` moves the decision boundary, as a new fraud pattern would
+    y = pd.Series((X['amount'] - shift * X['balance'] + 0.3 * rng.normal(size=n) > 1.2).astype(int), name='isFraud')
+    return X, y
+
+
+@pytest.fixture
+def trainer(tmp_path):
+    trainer = FraudModelTrainer(models_dir=str(tmp_path / "models"), reports_dir=str(tmp_path / "reports"))
+    X, y = make_data(3_000)
+    trainer.train_xgboost(X, y, BASE, early_stopping_rounds=None)
+    trainer.save_model()
+    return trainer
+
+
+class TestRetrainIncremental:
+    """Test warm-start updates and the guard"""
+
+    def test_continue_adds_trees_on_new_data(self, trainer, tmp_path):
+        """Continued boosting learns the drift and is saved as a new version"""
+        base_path = latest_model_path(trainer.models_dir)
+        X_new, y_new = make_data(2_000, shift=1.5, seed=1)
+        result = trainer.retrain_incremental(X_new, y_new, n_rounds=20)
+
+        assert result['accepted'] and result['new_auc'] > result['previous_auc']
+        assert result['trees'] == BASE['n_estimators'] + 20
+        assert result['base_model'] == str(base_path)
+        # Saved in the same second as the base model, yet a distinct, newer version
+        assert result['model_path'] != str(base_path)
+        assert latest_model_path(trainer.models_dir) == Path(result['model_path'])
+        # The API's model file now holds the accepted update
+        assert Path(result['deployed_path']).read_bytes() == Path(result['model_path']).read_bytes()
+        report = json.loads(next((tmp_path / "reports").glob("xgboost_fraud_retrain_*.json")).read_text())
+        assert report['accepted'] is True
+
+    def test_refresh_keeps_tree_structure(self, trainer):
+        """Leaf refresh keeps the tree count and changes predictions"""
+        X_new, y_new = make_data(2_000, shift=1.5, seed=1)
+        before = trainer.model.predict_proba(X_new)[:, 1]
+        base_params = booster_train_params(trainer.model.get_booster())
+        result = trainer.retrain_incremental(X_new, y_new, mode='refresh', max_auc_drop=1.0)
+        assert result['trees'] == BASE['n_estimators']
+        assert not np.allclose(trainer.model.predict_proba(X_new)[:, 1], before)
+        # Leaves are re-fitted with the original class weighting and tree parameters
+        refreshed = booster_train_params(trainer.model.get_booster())
+        assert float(base_params['scale_pos_weight']) > 1
+        for name in ('scale_pos_weight', 'max_depth', 'lambda', 'min_child_weight'):
+            assert refreshed[name] == base_params[name], name
+
+    def test_guard_rejects_and_keeps_previous(self, trainer):
+        """A rejected update leaves the model and artifacts untouched"""
+        X_new, y_new = make_data(1_000, seed=2)
+        model, saved = trainer.model, sorted(trainer.models_dir.glob("*.pkl"))
+        result = trainer.retrain_incremental(X_new, y_new, n_rounds=5, max_auc_drop=-1.0)
+        assert not result['accepted'] and result['model_path'] is None and result['deployed_path'] is None
+        assert trainer.model is model
+        assert sorted(trainer.models_dir.glob("*.pkl")) == saved
+
+
+class TestLabeledLogs:
+    """Test reading analyst labels from transaction_logs"""
+
+    def test_only_labeled_rows_since(self, tmp_path):
+        """Rows without a confirmed label or older than ``since`` are skipped"""
+        url = f"sqlite:///{tmp_path / 'logs.db'}"
+        engine = create_engine(url)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE transaction_logs (id INTEGER PRIMARY KEY, features JSON, created_at DATETIME)"))
+            rows = [
+                ({'amount': 10.0, 'confirmed_fraud': 1}, '2025-01-01 00:00:00'),
+                ({'amount': 20.0}, '2025-02-01 00:00:00'),
+                ({'amount': 30.0, 'confirmed_fraud': 0}, '2025-02-02 00:00:00'),
+                ({'amount': 40.0, 'confirmed_fraud': 1}, '2025-02-03 00:00:00'),
+            ]
+            for features, created_at in rows:
+                conn.execute(
+                    text("INSERT INTO transaction_logs (features, created_at) VALUES (:features, :created_at)"),
+                    {'features': json.dumps(features), 'created_at': created_at}
+                )
+        engine.dispose()
+
+        records, labels = load_labeled_logs(url, since=datetime(2025, 1, 15))
+        assert [record['amount'] for record in records] == [30.0, 40.0]
+        assert labels.tolist() == [0, 1]
+
+    def test_feedback_labels_logged_predictions(self, tmp_path):
+        """/feedback labels the row /predict logged, with its online account features"""
+        from fastapi.testclient import TestClient
+        from sqlalchemy.orm import sessionmaker
+
+        from src.api.database import Base, get_db
+        from src.api.main import app
+        from src.models.feature_plan import FeaturePlan
+
+        url = f"sqlite:///{tmp_path / 'api.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(bind=engine)
+
+        def sqlite_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = sqlite_db
+        try:
+            client = TestClient(app)
+            request_ids = []
+            for step, amount in [(1, 100.0), (2, 250.0)]:
+                transaction = {'amount': amount, 'step': step, 'type': 'TRANSFER',
+                               'nameOrig': 'C_feedback', 'nameDest': 'M_feedback'}
+                request_ids.append(client.post("/api/v1/predict", json=transaction).json()['request_id'])
+            for request_id, label in zip(request_ids, [0, 1]):
+                response = client.post("/api/v1/feedback", json={'request_id': request_id, 'is_fraud': label})
+                assert response.status_code == 200
+            assert client.post("/api/v1/feedback", json={'request_id': 'missing', 'is_fraud': 1}).status_code == 404
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+
+        records, labels = load_labeled_logs(url)
+        assert labels.tolist() == [0, 1]
+        plan = FeaturePlan(['amount', 'sender_velocity_24h', 'type_TRANSFER'], amount_mean=0.0, amount_std=1.0)
+        X = plan.transform_batch(records, records)
+        np.testing.assert_array_equal(X, [[100.0, 1.0, 1.0], [250.0, 2.0, 1.0]])
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,78 @@
+"""
+Synthetic PaySim generator tests
+Chunked generation must be deterministic and carry the injected fraud graph
+"""
+
+import pandas as pd
+import pytest
+
+from src.data.feature_engineering import FraudFeatureEngineer
+from src.data.paysim_generator import (
+    PAYSIM_COLUMNS,
+    generate_chunk,
+    generate_synthetic_paysim,
+    sample_config,
+)
+
+CONFIG = sample_config(30_000, chunk_rows=7_000, fraud_rate=0.01)
+
+
+class TestSyntheticPaySim:
+    """Test the parallel account-graph generator"""
+
+    def test_schema_order_and_determinism(self):
+        """Step-ordered PaySim schema; same log for any worker count"""
+        df = generate_synthetic_paysim(CONFIG)
+        assert list(df.columns[:len(PAYSIM_COLUMNS)]) == PAYSIM_COLUMNS
+        assert len(df) == CONFIG.n_rows
+        assert df['step'].is_monotonic_increasing
+        assert df['step'].between(1, CONFIG.n_steps).all()
+        assert (df['amount'] > 0).all()
+
+        parallel = generate_synthetic_paysim(CONFIG, n_jobs=2)
+        pd.testing.assert_frame_equal(df, parallel)
+        pd.testing.assert_frame_equal(generate_chunk(CONFIG, 2), df.iloc[14_000:21_000].reset_index(drop=True))
+
+    def test_injected_fraud_structures(self):
+        """Mules cash out what they receive; ring members share a device"""
+        df = generate_synthetic_paysim(CONFIG)
+        fraud = df[df['isFraud'] == 1]
+        assert set(fraud['fraudPattern']) == {'transfer_cashout', 'mule_chain', 'ring'}
+        assert (df.loc[df['isFraud'] == 0, 'fraudPattern'] == '').all()
+        assert set(fraud['type']) == {'TRANSFER', 'CASH_OUT'}
+
+        # Every fraud CASH_OUT originates at an account that received a fraud TRANSFER
+        cash_outs = fraud[fraud['type'] == 'CASH_OUT']
+        receivers = set(fraud.loc[fraud['type'] == 'TRANSFER', 'nameDest'])
+        assert set(cash_outs['nameOrig']) <= receivers
+
+        ring = fraud[(fraud['fraudPattern'] == 'ring') & (fraud['type'] == 'CASH_OUT')]
+        assert ring.groupby('nameOrig')['deviceId'].nunique().max() == 1
+
+        # Popular accounts recur, as window features expect
+        assert df['nameOrig'].value_counts().iloc[0] > 20
+
+    def test_file_output_feeds_chunked_features(self, tmp_path):
+        """Written CSV matches the in-memory log and streams through the engineer"""
+        path = generate_synthetic_paysim(CONFIG, tmp_path / "synthetic.csv", n_jobs=2)
+        written = pd.read_csv(path, keep_default_na=False)
+        expected = generate_synthetic_paysim(CONFIG)
+        pd.testing.assert_frame_equal(written[PAYSIM_COLUMNS], expected[PAYSIM_COLUMNS], check_dtype=False)
+
+        output = FraudFeatureEngineer().engineer_paysim_features_chunked(
+            path, tmp_path / "features.csv", chunksize=5_000
+        )
+        assert len(pd.read_csv(output)) == CONFIG.n_rows
+
+    def test_parquet_output(self, tmp_path):
+        """Parquet parts are merged in chunk order"""
+        pytest.importorskip("pyarrow")
+        path = generate_synthetic_paysim(CONFIG, tmp_path / "synthetic.parquet", n_jobs=2)
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(path)[PAYSIM_COLUMNS], generate_synthetic_paysim(CONFIG)[PAYSIM_COLUMNS],
+            check_dtype=False
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
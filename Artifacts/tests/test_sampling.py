@@ -0,0 +1,66 @@
+"""
+Stratified sampling tests
+Streaming reservoirs must hit the target size and fraud rate uniformly
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.loader import FraudDataLoader
+from src.data.sampling import stratified_reservoir_sample
+
+
+def chunked(df: pd.DataFrame, size: int):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+class TestStratifiedReservoirSample:
+    """Test the one-pass stratified sampler"""
+
+    def test_target_size_rate_and_order(self, make_paysim):
+        """Exact class counts, rows drawn from the source in source order"""
+        df = make_paysim(n_samples=5_000).sort_values('step', kind='mergesort').reset_index(drop=True)
+        df['row'] = np.arange(len(df))
+        sample = stratified_reservoir_sample(chunked(df, 333), n_samples=400, fraud_rate=0.1)
+
+        assert len(sample) == 400
+        assert sample['isFraud'].sum() == 40
+        assert sample['row'].is_monotonic_increasing and sample['row'].is_unique
+        pd.testing.assert_frame_equal(sample, df.loc[sample['row']].reset_index(drop=True))
+
+    def test_independent_of_chunking_and_natural_rate(self, make_paysim):
+        """The same seed gives the same sample for any chunk size"""
+        df = make_paysim(n_samples=3_000)
+        first = stratified_reservoir_sample(chunked(df, 100), n_samples=300)
+        second = stratified_reservoir_sample(chunked(df, 1_000), n_samples=300)
+        pd.testing.assert_frame_equal(first, second)
+        assert first['isFraud'].sum() == round(300 * df['isFraud'].mean())
+
+    def test_uniform_within_class(self):
+        """Every legitimate row is about equally likely to be kept"""
+        df = pd.DataFrame({'isFraud': np.zeros(200, dtype=int), 'row': np.arange(200)})
+        hits = np.zeros(200)
+        for seed in range(300):
+            sample = stratified_reservoir_sample(chunked(df, 37), n_samples=20, fraud_rate=0.0, seed=seed)
+            hits[sample['row']] += 1
+        # Expected 30 hits per row; halves of the stream are sampled alike
+        assert abs(hits[:100].sum() - hits[100:].sum()) < 0.1 * hits.sum()
+
+    def test_loader_samples_raw_log(self, tmp_path, make_paysim):
+        """The loader streams the raw file and keeps step order"""
+        df = make_paysim(n_samples=2_000).sort_values('step', kind='mergesort')
+        df['isFlaggedFraud'] = 0
+        source = tmp_path / "paysim.csv"
+        df.to_csv(source, index=False)
+
+        sample = FraudDataLoader(data_dir=str(tmp_path)).sample_paysim(
+            n_samples=200, fraud_rate=0.2, chunksize=150, source_path=source
+        )
+        assert len(sample) == 200
+        assert sample['isFraud'].mean() == pytest.approx(0.2)
+        assert sample['step'].is_monotonic_increasing
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
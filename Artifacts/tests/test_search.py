@@ -0,0 +1,78 @@
+"""
+Hyperparameter search tests
+Successive halving must cut candidates per rung and rank them on held-out rows
+"""
+
+import asyncio
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.models.feature_matrix import FeatureMatrixStore
+from src.models.search import rung_schedule, sample_configurations, successive_halving
+from src.models.trainer import FraudModelTrainer
+
+SPACE = {'max_depth': [2, 3, 4], 'learning_rate': [0.05, 0.2, 0.4], 'subsample': [0.8, 1.0]}
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    n = 2_000
+    X = pd.DataFrame({'amount': rng.normal(size=n), 'balance': rng.normal(size=n), 'noise': rng.normal(size=n)})
+    y = pd.Series((X['amount'] - X['balance'] + 0.5 * rng.normal(size=n) > 1.5).astype(int), name='isFraud')
+    store = FeatureMatrixStore(tmp_path / "matrices")
+    store.save_split('train', X, y)
+    return store
+
+
+class TestSuccessiveHalving:
+    """Test the rung schedule and the search loop"""
+
+    def test_schedule_and_sampling(self):
+        """Rungs shrink by eta while rounds grow up to the cap"""
+        assert rung_schedule(9, 5, 40, 3) == [
+            {'candidates': 9, 'rounds': 5}, {'candidates': 3, 'rounds': 15}, {'candidates': 1, 'rounds': 40}
+        ]
+        configs = sample_configurations(9, SPACE)
+        assert len({tuple(sorted(config.items())) for config in configs}) == 9
+        assert configs == sample_configurations(9, SPACE)
+
+    def test_parallel_matches_sequential(self, store):
+        """Workers continue boosting survivors and rank like an in-process run"""
+        sequential = successive_halving(store, 9, 5, 45, 3, SPACE, n_jobs=1)
+        parallel = successive_halving(store, 9, 5, 45, 3, SPACE, n_jobs=3)
+
+        board = sequential['leaderboard']
+        assert [trial['rounds'] for trial in board] == [45, 15, 15] + [5] * 6
+        assert [trial['id'] for trial in parallel['leaderboard']] == [trial['id'] for trial in board]
+        assert parallel['best']['auc_roc'] == pytest.approx(sequential['best']['auc_roc'])
+        assert sequential['best']['auc_roc'] > 0.9
+        assert all(trial['single_row_latency_ms'] > 0 and 'booster' not in trial for trial in board)
+        # The holdout carve-out is per run and removed afterwards
+        assert not list(store.directory.glob("holdout_*"))
+
+
+class TestSearchReport:
+    """Test the trainer entry point and the comparison endpoint"""
+
+    def test_leaderboard_is_served(self, store, tmp_path, monkeypatch):
+        """The comparison endpoint serves the latest search instead of demo numbers"""
+        monkeypatch.chdir(tmp_path)
+        trainer = FraudModelTrainer(models_dir="models", reports_dir="reports")
+        results = trainer.search_hyperparameters(
+            str(store.directory), n_candidates=4, min_rounds=5, max_rounds=20, eta=2, search_space=SPACE
+        )
+        saved = json.loads(next((tmp_path / "reports").glob("hyperparameter_search_*.json")).read_text())
+        assert saved['best']['params'] == results['best']['params']
+
+        from src.api.routers.metrics import get_model_comparison
+        comparison = asyncio.run(get_model_comparison())
+        assert len(comparison['models_compared']) == 4
+        assert comparison['models_compared'][0]['hyperparameters'] == results['best']['params']
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
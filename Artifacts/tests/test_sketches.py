@@ -0,0 +1,89 @@
+"""
+Sketch tests
+Batch running estimates must equal streaming sketches and stay within their error bounds
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.sketches import (
+    CountMinSketch,
+    HyperLogLog,
+    running_distinct_estimates,
+    running_frequency_estimates,
+)
+
+
+class TestHyperLogLog:
+    """Test the distinct-count sketch"""
+
+    def test_error_within_bound(self):
+        """Estimates of large cardinalities stay within 3 standard errors"""
+        sketch = HyperLogLog()
+        for value in range(20_000):
+            sketch.add(f"M{value}")
+        assert abs(sketch.count() / 20_000 - 1) < 3 * sketch.relative_error
+
+    def test_merge_equals_union(self):
+        """Merging partition sketches gives the sketch of all values"""
+        left, right, both = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for value in range(500):
+            (left if value % 2 else right).add(value)
+            both.add(value)
+        np.testing.assert_array_equal(left.merge(right).registers, both.registers)
+
+
+class TestCountMinSketch:
+    """Test the frequency sketch"""
+
+    def test_never_underestimates_and_merges(self):
+        """Estimates are upper bounds and merged tables add up"""
+        rng = np.random.default_rng(0)
+        values = rng.integers(0, 200, 2_000)
+        left, right = CountMinSketch(), CountMinSketch()
+        for i, value in enumerate(values):
+            (left if i % 2 else right).add(value)
+        merged = left.merge(right)
+        counts = pd.Series(values).value_counts()
+        for value, count in counts.items():
+            assert merged.estimate(value) >= count
+
+
+class TestRunningEstimates:
+    """Test the vectorized batch estimators"""
+
+    def test_batch_matches_streaming(self, make_paysim):
+        """Per-row batch estimates equal sketches updated row by row"""
+        df = make_paysim(n_samples=800, n_accounts=15)
+        distinct = running_distinct_estimates(df['nameOrig'], df['step'], df['nameDest'])
+        frequency = running_frequency_estimates(df['nameOrig'], df['step'], df['nameDest'])
+
+        sketches, tables = {}, {}
+        for i in df.sort_values('step', kind='mergesort').index:
+            account, dest = df.at[i, 'nameOrig'], df.at[i, 'nameDest']
+            sketch = sketches.setdefault(account, HyperLogLog())
+            table = tables.setdefault(account, CountMinSketch())
+            sketch.add(dest)
+            table.add(dest)
+            assert distinct['estimate'][i] == pytest.approx(sketch.count())
+            assert frequency['estimate'][i] == table.estimate(dest)
+
+    def test_state_continues_across_partitions(self, make_paysim):
+        """Carried sparse state reproduces the single-pass estimates"""
+        df = make_paysim(n_samples=600).sort_values('step', kind='mergesort').reset_index(drop=True)
+        full = running_distinct_estimates(df['nameOrig'], df['step'], df['nameDest'])
+        head, tail = df.iloc[:250], df.iloc[250:]
+        first = running_distinct_estimates(
+            head['nameOrig'], head['step'], head['nameDest'], keep_state=True
+        )
+        second = running_distinct_estimates(
+            tail['nameOrig'], tail['step'], tail['nameDest'], state=first['state']
+        )
+        np.testing.assert_allclose(
+            np.concatenate([first['estimate'], second['estimate']]), full['estimate']
+        )
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,76 @@
+"""
+Train/test split tests
+Index-based splits must match the old copying split; streamed splits the in-memory ones
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import train_test_split
+
+from src.data.feature_engineering import FraudFeatureEngineer
+from src.data.train_test_split import (
+    create_train_test_split,
+    stream_split_to_matrices,
+    time_split_cutoff,
+)
+from src.models.feature_matrix import FeatureMatrixStore
+
+
+@pytest.fixture
+def engineered(make_paysim):
+    df = FraudFeatureEngineer().engineer_paysim_features(make_paysim(n_samples=600))
+    df['is_fraud'] = df['isFraud']
+    df.loc[::13, 'balance_ratio_orig'] = np.inf
+    return df
+
+
+class TestCreateTrainTestSplit:
+    """Test the in-memory splits"""
+
+    def test_random_split_matches_sklearn_copying_split(self, engineered):
+        """Same rows, columns and cleaned values as drop/fillna/replace + train_test_split"""
+        X = engineered.drop(columns=['is_fraud', 'isFraud', 'nameOrig', 'nameDest', 'type'])
+        X = X.fillna(0).replace([np.inf, -np.inf], 0)
+        expected = train_test_split(X, engineered['is_fraud'], test_size=0.2, random_state=42,
+                                    stratify=engineered['is_fraud'])
+
+        for actual, reference in zip(create_train_test_split(engineered), expected):
+            pd.testing.assert_index_equal(actual.index, reference.index)
+            if isinstance(reference, pd.DataFrame):
+                pd.testing.assert_frame_equal(actual, reference, check_dtype=False)
+
+    def test_time_and_account_splits(self, engineered):
+        """Time split keeps all test steps after train; account split never shares accounts"""
+        X_train, X_test, _, _ = create_train_test_split(engineered, method='time')
+        assert X_train['step'].max() < X_test['step'].min()
+        assert 0.1 < len(X_test) / len(engineered) < 0.3
+
+        X_train, X_test, y_train, y_test = create_train_test_split(engineered, method='account')
+        train_accounts = set(engineered.loc[X_train.index, 'nameOrig'])
+        assert train_accounts.isdisjoint(engineered.loc[X_test.index, 'nameOrig'])
+        assert len(X_train) + len(X_test) == len(engineered)
+
+
+class TestStreamedSplit:
+    """Test chunked splitting into memory-mapped matrices"""
+
+    @pytest.mark.parametrize("method", ["time", "account"])
+    def test_stream_matches_in_memory(self, engineered, tmp_path, method):
+        """Streaming chunk by chunk writes the rows of the in-memory split"""
+        engineered = engineered.sort_values('step', kind='mergesort').reset_index(drop=True)
+        cutoff = time_split_cutoff(engineered['step'])
+        chunks = (engineered.iloc[start:start + 77] for start in range(0, len(engineered), 77))
+
+        store = FeatureMatrixStore(tmp_path)
+        counts = stream_split_to_matrices(chunks, store, method=method, target_col='is_fraud', cutoff=cutoff)
+        X_train, X_test, y_train, y_test = create_train_test_split(engineered, method=method)
+
+        assert counts == {'train': len(X_train), 'test': len(X_test)}
+        mapped_train, mapped_y = store.load_split('train')
+        np.testing.assert_array_equal(mapped_train.to_numpy(), X_train.sort_index().to_numpy(np.float32))
+        np.testing.assert_array_equal(mapped_y, y_train.sort_index())
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])